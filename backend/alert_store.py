@@ -0,0 +1,162 @@
+"""
+Normalized alert and metric storage.
+
+Alongside the original JSON `alerts`/`metrics` text (kept for /get_data and
+backwards compatibility), every event is written with:
+- one `event_alerts` row per alert, pointing at an `alert_types` dictionary
+  row (the ALERT_WEIGHTS category, or "Other" for alerts matching none)
+  plus an optional free-text detail, e.g. the transcript of a "VOICE: ..."
+  alert or the text of an "Other" alert;
+- typed metric columns on `events`: face_count, eye_velocity, total_blinks
+  and emotion_code.
+
+Queries like "every session of exam 3 where a phone was detected" then run
+on indexed integer columns instead of decoding JSON row by row.
+"""
+
+import json
+import math
+
+from scoring import classify_alert
+
+# Stable integer codes for the emotions produced by the client agent
+EMOTION_CODES = {"N/A": 0, "Neutral": 1, "Happy": 2, "Sad": 3, "Surprised": 4, "Angry": 5}
+EMOTION_NAMES = {code: name for name, code in EMOTION_CODES.items()}
+
+# Range of an SQLite INTEGER; a larger Python int fails parameter binding
+SQLITE_INT_MIN, SQLITE_INT_MAX = -2**63, 2**63 - 1
+
+TYPED_METRIC_COLUMNS = [
+    ("face_count", "INTEGER"),
+    ("eye_velocity", "REAL"),
+    ("total_blinks", "INTEGER"),
+    ("emotion_code", "INTEGER"),
+]
+
+ALERT_TYPES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alert_types (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE
+);
+"""
+
+EVENT_ALERTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS event_alerts (
+    event_id INTEGER NOT NULL,
+    alert_type_id INTEGER NOT NULL,
+    detail TEXT,
+    FOREIGN KEY (event_id) REFERENCES events (id),
+    FOREIGN KEY (alert_type_id) REFERENCES alert_types (id)
+);
+"""
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_event_alerts_type_event ON event_alerts (alert_type_id, event_id)",
+    "CREATE INDEX IF NOT EXISTS idx_event_alerts_event ON event_alerts (event_id)",
+]
+
+INSERT_EVENT_ALERT_SQL = "INSERT INTO event_alerts (event_id, alert_type_id, detail) VALUES (?, ?, ?)"
+
+
+def create_alert_tables(conn):
+    conn.execute(ALERT_TYPES_SCHEMA)
+    conn.execute(EVENT_ALERTS_SCHEMA)
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(events)").fetchall()}
+    for column, sql_type in TYPED_METRIC_COLUMNS:
+        if column not in existing:
+            # ADD COLUMN only rewrites the schema, not the (possibly huge) table
+            conn.execute(f"ALTER TABLE events ADD COLUMN {column} {sql_type}")
+    for sql in INDEXES:
+        conn.execute(sql)
+
+
+def _number(value, kind):
+    """`value` as `kind` (int or float), or None unless it is a finite JSON number that fits an SQLite column."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        return None
+    value = kind(value)
+    return value if kind is float or SQLITE_INT_MIN <= value <= SQLITE_INT_MAX else None
+
+
+def typed_metrics(metrics):
+    """
+    Extracts (face_count, eye_velocity, total_blinks, emotion_code) from an agent metrics dict.
+    The values come straight from client JSON, so anything that isn't a number
+    (or a known emotion) is stored as NULL rather than bound as-is.
+    """
+    if not isinstance(metrics, dict) or metrics.get("source") == "web":
+        return None, None, None, None
+    emotion = metrics.get("emotion")
+    return (
+        _number(metrics.get("count"), int),
+        _number(metrics.get("eye_velocity"), float),
+        _number(metrics.get("total_blinks"), int),
+        EMOTION_CODES.get(emotion) if isinstance(emotion, str) else None,
+    )
+
+
+def classify_alerts(alerts):
+    """Returns [(category, detail), ...] for one event's alert list, ready for insert_event_alerts."""
+    return [classify_alert(alert) for alert in set(alerts or [])]
+
+
+class AlertTypeCache:
+    """Maps alert category names to alert_types ids, inserting new categories on first sight."""
+
+    def __init__(self):
+        self._ids = {}
+
+    def clear(self):
+        """Forgets every id, e.g. after a rollback undid the rows they pointed at."""
+        self._ids.clear()
+
+    def id_for(self, conn, name):
+        type_id = self._ids.get(name)
+        if type_id is None:
+            conn.execute("INSERT OR IGNORE INTO alert_types (name) VALUES (?)", (name,))
+            type_id = conn.execute("SELECT id FROM alert_types WHERE name = ?", (name,)).fetchone()[0]
+            self._ids[name] = type_id
+        return type_id
+
+
+def insert_event_alerts(conn, type_cache, event_ids, classified):
+    """
+    Writes event_alerts rows; event_ids[i] is the events.id the i-th classified list belongs to.
+    Returns the set of alert_types ids of each event, in the same order.
+    """
+    rows = []
+    type_ids = []
+    for event_id, entries in zip(event_ids, classified):
+        ids = frozenset(type_cache.id_for(conn, category) for category, _ in entries)
+        rows.extend((event_id, type_cache.id_for(conn, category), detail) for category, detail in entries)
+        type_ids.append(ids)
+    if rows:
+        conn.executemany(INSERT_EVENT_ALERT_SQL, rows)
+    return type_ids
+
+
+def backfill_alerts(conn, after_id, upto_id):
+    """Migration backfill chunk: decodes legacy JSON once and fills event_alerts and the typed columns."""
+    rows = conn.execute(
+        "SELECT id, alerts, metrics FROM events WHERE id > ? AND id <= ?",
+        (after_id, upto_id),
+    ).fetchall()
+    type_cache = AlertTypeCache()
+    event_ids, classified, updates = [], [], []
+    for event_id, alerts_json, metrics_json in rows:
+        try:
+            alerts = json.loads(alerts_json) if alerts_json else []
+        except (json.JSONDecodeError, TypeError):
+            alerts = []
+        try:
+            metrics = json.loads(metrics_json) if metrics_json else {}
+        except (json.JSONDecodeError, TypeError):
+            metrics = {}
+        event_ids.append(event_id)
+        classified.append(classify_alerts(alerts if isinstance(alerts, list) else []))
+        updates.append(typed_metrics(metrics) + (event_id,))
+    insert_event_alerts(conn, type_cache, event_ids, classified)
+    conn.executemany(
+        "UPDATE events SET face_count = ?, eye_velocity = ?, total_blinks = ?, emotion_code = ? WHERE id = ?",
+        updates,
+    )
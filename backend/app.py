@@ -1,101 +1,100 @@
-from flask import Flask, request, jsonify, send_file, after_this_request
+from flask import Flask, Response, request, jsonify, send_file
 from flask_cors import CORS
 import sqlite3
 import json
 import os
-from report_generator import generate_report
+import zlib
+import metrics
+from report_jobs import create_report_jobs
+from exam_export import alert_durations, exam_sessions, stream_exam_archive
+from live_feed import create_live_broker
+from ingest import create_event_writer
+from db import DATABASE_FILE, connect, get_db, release_db
+from migrations import migrate, current_version
+from scoring import ALERT_WEIGHTS, calculate_integrity_score, score_alerts
+from alert_store import typed_metrics
+from sessions import parse_epoch
+from session_cache import create_session_cache
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 
 app = Flask(__name__)
 # ✨ MODIFIED: Make CORS explicit to solve any lingering issues
 CORS(app, resources={r"/*": {"origins": "*"}})
-DATABASE_FILE = 'proctoring_data.db'
-
-# (Alert weights are unchanged)
-ALERT_WEIGHTS = {
-    "Multiple faces detected!": 25,
-    "CELL PHONE detected!": 20,
-    "Distraction: Looking away while talking": 10,
-    "No person detected!": 15,
-    "Someone is talking!": 5,
-    "VOICE:": 10,
-    "Suspicious micro gesture detected!": 5,
-    "Hand on mouse/keyboard detected!": 2,
-    "WEB: Switched tabs": 8,
-    "WEB: Left focus": 5
-}
+# Every request borrows one pooled connection (db.get_db) and returns it here
+app.teardown_appcontext(release_db)
+# Per-route latency and SQL time, plus the opt-in request profiler (see metrics.py)
+app.before_request(metrics.start_request)
+app.after_request(metrics.finish_request)
 
 # --- ✨ NEW: Server-side cache ---
-# This dictionary will store the last known alerts for each active session
-# We use this to avoid flooding the database
-SESSION_LAST_ALERTS = {}
+# Stores the last known alerts for each active session so we avoid flooding
+# the database. Bounded, TTL-evicting and optionally shared across workers
+# (see session_cache.py for the SESSION_CACHE_* knobs).
+SESSION_LAST_ALERTS = create_session_cache()
+
+# Queues events and commits them in batches (see ingest.py for the INGEST_* knobs)
+EVENT_WRITER = create_event_writer(DATABASE_FILE)
+
+# Pushes committed alert transitions and score updates to live dashboards (see live_feed.py)
+LIVE_FEED = create_live_broker()
+EVENT_WRITER.add_listener(LIVE_FEED.on_batch)
+
+# Renders PDF reports in a process pool and caches them (see report_jobs.py for the REPORT_* knobs)
+REPORT_JOBS = create_report_jobs()
+# How long the legacy /generate_report endpoint waits for a render
+REPORT_SYNC_TIMEOUT = float(os.environ.get('REPORT_SYNC_TIMEOUT', 120))
+
+# How long an exam-wide export waits for its reports before closing the archive
+EXPORT_TIMEOUT = float(os.environ.get('EXPORT_TIMEOUT', 600))
+
+# Queue depths and cache/broker counters, read when /metrics is scraped
+metrics.CallbackMetric("proctor_ingest_queue_depth", "Events waiting for the ingest writer", EVENT_WRITER.pending)
+metrics.CallbackMetric("proctor_ingest_writer_up", "0 once the ingest writer thread has died (events then only queue up)",
+                       lambda: int(EVENT_WRITER.alive()))
+metrics.CallbackMetric("proctor_session_cache_entries", "Sessions held by SESSION_LAST_ALERTS",
+                       lambda: SESSION_LAST_ALERTS.stats()["entries"])
+metrics.CallbackMetric("proctor_session_cache_lookups_total", "SESSION_LAST_ALERTS lookups by result",
+                       lambda: {("hit",): SESSION_LAST_ALERTS.stats()["hits"],
+                                ("miss",): SESSION_LAST_ALERTS.stats()["misses"]},
+                       kind="counter", labelnames=("result",))
+metrics.CallbackMetric("proctor_session_cache_evictions_total", "Sessions evicted from SESSION_LAST_ALERTS",
+                       lambda: SESSION_LAST_ALERTS.stats()["evictions"], kind="counter")
+metrics.CallbackMetric("proctor_live_subscribers", "Connected live dashboards", LIVE_FEED.subscriber_count)
+metrics.CallbackMetric("proctor_live_messages_total", "Live messages published, and dropped from full buffers",
+                       lambda: {("published",): LIVE_FEED.published, ("dropped",): LIVE_FEED.dropped},
+                       kind="counter", labelnames=("result",))
+metrics.CallbackMetric("proctor_report_jobs_in_flight", "Report jobs queued or rendering", REPORT_JOBS.in_flight)
+
+# Upper bound on a /log_batch body, both as sent and after gzip decompression
+MAX_BATCH_BYTES = 8 * 1024 * 1024
+BATCH_TOO_LARGE = ("Batch too large", 413)
 
 @app.route('/')
 def home():
     return jsonify({"status": "ok", "message": "Flask backend running successfully"}), 200
 
-def calculate_integrity_score(alerts):
-    score = 100
-    if not alerts: return score
-    for alert in set(alerts):
-        for key, weight in ALERT_WEIGHTS.items():
-            if key in alert: score -= weight; break
-    return max(0, score)
-
-# (init_db is unchanged)
 def init_db():
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT NOT NULL UNIQUE,
-        password_hash TEXT NOT NULL,
-        role TEXT NOT NULL CHECK(role IN ('student', 'admin'))
-    );
-    """)
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS events (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        student_id TEXT NOT NULL,
-        session_id TEXT NOT NULL,
-        timestamp TEXT NOT NULL,
-        alerts TEXT,
-        metrics TEXT,
-        integrity_score REAL
-    );
-    """)
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS exams (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT NOT NULL,
-        description TEXT,
-        created_by_admin_id INTEGER NOT NULL,
-        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (created_by_admin_id) REFERENCES users (id)
-    );
-    """)
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS exam_assignments (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        exam_id INTEGER NOT NULL,
-        student_id INTEGER NOT NULL,
-        status TEXT NOT NULL DEFAULT 'assigned',
-        assigned_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (exam_id) REFERENCES exams (id),
-        FOREIGN KEY (student_id) REFERENCES users (id),
-        UNIQUE(exam_id, student_id)
-    );
-    """)
-    conn.commit()
-    conn.close()
-    print("SQLite database is ready with 'users', 'events', 'exams', and 'exam_assignments' tables.")
+    # Schema lives in versioned migrations (see migrations.py); large backfills
+    # run in bounded chunks, so this is safe to run against a live database.
+    conn = connect()
+    try:
+        for step in migrate(conn):
+            print(f"Applied migration v{step['version']}: {step['name']}")
+        version = current_version(conn)
+    finally:
+        conn.close()
+    print(f"SQLite database is ready (schema version {version}).")
 
 
 # ===================================================
 # 🔹 AUTH ENDPOINTS (Unchanged) 🔹
 # ===================================================
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    # Prometheus scrape endpoint; values are per server process (see metrics.py)
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
 @app.route('/register', methods=['POST'])
 def register():
     # ... (endpoint is unchanged) ...
@@ -107,17 +106,15 @@ def register():
         return jsonify({"status": "error", "message": "Missing username, password, or role"}), 400
     if role not in ['student', 'admin']:
         return jsonify({"status": "error", "message": "Role must be 'student' or 'admin'"}), 400
-    conn = sqlite3.connect(DATABASE_FILE)
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
     if cursor.fetchone():
-        conn.close()
         return jsonify({"status": "error", "message": "Username already exists"}), 409
     password_hash = generate_password_hash(password)
     sql = "INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)"
     cursor.execute(sql, (username, password_hash, role))
     conn.commit()
-    conn.close()
     return jsonify({"status": "success", "message": "User registered successfully"}), 201
 
 @app.route('/login', methods=['POST'])
@@ -128,15 +125,12 @@ def login():
     password = data.get('password')
     if not username or not password:
         return jsonify({"status": "error", "message": "Missing username or password"}), 400
-    conn = sqlite3.connect(DATABASE_FILE)
-    conn.row_factory = sqlite3.Row
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
     user = cursor.fetchone()
     if not user or not check_password_hash(user['password_hash'], password):
-        conn.close()
         return jsonify({"status": "error", "message": "Invalid username or password"}), 401
-    conn.close()
     return jsonify({
         "status": "success",
         "message": "Login successful",
@@ -153,19 +147,16 @@ def login():
 @app.route('/api/students', methods=['GET'])
 def get_students():
     # ... (endpoint is unchanged) ...
-    conn = sqlite3.connect(DATABASE_FILE)
-    conn.row_factory = sqlite3.Row
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute("SELECT id, username FROM users WHERE role = 'student'")
     students = [dict(row) for row in cursor.fetchall()]
-    conn.close()
     return jsonify(students)
 
 @app.route('/api/exams', methods=['GET', 'POST'])
 def handle_exams():
     # ... (endpoint is unchanged) ...
-    conn = sqlite3.connect(DATABASE_FILE)
-    conn.row_factory = sqlite3.Row
+    conn = get_db()
     if request.method == 'POST':
         data = request.json
         title = data.get('title')
@@ -177,7 +168,6 @@ def handle_exams():
         sql = "INSERT INTO exams (title, description, created_by_admin_id) VALUES (?, ?, ?)"
         cursor.execute(sql, (title, description, admin_id))
         conn.commit()
-        conn.close()
         return jsonify({"status": "success", "message": "Exam created successfully"}), 201
     elif request.method == 'GET':
         cursor = conn.cursor()
@@ -188,7 +178,6 @@ def handle_exams():
             ORDER BY e.created_at DESC
         """)
         exams = [dict(row) for row in cursor.fetchall()]
-        conn.close()
         return jsonify(exams)
 
 @app.route('/api/assign', methods=['POST'])
@@ -199,65 +188,86 @@ def assign_exam():
     student_id = data.get('student_id')
     if not exam_id or not student_id:
         return jsonify({"status": "error", "message": "Missing exam_id or student_id"}), 400
-    conn = sqlite3.connect(DATABASE_FILE)
+    conn = get_db()
     cursor = conn.cursor()
     try:
         sql = "INSERT INTO exam_assignments (exam_id, student_id) VALUES (?, ?)"
         cursor.execute(sql, (exam_id, student_id))
         conn.commit()
+        LIVE_FEED.forget_assignments(exam_id)
     except sqlite3.IntegrityError:
-        conn.close()
         return jsonify({"status": "error", "message": "This exam is already assigned to this student"}), 409
-    conn.close()
     return jsonify({"status": "success", "message": "Exam assigned successfully"}), 201
 
 @app.route('/api/exam_details/<int:exam_id>', methods=['GET'])
 def get_exam_details(exam_id):
     # ... (endpoint is unchanged) ...
-    conn = sqlite3.connect(DATABASE_FILE)
-    conn.row_factory = sqlite3.Row
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute("SELECT id, title, description FROM exams WHERE id = ?", (exam_id,))
     exam = cursor.fetchone()
     if not exam:
-        conn.close()
         return jsonify({"status": "error", "message": "Exam not found"}), 404
-    conn.close()
     return jsonify(dict(exam))
 
 @app.route('/api/exam_sessions/<int:exam_id>', methods=['GET'])
 def get_sessions_for_exam(exam_id):
-    # ... (endpoint is unchanged) ...
-    conn = sqlite3.connect(DATABASE_FILE)
-    conn.row_factory = sqlite3.Row
+    conn = get_db()
     cursor = conn.cursor()
+    # Served from the per-session summary table: an index lookup on exam_id
+    # instead of grouping every event of every assigned student. final_score is
+    # the time-weighted score maintained at ingest (see sessions.py), the same
+    # figure the PDF report shows.
     cursor.execute("""
-        SELECT u.username 
-        FROM exam_assignments a
-        JOIN users u ON a.student_id = u.id
-        WHERE a.exam_id = ?
+        SELECT
+            s.session_id,
+            s.student_id as student_username,
+            s.start_time,
+            s.final_score
+        FROM sessions s
+        JOIN users u ON u.username = s.student_id
+        JOIN exam_assignments a ON a.student_id = u.id AND a.exam_id = s.exam_id
+        WHERE s.exam_id = ?
+        ORDER BY s.start_time DESC
     """, (exam_id,))
-    students = cursor.fetchall()
-    if not students:
-        conn.close()
-        return jsonify([])
-    student_usernames = [s['username'] for s in students]
-    placeholders = ','.join('?' for _ in student_usernames)
-    query = f"""
-        SELECT 
-            e.session_id, 
-            e.student_id as student_username, 
-            MIN(e.timestamp) as start_time, 
-            MAX(e.integrity_score) as final_score
-        FROM events e
-        WHERE e.student_id IN ({placeholders}) AND e.session_id LIKE ?
-        GROUP BY e.session_id, e.student_id
-        ORDER BY start_time DESC
-    """
-    params = student_usernames + [f"exam_{exam_id}_%"]
-    cursor.execute(query, params)
     sessions = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    return jsonify(sessions)
+
+@app.route('/api/exams/<int:exam_id>/live', methods=['GET'])
+def live_exam_feed(exam_id):
+    # Server-Sent Events: alert transitions and score updates as they are committed
+    subscription = LIVE_FEED.subscribe(exam_id)
+    if subscription is None:
+        return jsonify({"status": "error", "message": "Too many live subscribers."}), 503
+    return Response(
+        LIVE_FEED.stream(subscription),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+@app.route('/api/exam_alerts/<int:exam_id>', methods=['GET'])
+def get_exam_alert_sessions(exam_id):
+    # Sessions of an exam that raised a given alert type, e.g. ?type=CELL PHONE detected!
+    alert_type = request.args.get('type')
+    if not alert_type:
+        return jsonify({"status": "error", "message": "Missing alert type"}), 400
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT
+            s.session_id,
+            s.student_id as student_username,
+            COUNT(*) as occurrences,
+            MIN(e.timestamp) as first_seen
+        FROM alert_types t
+        JOIN event_alerts ea ON ea.alert_type_id = t.id
+        JOIN events e ON e.id = ea.event_id
+        JOIN sessions s ON s.session_id = e.session_id AND s.student_id = e.student_id
+        WHERE t.name = ? AND s.exam_id = ?
+        GROUP BY s.session_id, s.student_id
+        ORDER BY occurrences DESC
+    """, (alert_type, exam_id))
+    sessions = [dict(row) for row in cursor.fetchall()]
     return jsonify(sessions)
 
 # ===================================================
@@ -266,8 +276,7 @@ def get_sessions_for_exam(exam_id):
 @app.route('/api/my_exams/<int:student_id>', methods=['GET'])
 def get_student_exams(student_id):
     # ... (endpoint is unchanged) ...
-    conn = sqlite3.connect(DATABASE_FILE)
-    conn.row_factory = sqlite3.Row
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute("""
         SELECT 
@@ -278,134 +287,293 @@ def get_student_exams(student_id):
         ORDER BY a.assigned_at DESC
     """, (student_id,))
     exams = [dict(row) for row in cursor.fetchall()]
-    conn.close()
     return jsonify(exams)
 
 # ===================================================
 # 🔹 PROCTORING DATA ENDPOINT (✨ HEAVILY MODIFIED) 🔹
 # ===================================================
 
-@app.route('/log_data', methods=['POST'])
-def log_data():
-    data = request.json
-    
+def _prepare_event(data):
+    """
+    Validates and deduplicates one agent/web payload.
+
+    Returns (error, pending): `error` is a message for an invalid payload;
+    `pending` is the (row, classified_alerts) pair to hand to EVENT_WRITER,
+    or None when the alerts haven't changed and nothing needs to be written.
+    """
     is_web_alert = data.get('source') == 'web'
+    # Agents only send alert transitions plus periodic heartbeats carrying
+    # interval-aggregated metrics; heartbeats are always kept.
+    is_heartbeat = data.get('kind') == 'heartbeat'
     student_id = data.get('student_id')
     session_id = data.get('session_id')
     
     if not student_id or not session_id:
-        return jsonify({"status": "error", "message": "student_id and session_id are required"}), 400
+        metrics.INGEST_EVENTS.inc(("rejected",))
+        return "student_id and session_id are required", None
+
+    # Checked here, before the dedup swap: a malformed value must never reach the writer transaction,
+    # which sorts and parses timestamps and matches session ids
+    timestamp = data.get('timestamp')
+    current_alerts_list = data.get('alerts') or []
+    if not isinstance(student_id, str) or not isinstance(session_id, str):
+        error = "student_id and session_id must be strings"
+    elif timestamp not in (None, "") and not (isinstance(timestamp, str) and parse_epoch(timestamp) is not None):
+        error = "timestamp must be an ISO 8601 string"
+    elif not isinstance(current_alerts_list, list) or not all(isinstance(alert, str) for alert in current_alerts_list):
+        error = "alerts must be a list of strings"
+    else:
+        error = None
+    if error:
+        metrics.INGEST_EVENTS.inc(("rejected",))
+        return error, None
 
     # Get the set of alerts from the payload
-    current_alerts_list = data.get('alerts', [])
     current_alerts_set = set(current_alerts_list)
 
     # --- ✨ NEW EFFICIENCY LOGIC ---
-    # We only write to the DB if it's a web alert OR if the Python alerts have changed.
+    # We only write to the DB if it's a web alert, a heartbeat OR if the Python alerts have changed.
     
-    # Get the last known alerts for this session from our cache
-    last_alerts_set = SESSION_LAST_ALERTS.get(session_id, set())
+    # Record the new state and get the last known alerts for this session in
+    # one step (atomic across workers with the shared backend). Refreshing an
+    # unchanged state also keeps active sessions from idling out.
+    last_alerts_set = SESSION_LAST_ALERTS.swap(session_id, current_alerts_set)
 
     # Check if we should skip writing this log
-    if not is_web_alert and current_alerts_set == last_alerts_set:
+    if not is_web_alert and not is_heartbeat and current_alerts_set == last_alerts_set:
         # It's a Python alert, and nothing has changed.
-        # We just return "success" without flooding the database.
-        return jsonify({"status": "success", "message": "Data received, no change"}), 200
+        # We just return without flooding the database.
+        metrics.INGEST_EVENTS.inc(("deduplicated",))
+        return None, None
 
     # If we are here, it's either a web alert or a *new* Python alert.
     # We must write it to the database.
     
-    # Update the cache with the new state
-    SESSION_LAST_ALERTS[session_id] = current_alerts_set
-    
     # --- End of new logic ---
 
     if is_web_alert:
-        metrics = {"source": "web"}
+        event_metrics = {"source": "web"}
         timestamp = datetime.utcnow().isoformat() + "Z"
     else:
-        metrics = data.get('metrics', {})
-        timestamp = data.get('timestamp')
+        event_metrics = data.get('metrics', {})
+        # A missing timestamp would fail the whole batch transaction it lands in
+        timestamp = timestamp or datetime.utcnow().isoformat() + "Z"
 
-    score = calculate_integrity_score(current_alerts_list)
+    # One pass gives both the score and the alert categories stored in event_alerts
+    score, classified_alerts = score_alerts(current_alerts_list)
     alerts_json = json.dumps(current_alerts_list)
-    metrics_json = json.dumps(metrics)
+    metrics_json = json.dumps(event_metrics)
 
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
-    
-    sql = "INSERT INTO events (student_id, session_id, timestamp, alerts, metrics, integrity_score) VALUES (?, ?, ?, ?, ?, ?)"
-    cursor.execute(sql, (student_id, session_id, timestamp, alerts_json, metrics_json, score))
-    conn.commit()
-    conn.close()
-    
     # If the alerts list is now empty, it means this was an "all clear" event.
     # We can clear the session from our cache to save memory.
     if not current_alerts_list:
         SESSION_LAST_ALERTS.pop(session_id, None)
+
+    # Alerts and metrics are also stored normalized (see alert_store.py)
+    row = (student_id, session_id, timestamp, alerts_json, metrics_json, score) + typed_metrics(event_metrics)
+    metrics.INGEST_EVENTS.inc(("accepted",))
+    return None, (row, classified_alerts)
+
+
+def _forget_sessions(pending):
+    # The writer failed: drop the cached state so a client retry is written again, not deduplicated
+    for row, _ in pending:
+        SESSION_LAST_ALERTS.pop(row[1], None)
+
+
+# Also covers 'batched' durability, where the request has returned before the batch is written
+EVENT_WRITER.add_failure_listener(_forget_sessions)
+
+
+@app.route('/log_data', methods=['POST'])
+def log_data():
+    data = request.json
+    error, pending = _prepare_event(data)
+    if error:
+        return jsonify({"status": "error", "message": error}), 400
+    if pending is None:
+        return jsonify({"status": "success", "message": "Data received, no change"}), 200
+
+    # Hand the row to the batched writer instead of committing per request
+    if not EVENT_WRITER.submit(*pending):
+        return jsonify({"status": "error", "message": "Could not persist event"}), 503
         
     return jsonify({"status": "success", "message": "Data logged"}), 200
 
+
+def _batch_size_error(content_length):
+    """Rejects a /log_batch body by its declared length, before any of it is read."""
+    if content_length is not None and content_length > MAX_BATCH_BYTES:
+        return BATCH_TOO_LARGE
+    return None
+
+
+def _decode_batch(raw, content_encoding):
+    """
+    Parses a /log_batch body: {"events": [payload, ...]} or a bare list, optionally gzip-compressed.
+    Returns (events, error) where error is a (message, http_status) pair.
+    """
+    if content_encoding.lower() == 'gzip':
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            raw = decompressor.decompress(raw, MAX_BATCH_BYTES)
+        except zlib.error:
+            return None, ("Invalid gzip body", 400)
+        if decompressor.unconsumed_tail:
+            return None, BATCH_TOO_LARGE
+    try:
+        body = json.loads(raw)
+    except ValueError:
+        return None, ("Invalid JSON body", 400)
+    events = body.get('events') if isinstance(body, dict) else body
+    if not isinstance(events, list):
+        return None, ("Expected a list of events", 400)
+    return events, None
+
+
+def _prepare_batch(events):
+    """Runs _prepare_event over a batch; returns (pending, unchanged, rejected)."""
+    pending, unchanged, rejected = [], 0, 0
+    for data in events:
+        if not isinstance(data, dict):
+            metrics.INGEST_EVENTS.inc(("rejected",))
+            rejected += 1
+            continue
+        error, item = _prepare_event(data)
+        if error:
+            rejected += 1
+        elif item is None:
+            unchanged += 1
+        else:
+            pending.append(item)
+    return pending, unchanged, rejected
+
+
+@app.route('/log_batch', methods=['POST'])
+def log_batch():
+    # Batched agent uploads: {"events": [payload, ...]}, optionally gzip-compressed
+    error = _batch_size_error(request.content_length)
+    if error is None:
+        # Bounded read: a body without a Content-Length can't exceed the limit either
+        raw = request.stream.read(MAX_BATCH_BYTES + 1)
+        if len(raw) > MAX_BATCH_BYTES:
+            error = BATCH_TOO_LARGE
+        else:
+            events, error = _decode_batch(raw, request.headers.get('Content-Encoding', ''))
+    if error:
+        message, status = error
+        return jsonify({"status": "error", "message": message}), status
+
+    pending, unchanged, rejected = _prepare_batch(events)
+    if pending and not EVENT_WRITER.submit_many(pending):
+        return jsonify({"status": "error", "message": "Could not persist events"}), 503
+
+    return jsonify({"status": "success", "logged": len(pending), "unchanged": unchanged, "rejected": rejected}), 200
+
 # ===================================================
 # 🔹 REPORTING ENDPOINTS (Unchanged) 🔹
 # ===================================================
 @app.route('/get_sessions/<student_id>', methods=['GET'])
 def get_sessions(student_id):
-    # ... (endpoint is unchanged) ...
-    conn = sqlite3.connect(DATABASE_FILE)
+    conn = get_db()
     cursor = conn.cursor()
-    cursor.execute("SELECT DISTINCT session_id FROM events WHERE student_id = ? ORDER BY session_id DESC", (student_id,))
+    cursor.execute("SELECT session_id FROM sessions WHERE student_id = ? ORDER BY session_id DESC", (student_id,))
     sessions = [row[0] for row in cursor.fetchall()]
-    conn.close()
     return jsonify(sessions)
 
 @app.route('/get_data/<student_id>/<session_id>', methods=['GET'])
 def get_data(student_id, session_id):
     # ... (endpoint is unchanged) ...
-    conn = sqlite3.connect(DATABASE_FILE)
-    conn.row_factory = sqlite3.Row
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM events WHERE student_id = ? AND session_id = ? ORDER BY timestamp DESC", (student_id, session_id))
     rows = [dict(row) for row in cursor.fetchall()]
-    conn.close()
     return jsonify(rows)
 
-@app.route('/generate_report/<student_id>/<session_id>', methods=['GET'])
-def download_report(student_id, session_id):
+# ===================================================
+# 🔹 REPORT ENDPOINTS 🔹
+# ===================================================
+
+def _submit_report(student_id, session_id):
     # Clean up the cache for this session, as it's now considered "over"
     SESSION_LAST_ALERTS.pop(session_id, None)
+    # Make sure queued events for this session are on disk before reading them
+    EVENT_WRITER.flush()
+    return REPORT_JOBS.submit(student_id, session_id)
+
+
+def _job_response(state):
+    job_id = state['job_id']
+    body = dict(state,
+                status_url=f"/api/reports/jobs/{job_id}",
+                download_url=f"/api/reports/jobs/{job_id}/download")
+    return jsonify(body), (202 if state['status'] == 'pending' else 200)
+
+
+def _send_report(state):
+    return send_file(
+        REPORT_JOBS.artifact_path(state['job_id']),
+        as_attachment=True,
+        download_name=f"Report_{state['student_id']}_{state['session_id']}.pdf"  # Keep the user-friendly name
+    )
+
+
+@app.route('/api/reports/<student_id>/<session_id>', methods=['POST'])
+def submit_report(student_id, session_id):
+    state = _submit_report(student_id, session_id)
+    if state is None:
+        return jsonify({"status": "error", "message": "No data for this session."}), 404
+    return _job_response(state)
+
+
+@app.route('/api/reports/jobs/<job_id>', methods=['GET'])
+def report_job_status(job_id):
+    state = REPORT_JOBS.status(job_id)
+    if state is None:
+        return jsonify({"status": "error", "message": "Unknown report job."}), 404
+    return _job_response(state)
+
+
+@app.route('/api/reports/jobs/<job_id>/download', methods=['GET'])
+def download_report_job(job_id):
+    state = REPORT_JOBS.status(job_id)
+    if state is None:
+        return jsonify({"status": "error", "message": "Unknown report job."}), 404
+    if state['status'] != 'done':
+        return _job_response(state) if state['status'] == 'pending' else (jsonify(state), 500)
+    return _send_report(state)
+
+
+@app.route('/api/exams/<int:exam_id>/export', methods=['GET'])
+def export_exam_reports(exam_id):
+    # Every session's PDF plus summary.csv, rendered in parallel and streamed as one ZIP
+    EVENT_WRITER.flush()
+    conn = get_db()
+    sessions = exam_sessions(conn, exam_id)
+    if not sessions:
+        return jsonify({"status": "error", "message": "No sessions recorded for this exam."}), 404
+    durations = alert_durations(conn, exam_id)
+    for session in sessions:
+        SESSION_LAST_ALERTS.pop(session['session_id'], None)
+    return Response(
+        stream_exam_archive(REPORT_JOBS, sessions, durations, EXPORT_TIMEOUT),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename=Exam_{exam_id}_reports.zip'},
+    )
 
-    # ✨ MODIFIED: Use a more robust temporary path
-    # Create a unique filename in a 'temp' subdirectory (if it doesn't exist)
-    temp_dir = os.path.join(os.path.dirname(__file__), 'temp_reports')
-    os.makedirs(temp_dir, exist_ok=True)
-    report_filename = f"Report_{student_id}_{session_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
-    report_path = os.path.join(temp_dir, report_filename)
-
-    print(f"Generating report at: {report_path}") # Debug print
-
-    generated_file_path = generate_report(student_id, session_id, report_path)
-
-    if generated_file_path:
-        # ✨ NEW: Use after_this_request for reliable cleanup
-        @after_this_request
-        def remove_file(response):
-            try:
-                print(f"Attempting to remove temporary file: {generated_file_path}") # Debug print
-                os.remove(generated_file_path)
-                print(f"Successfully removed: {generated_file_path}") # Debug print
-            except Exception as error:
-                app.logger.error(f"Error removing or closing downloaded file handle: {error}")
-            return response
-
-        # Send the file
-        return send_file(
-            generated_file_path,
-            as_attachment=True,
-            download_name=f"Report_{student_id}_{session_id}.pdf" # Keep the user-friendly name
-        )
-    else:
+
+@app.route('/generate_report/<student_id>/<session_id>', methods=['GET'])
+def download_report(student_id, session_id):
+    # Legacy one-shot download: same job queue and cache, waiting for the render
+    state = _submit_report(student_id, session_id)
+    if state is None:
         return "Could not generate report: No data for this session.", 404
+    state = REPORT_JOBS.wait(state['job_id'], REPORT_SYNC_TIMEOUT)
+    if state is None or state['status'] == 'failed':
+        return "Could not generate report.", 500
+    if state['status'] == 'pending':
+        return _job_response(state)
+    return _send_report(state)
 
 if __name__ == '__main__':
     init_db()
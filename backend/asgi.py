@@ -0,0 +1,154 @@
+"""
+ASGI server mode: asyncio ingestion and live push, Flask for everything else.
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000 --workers 1 \
+        --limit-concurrency 12000 --timeout-keep-alive 30
+
+/log_data, /log_batch and the live SSE feed run as coroutines on one event
+loop, so an idle agent connection costs a socket and a small coroutine
+instead of a pinned worker thread. Ingested events go to the same single
+writer as in WSGI mode (EVENT_WRITER in app.py): the loop hands rows over
+without blocking, waits for commits via futures in 'sync' durability, and
+gets backpressure off-loop when the queue is full. One process also means
+the live feed sees every event. All other routes are the unchanged Flask app,
+mounted through a2wsgi and served from its thread pool.
+
+Memory stays predictable through the bounded ingest queue
+(INGEST_MAX_PENDING), the capped request concurrency (--limit-concurrency),
+MAX_BATCH_BYTES and the bounded live buffers. Use the default "memory"
+SESSION_CACHE_BACKEND here: with one process there is nothing to share.
+"""
+
+import asyncio
+import functools
+import time
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+import metrics
+from app import (
+    app as flask_app, init_db, EVENT_WRITER, LIVE_FEED, REPORT_JOBS,
+    BATCH_TOO_LARGE, MAX_BATCH_BYTES,
+    _batch_size_error, _decode_batch, _prepare_batch, _prepare_event,
+)
+
+# The Flask app answers CORS itself (flask_cors); the async routes do the same by hand
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type, Content-Encoding",
+}
+
+
+def _json(body, status=200):
+    return JSONResponse(body, status_code=status, headers=CORS_HEADERS)
+
+
+def _preflight():
+    return Response(status_code=204, headers=CORS_HEADERS)
+
+
+def _timed(route):
+    """Records the async routes in the same latency histogram as the Flask ones (see metrics.py)."""
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(request):
+            start = time.perf_counter()
+            response = await handler(request)
+            metrics.observe_request(request.method, route, response.status_code, time.perf_counter() - start)
+            return response
+        return wrapper
+    return decorator
+
+
+@_timed("/log_data")
+async def log_data(request):
+    if request.method == "OPTIONS":
+        return _preflight()
+    try:
+        data = await request.json()
+    except ValueError:
+        return _json({"status": "error", "message": "Invalid JSON body"}, 400)
+    if not isinstance(data, dict):
+        return _json({"status": "error", "message": "Expected a JSON object"}, 400)
+    error, pending = _prepare_event(data)
+    if error:
+        return _json({"status": "error", "message": error}, 400)
+    if pending is None:
+        return _json({"status": "success", "message": "Data received, no change"})
+    if not await EVENT_WRITER.submit_many_async([pending]):
+        return _json({"status": "error", "message": "Could not persist event"}, 503)
+    return _json({"status": "success", "message": "Data logged"})
+
+
+async def _read_limited(request):
+    """The request body, or BATCH_TOO_LARGE as soon as it (declared or streamed) exceeds MAX_BATCH_BYTES."""
+    try:
+        declared = int(request.headers["content-length"])
+    except (KeyError, ValueError):
+        declared = None
+    error = _batch_size_error(declared)
+    if error:
+        return error
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > MAX_BATCH_BYTES:
+            return BATCH_TOO_LARGE
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+@_timed("/log_batch")
+async def log_batch(request):
+    if request.method == "OPTIONS":
+        return _preflight()
+    raw = await _read_limited(request)
+    if isinstance(raw, tuple):
+        events, error = None, raw
+    else:
+        events, error = _decode_batch(raw, request.headers.get("content-encoding", ""))
+    if error:
+        message, status = error
+        return _json({"status": "error", "message": message}, status)
+    pending, unchanged, rejected = _prepare_batch(events)
+    if pending and not await EVENT_WRITER.submit_many_async(pending):
+        return _json({"status": "error", "message": "Could not persist events"}, 503)
+    return _json({"status": "success", "logged": len(pending), "unchanged": unchanged, "rejected": rejected})
+
+
+@_timed("/api/exams/<int:exam_id>/live")
+async def live_exam_feed(request):
+    subscription = LIVE_FEED.subscribe(request.path_params["exam_id"])
+    if subscription is None:
+        return _json({"status": "error", "message": "Too many live subscribers."}, 503)
+    return StreamingResponse(
+        LIVE_FEED.stream_async(subscription),
+        media_type="text/event-stream",
+        headers=dict(CORS_HEADERS, **{"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}),
+    )
+
+
+@asynccontextmanager
+async def lifespan(_):
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, init_db)
+    yield
+    # Commit whatever is still queued before the process exits
+    await loop.run_in_executor(None, EVENT_WRITER.stop)
+    REPORT_JOBS.shutdown()
+
+
+application = Starlette(
+    routes=[
+        Route("/log_data", log_data, methods=["POST", "OPTIONS"]),
+        Route("/log_batch", log_batch, methods=["POST", "OPTIONS"]),
+        Route("/api/exams/{exam_id:int}/live", live_exam_feed, methods=["GET"]),
+        Mount("/", app=WSGIMiddleware(flask_app)),
+    ],
+    lifespan=lifespan,
+)
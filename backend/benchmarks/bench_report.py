@@ -0,0 +1,97 @@
+"""
+Benchmark: PDF report generation time and peak Python memory vs. session size.
+
+Run from the backend directory:
+    python benchmarks/bench_report.py [--sizes 10000 100000 1000000]
+
+Each size gets one synthetic session in a throwaway database: one event per
+agent frame, alerts changing every `--run-length` events on average, so the
+timeline stays realistic while the events table grows.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+WORK_DIR = tempfile.mkdtemp(prefix="bench_report_")
+# db.py reads DATABASE_FILE at import time
+os.environ["DATABASE_FILE"] = os.path.join(WORK_DIR, "bench.db")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import connect  # noqa: E402
+from ingest import EventWriter  # noqa: E402
+from migrations import migrate  # noqa: E402
+from report_generator import generate_report  # noqa: E402
+from scoring import score_alerts  # noqa: E402
+
+ALERT_STATES = [
+    [],
+    ["CELL PHONE detected!"],
+    ["Looking Away!"],
+    ["Multiple persons detected!", "Someone is talking!"],
+    ["No person detected!"],
+]
+
+
+def seed_session(student_id, session_id, n, run_length, seed=7):
+    """Writes the session through the ingest batch path, so the summary tables are filled too."""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    # 'sync': submit_many waits for the commits and reports whether every batch made it
+    writer = EventWriter(os.environ["DATABASE_FILE"], batch_size=10000, durability="sync", max_pending=10000)
+    alerts = []
+    batch = []
+    for i in range(n):
+        if rng.random() < 1.0 / run_length:
+            alerts = rng.choice(ALERT_STATES)
+        timestamp = (start + timedelta(milliseconds=33 * i)).isoformat().replace("+00:00", "Z")
+        score, classified = score_alerts(alerts)
+        batch.append(((
+            student_id, session_id, timestamp,
+            '["' + '", "'.join(alerts) + '"]' if alerts else "[]",
+            '{"count": 1}', score,
+            1, rng.random() * 0.05, i // 90, rng.randint(1, 5),
+        ), classified))
+        if len(batch) == writer.batch_size or i == n - 1:
+            assert writer.submit_many(batch), "seeding failed"
+            batch = []
+    writer.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--run-length', type=int, default=300, help="Mean events between alert changes")
+    args = parser.parse_args()
+
+    try:
+        conn = connect()
+        migrate(conn)
+        print(f"{'events':>10} {'seconds':>9} {'peak MiB':>9} {'PDF KiB':>8}")
+        for n in args.sizes:
+            session_id = f"exam_1_bench_{n}"
+            seed_session("bench", session_id, n, args.run_length)
+            output = os.path.join(WORK_DIR, f"{session_id}.pdf")
+            start = time.perf_counter()
+            assert generate_report("bench", session_id, output) == output
+            seconds = time.perf_counter() - start
+            # Second run for memory only: tracemalloc slows allocation-heavy code a lot
+            tracemalloc.start()
+            generate_report("bench", session_id, output)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{n:>10} {seconds:>9.2f} {peak / 2**20:>9.1f} {os.path.getsize(output) / 1024:>8.0f}")
+        conn.close()
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,352 @@
+"""
+Load generator and benchmark harness for the backend.
+
+Run from the backend directory:
+    python benchmarks/loadgen.py --sessions 200 --seed-events 1000000 --output results.json
+    python benchmarks/loadgen.py --url http://127.0.0.1:5000 --sessions 50
+
+Phases:
+1. setup:  registers an admin, one student per session, an exam and the assignments;
+2. seed:   writes --seed-events historical events through the ingest batch path,
+           so the summary tables are filled exactly as in production;
+3. ingest: agents post transitions and heartbeats to /log_data (or gzip batches
+           to /log_batch with --batch) from --concurrency threads;
+4. reads:  /api/exam_sessions, /get_data and /generate_report.
+
+Traffic: every session alternates between alert states drawn from
+ALERT_WEIGHTS (plus "VOICE: ..." transcripts), changing state with
+probability --transition-rate per event, heartbeats otherwise.
+
+By default the app runs in-process (Flask test client) against a throwaway
+database, or --database. With --url the endpoints of a running server are
+driven over HTTP instead; seeding then needs --database pointing at the
+server's file. Results (throughput, p50/p95/p99/max latency per endpoint,
+database size after each phase) are printed and written as JSON to --output
+for regression tracking.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = "can you tell me the answer to question four please what is the capital of".split()
+
+
+# ===================================================
+# 🔹 Traffic synthesis 🔹
+# ===================================================
+
+class AgentSim:
+    """One simulated client agent: a session that moves between alert states."""
+
+    def __init__(self, student, session_id, rng, alert_keys, transition_rate):
+        self.student = student
+        self.session_id = session_id
+        self.rng = rng
+        self.alert_keys = alert_keys
+        self.transition_rate = transition_rate
+        self.alerts = []
+        self.clock = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        self.blinks = 0
+
+    def _random_alerts(self):
+        alerts = self.rng.sample(self.alert_keys, self.rng.choice([0, 0, 1, 1, 2]))
+        if "VOICE:" in alerts:
+            alerts.remove("VOICE:")
+            alerts.append("VOICE: " + " ".join(self.rng.choices(WORDS, k=self.rng.randint(3, 12))))
+        return alerts
+
+    def next_payload(self):
+        self.clock += timedelta(seconds=self.rng.uniform(0.5, 10.0))
+        self.blinks += self.rng.randint(0, 3)
+        kind = "heartbeat"
+        if self.rng.random() < self.transition_rate:
+            self.alerts = self._random_alerts()
+            kind = "transition"
+        return {
+            "student_id": self.student,
+            "session_id": self.session_id,
+            "timestamp": self.clock.isoformat().replace("+00:00", "Z"),
+            "kind": kind,
+            "alerts": self.alerts,
+            "metrics": {
+                "count": 1,
+                "eye_velocity": round(self.rng.random() * 0.05, 4),
+                "total_blinks": self.blinks,
+                "emotion": self.rng.choice(["Neutral", "Neutral", "Happy", "Sad", "Surprised"]),
+            },
+        }
+
+
+# ===================================================
+# 🔹 Clients 🔹
+# ===================================================
+
+class InProcessClient:
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self._local = threading.local()
+
+    def request(self, method, path, json_body=None, data=None, headers=None):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.flask_app.test_client()
+        response = client.open(path, method=method, json=json_body, data=data, headers=headers)
+        response.get_data()  # Drain streamed bodies (PDFs) like a real client would
+        return response.status_code, response
+
+
+class HttpClient:
+    def __init__(self, base_url):
+        import requests
+        self.requests = requests
+        self.base_url = base_url.rstrip("/")
+        self._local = threading.local()
+
+    def request(self, method, path, json_body=None, data=None, headers=None):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = self.requests.Session()
+        try:
+            response = session.request(method, self.base_url + path, json=json_body, data=data,
+                                       headers=headers, timeout=300)
+        except self.requests.RequestException:
+            return 0, None
+        return response.status_code, response
+
+
+def _json(response):
+    return response.get_json() if hasattr(response, "get_json") else response.json()
+
+
+# ===================================================
+# 🔹 Measurement 🔹
+# ===================================================
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def run_phase(name, calls, concurrency):
+    """Runs zero-argument callables returning an HTTP status; returns the phase summary dict."""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def timed(call):
+        nonlocal errors
+        start = time.perf_counter()
+        status = call()
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if not 200 <= status < 300:
+                errors += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, calls))
+    seconds = time.perf_counter() - start
+    latencies.sort()
+    ms = lambda value: round(value * 1000, 3) if value is not None else None  # noqa: E731
+    return {
+        "endpoint": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "throughput_rps": round(len(latencies) / seconds, 1) if seconds else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(latencies[-1] if latencies else None),
+    }
+
+
+def db_bytes(path):
+    """Bytes used by the database pages, including those still in the WAL (file sizes lag behind)."""
+    if not path or not os.path.exists(path):
+        return None
+    conn = sqlite3.connect(path)
+    try:
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        return page_count * conn.execute("PRAGMA page_size").fetchone()[0]
+    finally:
+        conn.close()
+
+
+# ===================================================
+# 🔹 Phases 🔹
+# ===================================================
+
+def setup(client, sessions):
+    client.request("POST", "/register", {"username": "loadgen_admin", "password": "p", "role": "admin"})
+    status, response = client.request("POST", "/login", {"username": "loadgen_admin", "password": "p"})
+    admin_id = _json(response)["user"]["id"] if status == 200 else 1
+    title = f"loadgen {datetime.now(timezone.utc).isoformat()}"
+    client.request("POST", "/api/exams", {"title": title, "admin_id": admin_id})
+    _, response = client.request("GET", "/api/exams")
+    exam_id = next(exam["id"] for exam in _json(response) if exam["title"] == title)
+    students = []
+    for i in range(sessions):
+        username = f"loadgen_{exam_id}_{i}"
+        client.request("POST", "/register", {"username": username, "password": "p", "role": "student"})
+        _, response = client.request("POST", "/login", {"username": username, "password": "p"})
+        client.request("POST", "/api/assign", {"exam_id": exam_id, "student_id": _json(response)["user"]["id"]})
+        students.append(username)
+    return exam_id, students
+
+
+def seed(database_file, agents, events):
+    """Writes `events` historical events, round-robin over the agents, through the ingest batch path."""
+    from alert_store import typed_metrics
+    from ingest import EventWriter
+    from scoring import score_alerts
+
+    # 'sync': submit_many waits for the commits and reports whether every batch made it
+    writer = EventWriter(database_file, batch_size=5000, durability="sync")
+    batch = []
+    try:
+        for i in range(events):
+            payload = agents[i % len(agents)].next_payload()
+            score, classified = score_alerts(payload["alerts"])
+            row = (payload["student_id"], payload["session_id"], payload["timestamp"],
+                   json.dumps(payload["alerts"]), json.dumps(payload["metrics"]), score) + typed_metrics(payload["metrics"])
+            batch.append((row, classified))
+            if len(batch) == writer.batch_size or i == events - 1:
+                if not writer.submit_many(batch):
+                    sys.exit(f"Seeding failed after {i + 1 - len(batch)} of {events} events")
+                batch = []
+    finally:
+        writer.stop()
+
+
+def ingest_calls(client, agents, requests_count, batch_size):
+    calls = []
+    if batch_size <= 1:
+        for i in range(requests_count):
+            payload = agents[i % len(agents)].next_payload()
+            calls.append(lambda payload=payload: client.request("POST", "/log_data", payload)[0])
+        return calls
+    for i in range(requests_count):
+        agent = agents[i % len(agents)]
+        body = gzip.compress(json.dumps({"events": [agent.next_payload() for _ in range(batch_size)]}).encode())
+        headers = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+        calls.append(lambda body=body: client.request("POST", "/log_batch", data=body, headers=headers)[0])
+    return calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', type=str, default=None, help="Drive a running server instead of the in-process app")
+    parser.add_argument('--database', type=str, default=None, help="SQLite file (default: a throwaway one)")
+    parser.add_argument('--sessions', type=int, default=100, help="Concurrent exam sessions (one student each)")
+    parser.add_argument('--seed-events', type=int, default=100000, help="Historical events written before the run")
+    parser.add_argument('--requests', type=int, default=5000, help="Ingest requests in the ingest phase")
+    parser.add_argument('--batch', type=int, default=1, help="Events per request; >1 posts gzip batches to /log_batch")
+    parser.add_argument('--transition-rate', type=float, default=0.2, help="Share of events that change alerts")
+    parser.add_argument('--concurrency', type=int, default=16, help="Client threads")
+    parser.add_argument('--reads', type=int, default=200, help="Requests per read endpoint")
+    parser.add_argument('--reports', type=int, default=10, help="Report downloads")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', type=str, default=None, help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    work_dir = None
+    database_file = args.database
+    if database_file is None and args.url is None:
+        work_dir = tempfile.mkdtemp(prefix="loadgen_")
+        database_file = os.path.join(work_dir, "loadgen.db")
+    if database_file:
+        # db.py reads DATABASE_FILE at import time
+        os.environ["DATABASE_FILE"] = database_file
+    if work_dir:
+        os.environ.setdefault("REPORT_CACHE_DIR", os.path.join(work_dir, "report_cache"))
+
+    from scoring import ALERT_WEIGHTS
+
+    try:
+        if args.url:
+            client = HttpClient(args.url)
+        else:
+            import app as backend
+            backend.init_db()
+            client = InProcessClient(backend.app)
+
+        rng = random.Random(args.seed)
+        results = {
+            "config": vars(args),
+            "python": platform.python_version(),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "phases": [],
+            "db_bytes": {"start": db_bytes(database_file)},
+        }
+
+        exam_id, students = setup(client, args.sessions)
+        agents = [
+            AgentSim(student, f"exam_{exam_id}_{student}_loadgen", random.Random(rng.random()),
+                     list(ALERT_WEIGHTS), args.transition_rate)
+            for student in students
+        ]
+
+        if args.seed_events and database_file:
+            start = time.perf_counter()
+            seed(database_file, agents, args.seed_events)
+            results["seed_seconds"] = round(time.perf_counter() - start, 3)
+            results["db_bytes"]["seeded"] = db_bytes(database_file)
+
+        endpoint = "/log_batch" if args.batch > 1 else "/log_data"
+        results["phases"].append(run_phase(
+            endpoint, ingest_calls(client, agents, args.requests, args.batch), args.concurrency))
+        if not args.url:
+            backend.EVENT_WRITER.flush()
+        results["db_bytes"]["ingested"] = db_bytes(database_file)
+
+        results["phases"].append(run_phase("/api/exam_sessions", [
+            lambda: client.request("GET", f"/api/exam_sessions/{exam_id}")[0] for _ in range(args.reads)
+        ], args.concurrency))
+        picks = [rng.choice(agents) for _ in range(args.reads)]
+        results["phases"].append(run_phase("/get_data", [
+            lambda agent=agent: client.request("GET", f"/get_data/{agent.student}/{agent.session_id}")[0]
+            for agent in picks
+        ], args.concurrency))
+        report_agents = [agents[i % len(agents)] for i in range(args.reports)]
+        results["phases"].append(run_phase("/generate_report", [
+            lambda agent=agent: client.request("GET", f"/generate_report/{agent.student}/{agent.session_id}")[0]
+            for agent in report_agents
+        ], args.concurrency))
+        results["db_bytes"]["end"] = db_bytes(database_file)
+
+        print(f"{'endpoint':<22} {'reqs':>7} {'errs':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for phase in results["phases"]:
+            print(f"{phase['endpoint']:<22} {phase['requests']:>7} {phase['errors']:>5} {phase['throughput_rps']:>9} "
+                  f"{phase['p50_ms']:>9} {phase['p95_ms']:>9} {phase['p99_ms']:>9}")
+        print("DB bytes:", results["db_bytes"])
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+        if not args.url:
+            backend.EVENT_WRITER.stop()
+            backend.REPORT_JOBS.shutdown()
+    finally:
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""
+Shared SQLite connection layer for the backend.
+
+Every endpoint, the report generator and the ingest writer get their
+connections from here, so they all run with the same settings:
+- WAL journal mode, so admin dashboard reads don't block agent ingestion
+  (and vice versa) while a batch is being committed.
+- Tuned pragmas (synchronous, cache_size, mmap_size, busy_timeout).
+- A per-process pool of open connections, each with a large prepared
+  statement cache, so hot queries are parsed once per connection instead
+  of once per request.
+
+Knobs (environment variables):
+  DATABASE_FILE          path to the SQLite file (default 'proctoring_data.db')
+  SQLITE_POOL_SIZE       idle connections kept per process (default 8)
+  SQLITE_BUSY_TIMEOUT_MS how long to wait on a locked database (default 5000)
+  SQLITE_SYNCHRONOUS     NORMAL (default, safe with WAL) or FULL
+  SQLITE_CACHE_KB        page cache per connection in KiB (default 20000)
+  SQLITE_MMAP_BYTES      memory-mapped I/O size (default 256 MiB)
+
+Statement timings go to metrics.py unless METRICS_DB_TIMING=0.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+
+DATABASE_FILE = os.environ.get("DATABASE_FILE", "proctoring_data.db")
+
+POOL_SIZE = int(os.environ.get("SQLITE_POOL_SIZE", 8))
+BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
+SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL").upper()
+CACHE_KB = int(os.environ.get("SQLITE_CACHE_KB", 20000))
+MMAP_BYTES = int(os.environ.get("SQLITE_MMAP_BYTES", 256 * 1024 * 1024))
+STATEMENT_CACHE_SIZE = 256
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Reports execute and fetch times to metrics.py."""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            metrics.observe_query(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            metrics.observe_query(sql, time.perf_counter() - start)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            metrics.observe_fetch(time.perf_counter() - start)
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            metrics.observe_fetch(time.perf_counter() - start)
+
+    def fetchall(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            metrics.observe_fetch(time.perf_counter() - start)
+
+
+class TimedConnection(sqlite3.Connection):
+    """A connection whose cursors, including the conn.execute() shortcuts, are TimedCursors."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connect(database_file=None):
+    """Opens a new connection with the shared pragmas applied."""
+    conn = sqlite3.connect(
+        database_file or DATABASE_FILE,
+        timeout=BUSY_TIMEOUT_MS / 1000.0,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        # Pooled connections are handed between request threads, never shared concurrently
+        check_same_thread=False,
+        factory=TimedConnection if metrics.DB_TIMING else sqlite3.Connection,
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA synchronous={SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_KB}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_BYTES}")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+class ConnectionPool:
+    """A small per-process pool. Connections are never carried across fork()."""
+
+    def __init__(self, database_file=None, size=POOL_SIZE):
+        self.database_file = database_file
+        self.size = size
+        self._lock = threading.Lock()
+        self._idle = []
+        self._pid = os.getpid()
+
+    def acquire(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked worker: the parent's connections are not safe to use here
+                self._idle = []
+                self._pid = os.getpid()
+            if self._idle:
+                return self._idle.pop()
+        return connect(self.database_file)
+
+    def release(self, conn):
+        if conn.in_transaction:
+            # Endpoints that returned early without committing
+            conn.rollback()
+        with self._lock:
+            if self._pid == os.getpid() and len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+POOL = ConnectionPool()
+
+
+@contextmanager
+def connection():
+    """Borrows a pooled connection for the duration of a `with` block."""
+    conn = POOL.acquire()
+    try:
+        yield conn
+    finally:
+        POOL.release(conn)
+
+
+# --- Flask integration ---
+
+def get_db():
+    """Returns the pooled connection bound to the current Flask request."""
+    from flask import g
+    if "db_conn" not in g:
+        g.db_conn = POOL.acquire()
+    return g.db_conn
+
+
+def release_db(exception=None):
+    """teardown_appcontext hook: hands the request's connection back to the pool."""
+    from flask import g
+    conn = g.pop("db_conn", None)
+    if conn is not None:
+        POOL.release(conn)
@@ -0,0 +1,145 @@
+"""
+Exam-wide report export as one streamed ZIP archive.
+
+Every session of the exam is submitted to the report job pool at once (so
+PDFs render in parallel, and sessions already in the report cache cost
+nothing), then each PDF is added to the archive as soon as it is ready. The
+archive is written to an unseekable stream, so the response starts right
+away and memory stays at roughly one read buffer regardless of exam size.
+A `summary.csv` with scores and per-type alert entries/durations closes the archive.
+"""
+
+import csv
+import io
+import re
+import time
+import zipfile
+
+COPY_CHUNK_SIZE = 64 * 1024
+
+SAFE_NAME_RE = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def exam_sessions(conn, exam_id):
+    """Sessions of the exam's assigned students, with their summary columns."""
+    return [dict(row) for row in conn.execute("""
+        SELECT s.student_id, s.session_id, s.start_time, s.end_time,
+               s.event_count, s.final_score, s.mean_score, s.min_score, s.max_score
+        FROM sessions s
+        JOIN users u ON u.username = s.student_id
+        JOIN exam_assignments a ON a.student_id = u.id AND a.exam_id = s.exam_id
+        WHERE s.exam_id = ?
+        ORDER BY s.start_time
+    """, (exam_id,)).fetchall()]
+
+
+def alert_durations(conn, exam_id):
+    """{(student_id, session_id): {alert type: (entries, seconds)}}, read from the ingest-maintained aggregates."""
+    durations = {}
+    for student_id, session_id, name, occurrences, seconds in conn.execute("""
+        SELECT s.student_id, s.session_id, t.name, d.occurrences, d.seconds
+        FROM sessions s
+        JOIN session_alert_durations d ON d.session_id = s.session_id AND d.student_id = s.student_id
+        JOIN alert_types t ON t.id = d.alert_type_id
+        WHERE s.exam_id = ?
+    """, (exam_id,)):
+        durations.setdefault((student_id, session_id), {})[name] = (occurrences, seconds)
+    return durations
+
+
+class _ChunkStream:
+    """Write-only sink for ZipFile; it has no tell(), so zipfile streams with data descriptors."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _arcname(student_id, session_id):
+    return "reports/" + SAFE_NAME_RE.sub("_", f"Report_{student_id}_{session_id}") + ".pdf"
+
+
+def _summary_csv(sessions, durations, outcome):
+    alert_types = sorted({name for per_session in durations.values() for name in per_session})
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["student_id", "session_id", "start_time", "end_time", "event_count", "final_score",
+                     "mean_score", "min_score", "max_score", "report"]
+                    + [f"{name} ({unit})" for name in alert_types for unit in ("entries", "seconds")])
+    for s in sessions:
+        key = (s["student_id"], s["session_id"])
+        per_session = durations.get(key, {})
+        row = [
+            s["student_id"], s["session_id"], s["start_time"], s["end_time"], s["event_count"], s["final_score"],
+            round(s["mean_score"], 2) if s["mean_score"] is not None else "",
+            s["min_score"], s["max_score"], outcome.get(key, "missing"),
+        ]
+        for name in alert_types:
+            occurrences, seconds = per_session.get(name, (0, 0.0))
+            row += [occurrences, round(seconds, 1)]
+        writer.writerow(row)
+    return out.getvalue().encode("utf-8")
+
+
+def stream_exam_archive(jobs, sessions, durations, timeout):
+    """
+    Generator of ZIP bytes. `sessions` come from exam_sessions(); their reports are
+    submitted to `jobs` (a report_jobs.ReportJobs) and added in completion order.
+    Reports still rendering after `timeout` seconds are listed as "pending" in the summary.
+    """
+    sink = _ChunkStream()
+    outcome = {}
+    waiting = {}
+    for s in sessions:
+        key = (s["student_id"], s["session_id"])
+        state = jobs.submit(*key)
+        if state is None:
+            outcome[key] = "no data"
+        else:
+            waiting[state["job_id"]] = key
+
+    deadline = time.monotonic() + timeout
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        while waiting and time.monotonic() < deadline:
+            finished = [(job_id, state) for job_id, state in
+                        ((job_id, jobs.status(job_id)) for job_id in waiting)
+                        if state is None or state["status"] != "pending"]
+            if not finished:
+                time.sleep(0.05)
+                continue
+            for job_id, state in finished:
+                key = waiting.pop(job_id)
+                if state is None or state["status"] != "done":
+                    outcome[key] = "failed"
+                    continue
+                try:
+                    src = open(jobs.artifact_path(job_id), "rb")
+                except OSError:
+                    # Superseded by a newer render and pruned in between
+                    outcome[key] = "failed"
+                    continue
+                with src, archive.open(_arcname(*key), "w") as dest:
+                    while True:
+                        block = src.read(COPY_CHUNK_SIZE)
+                        if not block:
+                            break
+                        dest.write(block)
+                        data = sink.drain()
+                        if data:
+                            yield data
+                outcome[key] = "ok"
+        for key in waiting.values():
+            outcome[key] = "pending"
+        archive.writestr("summary.csv", _summary_csv(sessions, durations, outcome))
+    yield sink.drain()
@@ -0,0 +1,325 @@
+"""
+Batched event ingestion for the /log_data endpoint.
+
+Instead of opening a connection and committing once per request, validated
+events are queued in memory and a single background writer flushes them to
+the `events` table with `executemany` inside one transaction. A flush is
+triggered when `batch_size` events are pending or `flush_interval` seconds
+have passed since the first pending event, whichever comes first.
+
+Durability modes:
+- "batched": the request returns as soon as the event is queued. Up to
+  `flush_interval` seconds of events can be lost if the process crashes.
+- "sync":    the request waits until the batch containing its event has been
+  committed (group commit). Concurrent requests still share one fsync.
+
+A batch whose transaction fails on a bad event is retried one event at a
+time, so only the offending events are dropped (and reported to the
+failure listeners); the writer thread itself survives any error.
+"""
+
+import asyncio
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import metrics
+from db import connect
+from sessions import upsert_sessions
+from alert_store import AlertTypeCache, insert_event_alerts
+
+# Row layout accepted by EventWriter.submit (the typed metric columns come from alert_store.typed_metrics)
+INSERT_EVENT_SQL = (
+    "INSERT INTO events (student_id, session_id, timestamp, alerts, metrics, integrity_score, "
+    "face_count, eye_velocity, total_blinks, emotion_code) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+DURABILITY_MODES = ("batched", "sync")
+
+
+class _Ticket:
+    """Lets a 'sync' submitter wait for the commit of its batch."""
+    __slots__ = ("done", "ok", "callback")
+
+    def __init__(self, callback=None):
+        self.done = threading.Event()
+        self.ok = False
+        # Called from the writer thread with `ok`; used to wake asyncio submitters
+        self.callback = callback
+
+    def resolve(self, ok):
+        self.ok = ok
+        self.done.set()
+        if self.callback is not None:
+            self.callback(ok)
+
+
+class EventWriter:
+    def __init__(self, database_file, batch_size=200, flush_interval=0.5,
+                 durability="batched", max_pending=10000):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {DURABILITY_MODES}, got {durability!r}")
+        self.database_file = database_file
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.durability = durability
+        # Bounded so a stalled disk applies backpressure instead of eating memory
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._listeners = []
+        self._failure_listeners = []
+
+    # --- Public API ---
+
+    def add_listener(self, callback):
+        """
+        Registers callback(session_rows, transition_rows), called from the writer
+        thread after each committed batch (see sessions.upsert_sessions for the rows).
+        It must not block: it delays every later batch.
+        """
+        self._listeners.append(callback)
+
+    def add_failure_listener(self, callback):
+        """
+        Registers callback(items), called from the writer thread with the
+        (row, alerts) pairs that could not be written, in every durability
+        mode: 'batched' submitters have already returned, so this is the
+        only place that learns those events were dropped.
+        """
+        self._failure_listeners.append(callback)
+
+    def submit(self, row, alerts=()):
+        """
+        Queues one events row plus its classified alerts ([(category, detail), ...]).
+        Returns False if it could not be persisted ('sync' mode only).
+        """
+        self._ensure_started()
+        ticket = _Ticket() if self.durability == "sync" else None
+        self._queue.put(((row, alerts), ticket))
+        if ticket is None:
+            return True
+        ticket.done.wait()
+        return ticket.ok
+
+    def submit_many(self, items):
+        """Queues several (row, alerts) pairs; in 'sync' mode waits until all of them are committed."""
+        self._ensure_started()
+        tickets = []
+        for row, alerts in items:
+            ticket = _Ticket() if self.durability == "sync" else None
+            self._queue.put(((row, alerts), ticket))
+            if ticket is not None:
+                tickets.append(ticket)
+        ok = True
+        for ticket in tickets:
+            ticket.done.wait()
+            ok = ok and ticket.ok
+        return ok
+
+    async def submit_many_async(self, items):
+        """
+        submit_many for an asyncio event loop (see asgi.py): queues without
+        blocking the loop, and in 'sync' mode awaits the commit instead of
+        waiting on a thread event. The same single writer thread does the writes.
+        """
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for row, alerts in items:
+            ticket = None
+            if self.durability == "sync":
+                future = loop.create_future()
+                ticket = _Ticket(callback=lambda ok, future=future: loop.call_soon_threadsafe(_settle, future, ok))
+                futures.append(future)
+            try:
+                self._queue.put_nowait(((row, alerts), ticket))
+            except queue.Full:
+                # Backpressure: wait for room off the loop thread
+                await loop.run_in_executor(None, self._queue.put, ((row, alerts), ticket))
+        results = await asyncio.gather(*futures)
+        return all(results)
+
+    def flush(self):
+        """Blocks until everything queued so far has been written."""
+        self._ensure_started()
+        ticket = _Ticket()
+        self._queue.put((None, ticket))
+        ticket.done.wait()
+        return ticket.ok
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def alive(self):
+        """False once this process's writer thread has died; one that hasn't been started yet counts as alive."""
+        thread = self._thread
+        return thread is None or self._pid != os.getpid() or thread.is_alive()
+
+    def stop(self):
+        """Flushes outstanding events and stops the writer thread."""
+        with self._lock:
+            thread = self._thread
+            if thread is None or self._pid != os.getpid():
+                return
+        self._queue.put((None, None))
+        thread.join()
+        with self._lock:
+            self._thread = None
+
+    # --- Internals ---
+
+    def _ensure_started(self):
+        # Started lazily and per-process, so a pre-forking server (gunicorn)
+        # gives every worker its own writer thread and connection.
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        # A dedicated connection: the writer is the only long-lived writer in the process
+        conn = connect(self.database_file)
+        type_cache = AlertTypeCache()
+        try:
+            while True:
+                batch, tickets, stop = self._collect()
+                if batch or tickets:
+                    failed = self._write_batch(conn, type_cache, batch)
+                    for index, ticket in tickets:
+                        # A flush ticket (no index) reports on the whole batch
+                        ticket.resolve(not failed if index is None else index not in failed)
+                if stop:
+                    break
+        finally:
+            conn.close()
+
+    def _collect(self):
+        """
+        Waits for the first item, then gathers more until size or time triggers.
+        Returns (batch, tickets, stop); tickets are (index of their item in batch or None, ticket).
+        """
+        batch, tickets = [], []
+        item, ticket = self._queue.get()
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            if item is None and ticket is None:
+                # Shutdown sentinel: drain whatever is still queued
+                while True:
+                    try:
+                        item, ticket = self._queue.get_nowait()
+                    except queue.Empty:
+                        return batch, tickets, True
+                    if item is not None:
+                        batch.append(item)
+                    if ticket is not None:
+                        tickets.append((len(batch) - 1 if item is not None else None, ticket))
+            if item is not None:
+                batch.append(item)
+            if ticket is not None:
+                tickets.append((len(batch) - 1 if item is not None else None, ticket))
+                if item is None:
+                    # Explicit flush request: write now
+                    return batch, tickets, False
+            if len(batch) >= self.batch_size:
+                return batch, tickets, False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return batch, tickets, False
+            try:
+                item, ticket = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                return batch, tickets, False
+
+    def _write_batch(self, conn, type_cache, batch):
+        """
+        Writes a batch in one transaction. Returns {batch index: exception}
+        for the events that could not be written (empty when all were).
+        """
+        if not batch:
+            return {}
+        error = self._write(conn, type_cache, batch)
+        if error is None:
+            return {}
+        if len(batch) > 1 and not isinstance(error, sqlite3.OperationalError):
+            # A bad row (not a locked or full database, which every retry would hit too) must not
+            # take other sessions' events down with it: retry them one by one, keep what goes through
+            print(f"[Ingest] Failed to write batch of {len(batch)} events ({error}); retrying them one at a time")
+            failed = {}
+            for index, item in enumerate(batch):
+                row_error = self._write(conn, type_cache, [item])
+                if row_error is not None:
+                    print(f"[Ingest] Dropped event of session {item[0][1]!r}: {row_error}")
+                    failed[index] = row_error
+        else:
+            print(f"[Ingest] Failed to write batch of {len(batch)} events: {error}")
+            failed = dict.fromkeys(range(len(batch)), error)
+        metrics.INGEST_COMMITTED.inc(("failed",), len(failed))
+        dropped = [batch[index] for index in failed]
+        for callback in self._failure_listeners:
+            try:
+                callback(dropped)
+            except Exception as e:
+                print(f"[Ingest] Failure listener failed: {e}")
+        return failed
+
+    def _write(self, conn, type_cache, batch):
+        """One transaction for `batch`; returns None once committed, or the exception that rolled it back."""
+        rows = [row for row, _ in batch]
+        start = time.perf_counter()
+        try:
+            # IMMEDIATE: we hold the write lock for the whole batch, so the
+            # AUTOINCREMENT ids handed out by executemany are consecutive.
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(INSERT_EVENT_SQL, rows)
+            last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+            event_ids = range(last_id - len(rows) + 1, last_id + 1)
+            type_ids = insert_event_alerts(conn, type_cache, event_ids, [alerts for _, alerts in batch])
+            # Keep the per-session summary in step with the rows just written
+            session_rows, transition_rows = upsert_sessions(conn, rows, type_ids)
+            conn.commit()
+        except Exception as e:
+            # Not only sqlite3.Error: anything escaping here would kill the writer thread for good
+            try:
+                conn.rollback()
+            except sqlite3.Error as rollback_error:
+                print(f"[Ingest] Rollback failed: {rollback_error}")
+            # Alert types inserted by the rolled-back transaction are gone again
+            type_cache.clear()
+            return e
+        metrics.INGEST_BATCH_SECONDS.observe(time.perf_counter() - start)
+        metrics.INGEST_COMMITTED.inc(("ok",), len(rows))
+        for callback in self._listeners:
+            try:
+                callback(session_rows, transition_rows)
+            except Exception as e:
+                print(f"[Ingest] Batch listener failed: {e}")
+        return None
+
+
+def _settle(future, ok):
+    if not future.done():
+        future.set_result(ok)
+
+
+def create_event_writer(database_file):
+    """Builds the process-wide writer from INGEST_* environment variables and flushes it on exit."""
+    writer = EventWriter(
+        database_file,
+        batch_size=int(os.environ.get("INGEST_BATCH_SIZE", 200)),
+        flush_interval=float(os.environ.get("INGEST_FLUSH_INTERVAL", 0.5)),
+        durability=os.environ.get("INGEST_DURABILITY", "batched"),
+        max_pending=int(os.environ.get("INGEST_MAX_PENDING", 10000)),
+    )
+    atexit.register(writer.stop)
+    return writer
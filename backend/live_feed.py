@@ -0,0 +1,261 @@
+"""
+Live push channel for the admin dashboard (Server-Sent Events).
+
+The ingest writer hands every committed batch to LiveBroker.on_batch (see
+EventWriter.add_listener), which fans it out to the dashboards watching that
+exam:
+- "alert":   an event that changed a session's alert state (or a web alert);
+- "session": the session's updated summary (final score, event count, ...),
+             at most one per session per ingest batch;
+- "resync":  the subscriber fell behind and messages were dropped; the
+             dashboard should re-fetch /api/exam_sessions once.
+Everything comes from rows the writer already has in memory. The only query
+is the list of students assigned to each watched exam (the same filter as
+/api/exam_sessions), loaded on subscribe and again every LIVE_ASSIGNMENT_TTL
+seconds or after an assignment change; sessions of other students are not pushed.
+
+Each subscriber has a bounded buffer. Publishing never blocks the writer:
+when a buffer is full its oldest message is dropped and counted, and the
+subscriber gets a "resync" before its next messages.
+
+The broker lives in one process: dashboards see the events ingested by the
+process they are connected to, so run the live feed with a single (threaded
+or ASGI) server process.
+
+Knobs (environment variables):
+  LIVE_BUFFER_SIZE       messages buffered per subscriber (default 256)
+  LIVE_MAX_SUBSCRIBERS   concurrent subscribers per process (default 100)
+  LIVE_KEEPALIVE         seconds between keep-alive comments (default 15)
+  LIVE_ASSIGNMENT_TTL    seconds an exam's assigned-student list is reused (default 30)
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from db import connection
+from sessions import parse_exam_id
+
+
+def assigned_students(exam_id):
+    """Usernames of the students assigned to an exam."""
+    with connection() as conn:
+        rows = conn.execute("""
+            SELECT u.username FROM exam_assignments a
+            JOIN users u ON u.id = a.student_id
+            WHERE a.exam_id = ?
+        """, (exam_id,)).fetchall()
+    return frozenset(row[0] for row in rows)
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _chunk(messages, dropped):
+    parts = [_sse("resync", {"dropped": dropped})] if dropped else []
+    parts.extend(messages)
+    # A comment line keeps proxies from closing an idle connection
+    return "".join(parts) or ": keepalive\n\n"
+
+
+class Subscription:
+    def __init__(self, exam_id, buffer_size):
+        self.exam_id = exam_id
+        self.buffer_size = buffer_size
+        self._buffer = deque()
+        self._cond = threading.Condition()
+        self._dropped = 0
+        # Set by bind_loop() for asyncio consumers (see asgi.py)
+        self._loop = None
+        self._wakeup = None
+
+    def bind_loop(self, loop):
+        self._wakeup = asyncio.Event()
+        self._loop = loop
+
+    def offer(self, message):
+        """Called by the publisher; never blocks. Returns False if an old message had to be dropped."""
+        with self._cond:
+            dropped = len(self._buffer) >= self.buffer_size
+            if dropped:
+                self._buffer.popleft()
+                self._dropped += 1
+            self._buffer.append(message)
+            self._cond.notify()
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                pass  # The loop is already closed (server shutting down)
+        return not dropped
+
+    def take(self, timeout):
+        """Waits up to `timeout` seconds for messages; returns (messages, dropped since last take)."""
+        with self._cond:
+            if not self._buffer:
+                self._cond.wait(timeout)
+            return self._drain()
+
+    async def take_async(self, timeout):
+        """take() for a subscription bound to an event loop; never blocks the loop."""
+        # Clear before checking, so an offer() in between still wakes us up
+        self._wakeup.clear()
+        with self._cond:
+            if self._buffer:
+                return self._drain()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        with self._cond:
+            return self._drain()
+
+    def _drain(self):
+        messages = list(self._buffer)
+        self._buffer.clear()
+        dropped, self._dropped = self._dropped, 0
+        return messages, dropped
+
+
+class LiveBroker:
+    def __init__(self, buffer_size, max_subscribers, keepalive, assignment_ttl=30.0, load_assigned=assigned_students):
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self.keepalive = keepalive
+        self.assignment_ttl = assignment_ttl
+        self._load_assigned = load_assigned
+        self._lock = threading.Lock()
+        self._subscribers = {}  # exam_id -> set of Subscription
+        self._assigned = {}  # exam_id -> (loaded at, frozenset of usernames)
+        self._count = 0
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, exam_id):
+        """Returns a Subscription, or None when the process is at LIVE_MAX_SUBSCRIBERS."""
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                return None
+            subscription = Subscription(exam_id, self.buffer_size)
+            self._subscribers.setdefault(exam_id, set()).add(subscription)
+            self._count += 1
+        self._assigned_to(exam_id)  # Loaded on the request thread, not the writer's
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.exam_id)
+            if subscribers and subscription in subscribers:
+                subscribers.discard(subscription)
+                self._count -= 1
+                if not subscribers:
+                    del self._subscribers[subscription.exam_id]
+                    self._assigned.pop(subscription.exam_id, None)
+
+    def forget_assignments(self, exam_id):
+        """Drops the cached assigned-student list after an assignment change."""
+        try:
+            exam_id = int(exam_id)
+        except (TypeError, ValueError):
+            return
+        with self._lock:
+            self._assigned.pop(exam_id, None)
+
+    def _assigned_to(self, exam_id):
+        with self._lock:
+            cached = self._assigned.get(exam_id)
+        if cached is not None and time.monotonic() - cached[0] < self.assignment_ttl:
+            return cached[1]
+        students = self._load_assigned(exam_id)
+        with self._lock:
+            if exam_id in self._subscribers:
+                self._assigned[exam_id] = (time.monotonic(), students)
+        return students
+
+    def subscriber_count(self):
+        return self._count
+
+    def publish(self, exam_id, event, data):
+        with self._lock:
+            subscribers = list(self._subscribers.get(exam_id, ()))
+        if not subscribers:
+            return
+        message = _sse(event, data)  # Encoded once for every subscriber
+        dropped = sum(1 for subscription in subscribers if not subscription.offer(message))
+        with self._lock:
+            self.published += 1
+            self.dropped += dropped
+
+    def on_batch(self, session_rows, transition_rows):
+        """EventWriter listener: fans a committed batch out to the exams being watched."""
+        # Copied under the lock: request threads subscribe and unsubscribe while the writer iterates
+        with self._lock:
+            watched = set(self._subscribers)
+        if not watched:
+            return
+        assigned = {}
+
+        def is_assigned(exam_id, student):
+            if exam_id not in assigned:
+                assigned[exam_id] = self._assigned_to(exam_id)
+            return student in assigned[exam_id]
+
+        for row in transition_rows:
+            exam_id = parse_exam_id(row[1])
+            if exam_id in watched and is_assigned(exam_id, row[0]):
+                try:
+                    alerts = json.loads(row[3]) if row[3] else []
+                except (json.JSONDecodeError, TypeError):
+                    alerts = []
+                self.publish(exam_id, "alert", {
+                    "session_id": row[1],
+                    "student_username": row[0],
+                    "timestamp": row[2],
+                    "alerts": alerts,
+                    "score": row[5],
+                })
+        for row in session_rows:
+            # sessions.STORE_SESSION_SQL column order
+            if row[2] in watched and is_assigned(row[2], row[1]):
+                self.publish(row[2], "session", {
+                    "session_id": row[0],
+                    "student_username": row[1],
+                    "start_time": row[3],
+                    "end_time": row[4],
+                    "event_count": row[5],
+                    "final_score": row[11],
+                    "current_score": row[13],
+                })
+
+    def stream(self, subscription):
+        """SSE response body for one subscriber; unsubscribes when the client goes away."""
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                yield _chunk(*subscription.take(self.keepalive))
+        finally:
+            self.unsubscribe(subscription)
+
+    async def stream_async(self, subscription):
+        """stream() as an async generator, for the ASGI server mode."""
+        subscription.bind_loop(asyncio.get_running_loop())
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                yield _chunk(*await subscription.take_async(self.keepalive))
+        finally:
+            self.unsubscribe(subscription)
+
+
+def create_live_broker():
+    """Builds the process-wide broker from LIVE_* environment variables."""
+    return LiveBroker(
+        buffer_size=int(os.environ.get("LIVE_BUFFER_SIZE", 256)),
+        max_subscribers=int(os.environ.get("LIVE_MAX_SUBSCRIBERS", 100)),
+        keepalive=float(os.environ.get("LIVE_KEEPALIVE", 15)),
+        assignment_ttl=float(os.environ.get("LIVE_ASSIGNMENT_TTL", 30)),
+    )
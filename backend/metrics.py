@@ -0,0 +1,288 @@
+"""
+Process-local metrics in the Prometheus text format, plus an opt-in sampling profiler.
+
+app.py wires it in:
+- every Flask request is timed per route (before_request/after_request), and
+  so are the async routes of asgi.py;
+- db.connect() connections time each SQL statement (see METRICS_DB_TIMING),
+  and the SQL time spent inside a request is recorded per route too;
+- the ingest path counts events accepted, deduplicated by SESSION_LAST_ALERTS
+  and rejected, and the writer times its batch commits;
+- report renders are timed when their job finishes;
+- queue depths and cache/broker counters are read at scrape time.
+GET /metrics serves everything for Prometheus. Values are per process: with
+several gunicorn workers, scrape each worker or use the single-process modes.
+
+Latencies are measured up to the response headers, so streamed bodies (SSE,
+ZIP exports, PDFs) count their setup time only.
+
+Profiling: with PROFILE_REQUESTS=1, any request carrying `?profile=1` or an
+`X-Profile: 1` header is sampled every PROFILE_INTERVAL seconds; the
+collapsed stacks (flamegraph.pl / speedscope format) are written to
+PROFILE_DIR and named in the X-Profile-File response header. The sampler
+thread needs the GIL to take a sample, so it suits requests of tens of
+milliseconds or more (reports, exports, heavy dashboard queries).
+
+Knobs (environment variables):
+  METRICS_DB_TIMING   time every SQL statement (default 1; 0 turns it off)
+  PROFILE_REQUESTS    allow per-request profiling (default 0)
+  PROFILE_INTERVAL    seconds between profiler samples (default 0.005)
+  PROFILE_DIR         profile output directory (default 'profiles' next to this file)
+"""
+
+import bisect
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+DB_TIMING = os.environ.get("METRICS_DB_TIMING", "1") != "0"
+PROFILE_REQUESTS = os.environ.get("PROFILE_REQUESTS", "0") == "1"
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL", 0.005))
+PROFILE_DIR = os.environ.get(
+    "PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles"))
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RENDER_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+REGISTRY = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+# ===================================================
+# 🔹 Metric types 🔹
+# ===================================================
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY.append(self)
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return [(self.name, _label_text(self.labelnames, labels), value) for labels, value in sorted(values.items())]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._values = {}  # labels -> [per-bucket counts (+Inf last), sum]
+        REGISTRY.append(self)
+
+    def observe(self, value, labels=()):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def samples(self):
+        with self._lock:
+            values = {labels: (list(counts), total) for labels, (counts, total) in self._values.items()}
+        samples = []
+        for labels, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else _number(bound)
+                samples.append((f"{self.name}_bucket", _label_text(self.labelnames, labels, [("le", le)]), cumulative))
+            samples.append((f"{self.name}_sum", _label_text(self.labelnames, labels), total))
+            samples.append((f"{self.name}_count", _label_text(self.labelnames, labels), cumulative))
+        return samples
+
+
+class CallbackMetric:
+    """A gauge (or counter) whose value is read at scrape time; callback returns a number or {labels: number}."""
+
+    def __init__(self, name, help_text, callback, kind="gauge", labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.callback = callback
+        self.kind = kind
+        self.labelnames = labelnames
+        REGISTRY.append(self)
+
+    def samples(self):
+        value = self.callback()
+        values = value if isinstance(value, dict) else {(): value}
+        return [(self.name, _label_text(self.labelnames, labels), number) for labels, number in sorted(values.items())]
+
+
+def render():
+    """All registered metrics in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for metric in REGISTRY:
+        try:
+            samples = metric.samples()
+        except Exception as e:
+            print(f"[Metrics] Could not collect {metric.name}: {e}")
+            continue
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(f"{name}{labels} {_number(value)}" for name, labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+# ===================================================
+# 🔹 Backend metrics 🔹
+# ===================================================
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "proctor_http_request_seconds", "Request latency up to the response headers, per route",
+    ("method", "route", "status"))
+HTTP_REQUEST_DB_SECONDS = Histogram(
+    "proctor_http_request_db_seconds", "SQL time spent inside a request, per route", ("method", "route"))
+DB_QUERY_SECONDS = Histogram(
+    "proctor_db_query_seconds", "SQL statement execution time (up to the first row), per statement kind",
+    ("statement",))
+DB_FETCH_SECONDS = Counter(
+    "proctor_db_fetch_seconds_total", "Time spent fetching result rows after execution")
+INGEST_EVENTS = Counter(
+    "proctor_ingest_events_total", "Agent/web events by outcome: accepted, deduplicated or rejected", ("outcome",))
+INGEST_BATCH_SECONDS = Histogram(
+    "proctor_ingest_batch_seconds", "Duration of one ingest writer batch transaction")
+INGEST_COMMITTED = Counter(
+    "proctor_ingest_committed_events_total", "Events committed by the ingest writer, by result", ("result",))
+REPORT_RENDER_SECONDS = Histogram(
+    "proctor_report_render_seconds", "PDF render time in the report pool, by result", ("result",),
+    buckets=RENDER_BUCKETS)
+REPORT_JOB_SECONDS = Histogram(
+    "proctor_report_job_seconds", "Report job time from submission to completion (queueing included)",
+    buckets=RENDER_BUCKETS)
+
+
+# --- SQL timing (used by db.connect) ---
+
+_request_local = threading.local()
+
+
+def _statement_kind(sql):
+    words = sql.lstrip().split(None, 1)
+    return words[0].upper() if words else "EMPTY"
+
+
+def observe_query(sql, seconds):
+    DB_QUERY_SECONDS.observe(seconds, (_statement_kind(sql),))
+    _request_local.db_seconds = getattr(_request_local, "db_seconds", 0.0) + seconds
+
+
+def observe_fetch(seconds):
+    DB_FETCH_SECONDS.inc(amount=seconds)
+    _request_local.db_seconds = getattr(_request_local, "db_seconds", 0.0) + seconds
+
+
+# --- Request timing ---
+
+def observe_request(method, route, status, seconds, db_seconds=None):
+    HTTP_REQUEST_SECONDS.observe(seconds, (method, route, str(status)))
+    if db_seconds is not None:
+        HTTP_REQUEST_DB_SECONDS.observe(db_seconds, (method, route))
+
+
+def start_request():
+    """Flask before_request hook."""
+    from flask import g, request
+    _request_local.db_seconds = 0.0
+    g.metrics_start = time.perf_counter()
+    if PROFILE_REQUESTS and (request.args.get("profile") == "1" or request.headers.get("X-Profile") == "1"):
+        g.profiler = SamplingProfiler(threading.get_ident(), PROFILE_INTERVAL)
+        g.profiler.start()
+
+
+def finish_request(response):
+    """Flask after_request hook."""
+    from flask import g, request
+    start = g.pop("metrics_start", None)
+    if start is None:
+        return response
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    observe_request(request.method, route, response.status_code, time.perf_counter() - start,
+                    getattr(_request_local, "db_seconds", 0.0))
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        path = profiler.stop_and_save(route)
+        response.headers["X-Profile-File"] = os.path.basename(path)
+        response.headers["X-Profile-Samples"] = str(profiler.sample_count)
+    return response
+
+
+# ===================================================
+# 🔹 Sampling profiler 🔹
+# ===================================================
+
+class SamplingProfiler:
+    """Samples one thread's Python stack at a fixed interval into collapsed-stack counts."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = {}
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            key = ";".join(reversed(stack))
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.sample_count += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def stop_and_save(self, label):
+        """Stops sampling and writes `<time>-<label>.folded` to PROFILE_DIR; returns the path."""
+        stacks = self.stop()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = "".join(c if c.isalnum() else "_" for c in label).strip("_") or "root"
+        path = os.path.join(PROFILE_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{name}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(stacks.items()):
+                f.write(f"{stack} {count}\n")
+        return path
@@ -0,0 +1,287 @@
+"""
+Versioned, online schema migrations for proctoring_data.db.
+
+Each migration has two parts:
+- a schema step (CREATE TABLE / ALTER TABLE / CREATE INDEX) that runs in
+  one short IMMEDIATE transaction and records the version in `schema_version`;
+- an optional backfill that walks the source table by rowid in chunks of
+  `chunk_size` rows, committing after every chunk. Progress is stored in
+  `schema_version.backfill_cursor`, so an interrupted backfill resumes where
+  it stopped, and ingestion only ever waits for one chunk.
+
+The schema step also records `backfill_target` (the highest source rowid at
+that moment). Rows written after it are maintained by the ingest path, so the
+backfill never double-counts them.
+
+Usage:
+    python migrations.py              # apply everything
+    python migrations.py --dry-run    # report pending migrations and estimated rows touched
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+from db import connect
+from sessions import create_sessions_table, backfill_sessions, create_aggregate_tables, rebuild_session_aggregates
+from alert_store import create_alert_tables, backfill_alerts
+
+SCHEMA_VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    applied_at TEXT NOT NULL,
+    backfill_cursor INTEGER NOT NULL DEFAULT 0,
+    backfill_target INTEGER NOT NULL DEFAULT 0,
+    completed_at TEXT
+);
+"""
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+class Migration:
+    """
+    apply(conn)                     -> schema step; returns the backfill target rowid (0 = nothing to backfill)
+    backfill(conn, after_id, upto)  -> processes source rows with after_id < rowid <= upto
+    source_table                    -> table the backfill walks, used for dry-run estimates
+    max_chunk_size                  -> caps the runner's chunk size when one source row is
+                                       expensive (e.g. a whole session's events)
+    """
+
+    def __init__(self, version, name, apply, backfill=None, source_table=None, max_chunk_size=None):
+        self.version = version
+        self.name = name
+        self.apply = apply
+        self.backfill = backfill
+        self.source_table = source_table
+        self.max_chunk_size = max_chunk_size
+
+
+def _max_rowid(conn, table):
+    return conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}").fetchone()[0]
+
+
+def _table_exists(conn, table):
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+    return row is not None
+
+
+# ===================================================
+# 🔹 Migrations (append only, never edit a shipped one) 🔹
+# ===================================================
+
+def _v1_baseline(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT NOT NULL UNIQUE,
+        password_hash TEXT NOT NULL,
+        role TEXT NOT NULL CHECK(role IN ('student', 'admin'))
+    );
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id TEXT NOT NULL,
+        session_id TEXT NOT NULL,
+        timestamp TEXT NOT NULL,
+        alerts TEXT,
+        metrics TEXT,
+        integrity_score REAL
+    );
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS exams (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        description TEXT,
+        created_by_admin_id INTEGER NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (created_by_admin_id) REFERENCES users (id)
+    );
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS exam_assignments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        exam_id INTEGER NOT NULL,
+        student_id INTEGER NOT NULL,
+        status TEXT NOT NULL DEFAULT 'assigned',
+        assigned_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (exam_id) REFERENCES exams (id),
+        FOREIGN KEY (student_id) REFERENCES users (id),
+        UNIQUE(exam_id, student_id)
+    );
+    """)
+    return 0
+
+
+def _v2_sessions(conn):
+    already_populated = _table_exists(conn, "sessions") and \
+        conn.execute("SELECT EXISTS (SELECT 1 FROM sessions)").fetchone()[0]
+    create_sessions_table(conn)
+    # Databases that built `sessions` before versioning existed are already complete
+    return 0 if already_populated else _max_rowid(conn, "events")
+
+
+def _v3_normalized_alerts(conn):
+    create_alert_tables(conn)
+    return _max_rowid(conn, "events")
+
+
+def _v4_session_aggregates(conn):
+    create_aggregate_tables(conn)
+    # Sessions created from here on are folded by the ingest path from their
+    # first event; the older ones are rebuilt from their events.
+    return _max_rowid(conn, "sessions")
+
+
+MIGRATIONS = [
+    Migration(1, "baseline tables", _v1_baseline),
+    Migration(2, "sessions summary and lookup indexes", _v2_sessions,
+              backfill=backfill_sessions, source_table="events"),
+    Migration(3, "normalized alert types, event_alerts and typed metric columns", _v3_normalized_alerts,
+              backfill=backfill_alerts, source_table="events"),
+    Migration(4, "time-weighted session scores and per-alert durations", _v4_session_aggregates,
+              backfill=rebuild_session_aggregates, source_table="sessions", max_chunk_size=100),
+]
+
+
+# ===================================================
+# 🔹 Runner 🔹
+# ===================================================
+
+def _applied(conn):
+    if not _table_exists(conn, "schema_version"):
+        return {}
+    rows = conn.execute("SELECT version, backfill_cursor, backfill_target, completed_at FROM schema_version").fetchall()
+    return {row[0]: row for row in rows}
+
+
+def current_version(conn):
+    applied = _applied(conn)
+    return max(applied) if applied else 0
+
+
+def plan(conn):
+    """Lists the work left to do as dicts: version, name, schema_pending, estimated_rows."""
+    applied = _applied(conn)
+    steps = []
+    for migration in MIGRATIONS:
+        row = applied.get(migration.version)
+        if row is not None and row[3] is not None:
+            continue
+        if row is None:
+            # Not applied yet: the backfill would cover every existing source row
+            estimate = 0
+            if migration.backfill and _table_exists(conn, migration.source_table):
+                estimate = _max_rowid(conn, migration.source_table)
+        else:
+            estimate = max(0, row[2] - row[1])
+        steps.append({
+            "version": migration.version,
+            "name": migration.name,
+            "schema_pending": row is None,
+            "estimated_rows": estimate,
+        })
+    return steps
+
+
+def apply_schema(conn, migration):
+    """Runs the schema step in one IMMEDIATE transaction. Returns False if another process got there first."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("SELECT 1 FROM schema_version WHERE version = ?", (migration.version,)).fetchone():
+            conn.rollback()
+            return False
+        target = migration.apply(conn) or 0
+        now = datetime.utcnow().isoformat() + "Z"
+        conn.execute(
+            "INSERT INTO schema_version (version, name, applied_at, backfill_target, completed_at) VALUES (?, ?, ?, ?, ?)",
+            (migration.version, migration.name, now, target, None if target else now),
+        )
+        conn.commit()
+        return True
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def run_backfill(conn, migration, chunk_size=DEFAULT_CHUNK_SIZE, pause=0.0):
+    """Processes the remaining backfill range chunk by chunk. Returns the number of rowids covered."""
+    covered = 0
+    if migration.max_chunk_size:
+        chunk_size = min(chunk_size, migration.max_chunk_size)
+    while True:
+        # One bounded IMMEDIATE transaction per chunk: the ingest writer waits
+        # at most one chunk, and a second runner re-reads the cursor instead of
+        # repeating work.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT backfill_cursor, backfill_target, completed_at FROM schema_version WHERE version = ?",
+                (migration.version,),
+            ).fetchone()
+            if row is None or row[2] is not None:
+                conn.rollback()
+                return covered
+            cursor_id, target = row[0], row[1]
+            if cursor_id >= target:
+                conn.execute(
+                    "UPDATE schema_version SET completed_at = ? WHERE version = ?",
+                    (datetime.utcnow().isoformat() + "Z", migration.version),
+                )
+                conn.commit()
+                return covered
+            upto = min(cursor_id + chunk_size, target)
+            migration.backfill(conn, cursor_id, upto)
+            conn.execute("UPDATE schema_version SET backfill_cursor = ? WHERE version = ?", (upto, migration.version))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        covered += upto - cursor_id
+        if pause:
+            time.sleep(pause)
+
+
+def migrate(conn, dry_run=False, chunk_size=DEFAULT_CHUNK_SIZE, pause=0.0):
+    """Applies all pending migrations in order (or only reports them when dry_run). Returns the plan."""
+    steps = plan(conn)
+    if dry_run:
+        return steps
+    conn.execute(SCHEMA_VERSION_TABLE)
+    by_version = {m.version: m for m in MIGRATIONS}
+    for step in steps:
+        migration = by_version[step["version"]]
+        if step["schema_pending"]:
+            apply_schema(conn, migration)
+        if migration.backfill:
+            run_backfill(conn, migration, chunk_size=chunk_size, pause=pause)
+    return steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply ProctorAI+ database migrations")
+    parser.add_argument('--database', type=str, default=None, help="SQLite file (defaults to DATABASE_FILE)")
+    parser.add_argument('--dry-run', action='store_true', help="Only report pending migrations and estimated rows")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per backfill transaction")
+    parser.add_argument('--pause', type=float, default=0.0, help="Seconds to sleep between backfill chunks")
+    args = parser.parse_args()
+
+    conn = connect(args.database)
+    try:
+        print(f"Current schema version: {current_version(conn)}")
+        steps = migrate(conn, dry_run=args.dry_run, chunk_size=args.chunk_size, pause=args.pause)
+        if not steps:
+            print("Database is up to date.")
+        for step in steps:
+            action = "would apply" if args.dry_run else "applied"
+            schema = "schema + " if step["schema_pending"] else ""
+            print(f"  v{step['version']} {step['name']}: {action} {schema}backfill of ~{step['estimated_rows']} rows")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,6 @@
-import sqlite3
 import json
-import pandas as pd
+import os
+from collections import Counter
 from datetime import datetime
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
@@ -8,117 +8,181 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
 from reportlab.lib.units import inch
 
-DATABASE_FILE = 'proctoring_data.db'
+from db import connection
+from alert_store import EMOTION_NAMES
 
-def generate_report(student_id, session_id, output_filename):
-    """Queries the database for a specific session and generates a PDF report."""
+# Events are streamed from SQLite in chunks of this many rows
+FETCH_CHUNK_SIZE = 5000
+# The timeline is split into several small tables (header repeated), which
+# ReportLab lays out far faster than one huge table
+TIMELINE_ROWS_PER_TABLE = 50
+# Opt-in cap on timeline rows (REPORT_MAX_TIMELINE_ROWS); by default every alert change is listed
+MAX_TIMELINE_ROWS = int(os.environ.get("REPORT_MAX_TIMELINE_ROWS", 0))
 
-    conn = sqlite3.connect(DATABASE_FILE)
-    # Use params to prevent SQL injection
-    query = f"SELECT * FROM events WHERE student_id = ? AND session_id = ? ORDER BY timestamp ASC"
-    df = pd.read_sql_query(query, conn, params=(student_id, session_id))
-    conn.close()
 
-    if df.empty:
-        print(f"No data found for student {student_id} and session {session_id}")
+def _parse_timestamp(value):
+    try:
+        # Agent/web timestamps are ISO 8601 with a trailing 'Z'
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
         return None
 
-    # (Process the data)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    
+
+def _format_timestamp(value, fmt):
+    parsed = _parse_timestamp(value)
+    return parsed.strftime(fmt) if parsed else str(value)
+
+
+def _format_duration(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    return f"{minutes}m {seconds:02d}s" if minutes else f"{seconds}s"
+
+
+def _load_alerts(alerts_json):
     # Use a function to safely load JSON
-    def safe_json_load(x):
-        try:
-            # Handle potential None values or empty strings
-            if not x:
-                return []
-            return json.loads(x)
-        except (json.JSONDecodeError, TypeError):
-            return [] # Return empty list on failure
-            
-    df['metrics'] = df['metrics'].apply(safe_json_load)
-    df['alerts'] = df['alerts'].apply(safe_json_load)
-
-    # We need to find the total *unique* alert events, not every frame.
-    # We will calculate this in the loop below.
-        
-    final_score = df['integrity_score'].mean().round(2)
-    start_time = df['timestamp'].iloc[0].strftime('%Y-%m-%d %H:%M:%S')
-    end_time = df['timestamp'].iloc[-1].strftime('%H:%M:%S')
-
-    # (Generate emotion summary)
-    def get_emotion(x):
-        if isinstance(x, dict):
-            return x.get('emotion', 'N/A')
-        return 'N/A'
-        
-    df['emotion'] = df['metrics'].apply(get_emotion)
-    emotion_summary = df['emotion'].value_counts(normalize=True).mul(100).round(1).to_dict()
+    try:
+        # Handle potential None values or empty strings
+        alerts = json.loads(alerts_json) if alerts_json else []
+    except (json.JSONDecodeError, TypeError):
+        return set()  # Empty set on failure
+    return set(alerts) if isinstance(alerts, list) else set()
+
+
+def summarize_session(conn, student_id, session_id):
+    """Score summary from the ingest-maintained `sessions` row, plus emotion and alert-duration breakdowns."""
+    row = conn.execute("""
+        SELECT event_count, final_score, mean_score, min_score, max_score, start_time, end_time
+        FROM sessions WHERE student_id = ? AND session_id = ?
+    """, (student_id, session_id)).fetchone()
+    if row is None or not row[0]:
+        return None
+    count = row[0]
+    emotions = Counter()
+    for code, n in conn.execute("""
+        SELECT emotion_code, COUNT(*) FROM events
+        WHERE student_id = ? AND session_id = ?
+        GROUP BY emotion_code
+    """, (student_id, session_id)):
+        emotions[EMOTION_NAMES.get(code, 'N/A')] += n
+    durations = conn.execute("""
+        SELECT t.name, d.occurrences, d.seconds
+        FROM session_alert_durations d JOIN alert_types t ON t.id = d.alert_type_id
+        WHERE d.student_id = ? AND d.session_id = ?
+        ORDER BY d.seconds DESC, d.occurrences DESC
+    """, (student_id, session_id)).fetchall()
+    return {
+        "event_count": count,
+        "final_score": row[1],
+        "mean_score": round(row[2], 2) if row[2] is not None else 0.0,
+        "min_score": row[3],
+        "max_score": row[4],
+        "start_time": row[5],
+        "end_time": row[6],
+        "emotion_summary": {name: round(n * 100.0 / count, 1) for name, n in emotions.most_common()},
+        "alert_durations": [(name, occurrences, seconds) for name, occurrences, seconds in durations],
+    }
+
+
+def iter_transitions(conn, student_id, session_id, chunk_size=FETCH_CHUNK_SIZE):
+    """
+    Streams the session in timestamp order and yields (timestamp, alert_set, score)
+    only when the set of alerts changes, including "all clear" transitions.
+    """
+    cursor = conn.execute(
+        "SELECT timestamp, alerts, integrity_score FROM events "
+        "WHERE student_id = ? AND session_id = ? ORDER BY timestamp ASC",
+        (student_id, session_id),
+    )
+    previous_json = None
+    previous_alerts_set = set()  # Start with an empty set
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        for timestamp, alerts_json, score in rows:
+            # Identical JSON text means an identical alert list: skip decoding
+            if alerts_json == previous_json:
+                continue
+            previous_json = alerts_json
+            current_alerts_set = _load_alerts(alerts_json)
+            # This is the magic: only log if the set of alerts has changed
+            if current_alerts_set == previous_alerts_set:
+                continue
+            previous_alerts_set = current_alerts_set
+            yield timestamp, current_alerts_set, score
+
+
+def _timeline_tables(log_data_list):
+    """Paginates the timeline into fixed-size tables that each repeat the header."""
+    style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('BOX', (0, 0), (-1, -1), 1, colors.black)
+    ])
+    for start in range(0, len(log_data_list), TIMELINE_ROWS_PER_TABLE):
+        page_rows = log_data_list[start:start + TIMELINE_ROWS_PER_TABLE]
+        log_table = Table([['Time', 'Alerts Triggered', 'Score']] + page_rows,
+                          colWidths=[1 * inch, 4.5 * inch, 0.5 * inch], repeatRows=1)
+        log_table.setStyle(style)
+        yield log_table
+
+
+def generate_report(student_id, session_id, output_filename):
+    """Streams a specific session from the database and generates a PDF report."""
 
-    # --- PDF Generation ---
-    doc = SimpleDocTemplate(output_filename, pagesize=letter)
     styles = getSampleStyleSheet()
-    
     # Add custom styles for the alert text
     styles.add(ParagraphStyle(name='AlertText', parent=styles['BodyText'], fontSize=9))
     styles.add(ParagraphStyle(name='AllClearText', parent=styles['BodyText'], fontSize=9, textColor=colors.green))
-    
+
+    with connection() as conn:
+        summary = summarize_session(conn, student_id, session_id)
+        if summary is None:
+            print(f"No data found for student {student_id} and session {session_id}")
+            return None
+
+        # Only *changes* in alert state are listed, not every stored event
+        log_data_list = []
+        total_unique_events = 0
+        omitted = 0
+        for timestamp, current_alerts_set, score in iter_transitions(conn, student_id, session_id):
+            if current_alerts_set:
+                # This is a new alert event
+                total_unique_events += 1
+            if MAX_TIMELINE_ROWS and len(log_data_list) >= MAX_TIMELINE_ROWS:
+                omitted += 1
+                continue
+            if current_alerts_set:
+                alert_text = "<br/>".join(sorted(current_alerts_set))
+                paragraph = Paragraph(alert_text, styles['AlertText'])  # Red alert text
+            else:
+                # This is an "All Clear" event
+                paragraph = Paragraph("--- All Clear ---", styles['AllClearText'])  # Green clear text
+            log_data_list.append([_format_timestamp(timestamp, '%H:%M:%S'), paragraph, str(score)])
+
+    # The same time-weighted figure the exam session list shows (see sessions.py)
+    final_score = summary["final_score"]
+    start_time = _format_timestamp(summary["start_time"], '%Y-%m-%d %H:%M:%S')
+    end_time = _format_timestamp(summary["end_time"], '%H:%M:%S')
+
+    # --- PDF Generation ---
+    doc = SimpleDocTemplate(output_filename, pagesize=letter)
     story = []
 
     story.append(Paragraph("Proctoring Session Integrity Report", styles['h1']))
     story.append(Spacer(1, 0.2 * inch))
 
-    # --- ✨ NEW LOGIC: Calculate Total Alert Events Here ---
-    # This logic now finds only *changes* in alert state.
-    
-    log_data_list = [] # We'll build the log data here
-    previous_alerts_set = set() # Start with an empty set
-    total_unique_events = 0
-
-    # Iterate over the *full* dataframe to find changes, including "all clear"
-    for _, row in df.iterrows():
-        current_alerts_list = row['alerts']
-        if not isinstance(current_alerts_list, list):
-            current_alerts_list = []
-            
-        current_alerts_set = set(current_alerts_list)
-        
-        # This is the magic: only log if the set of alerts has changed
-        if current_alerts_set == previous_alerts_set:
-            continue
-            
-        # If we are here, the state has changed.
-        
-        if len(current_alerts_set) > 0:
-            # This is a new alert event
-            total_unique_events += 1
-            alert_text = "<br/>".join(sorted(list(current_alerts_set)))
-            log_data_list.append([
-                row['timestamp'].strftime('%H:%M:%S'),
-                Paragraph(alert_text, styles['AlertText']), # Red alert text
-                str(row['integrity_score'])
-            ])
-        else:
-            # This is an "All Clear" event
-            log_data_list.append([
-                row['timestamp'].strftime('%H:%M:%S'),
-                Paragraph("--- All Clear ---", styles['AllClearText']), # Green clear text
-                str(row['integrity_score'])
-            ])
-
-        # Update the state for the next iteration
-        previous_alerts_set = current_alerts_set
-    # --- End of New Logic ---
-
-
-    # (Summary Table - Now uses the correct count)
+    # (Summary Table)
     summary_data = [
         ['Student ID:', student_id],
         ['Session ID:', session_id],
         ['Exam Start Time:', start_time],
         ['Exam End Time:', end_time],
         ['Final Integrity Score:', f"{final_score} / 100"],
-        ['Total Alert Events:', str(total_unique_events)], # ✨ Now shows the correct number
+        ['Total Alert Events:', str(total_unique_events)],
     ]
     summary_table = Table(summary_data, hAlign='LEFT', colWidths=[1.5 * inch, 4 * inch])
     summary_table.setStyle(TableStyle([
@@ -128,30 +192,40 @@ def generate_report(student_id, session_id, output_filename):
     ]))
     story.append(summary_table)
     story.append(Spacer(1, 0.3 * inch))
-    
+
     # (Emotion Summary)
     story.append(Paragraph("Emotion Distribution", styles['h2']))
-    emotion_str = ", ".join([f"{k}: {v}%" for k, v in emotion_summary.items()])
+    emotion_str = ", ".join([f"{k}: {v}%" for k, v in summary["emotion_summary"].items()])
     story.append(Paragraph(emotion_str, styles['BodyText']))
     story.append(Spacer(1, 0.3 * inch))
 
-    # (Alert Timeline - Now uses the clean list)
-    story.append(Paragraph("Critical Alert Timeline", styles['h2']))
-    
-    if total_unique_events > 0:
-        # Add the header row
-        log_data_table = [['Time', 'Alerts Triggered', 'Score']] + log_data_list
-            
-        log_table = Table(log_data_table, colWidths=[1 * inch, 4.5 * inch, 0.5 * inch])
-        log_table.setStyle(TableStyle([
+    # (Alert Durations)
+    if summary["alert_durations"]:
+        story.append(Paragraph("Time Spent per Alert", styles['h2']))
+        duration_data = [['Alert', 'Times Raised', 'Duration']] + [
+            [Paragraph(name, styles['AlertText']), str(occurrences), _format_duration(seconds)]
+            for name, occurrences, seconds in summary["alert_durations"]
+        ]
+        duration_table = Table(duration_data, colWidths=[4 * inch, 1 * inch, 1 * inch], repeatRows=1)
+        duration_table.setStyle(TableStyle([
             ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
             ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('BOX', (0, 0), (-1, -1), 1, colors.black)
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
         ]))
-        story.append(log_table)
+        story.append(duration_table)
+        story.append(Spacer(1, 0.3 * inch))
+
+    # (Alert Timeline)
+    story.append(Paragraph("Critical Alert Timeline", styles['h2']))
+
+    if total_unique_events > 0:
+        story.extend(_timeline_tables(log_data_list))
+        if omitted:
+            story.append(Paragraph(f"... {omitted} further alert changes not shown "
+                                   f"(timeline limited to {MAX_TIMELINE_ROWS} rows by REPORT_MAX_TIMELINE_ROWS).",
+                                   styles['BodyText']))
     else:
         story.append(Paragraph("No alert events recorded.", styles['BodyText']))
 
@@ -160,4 +234,4 @@ def generate_report(student_id, session_id, output_filename):
         return output_filename
     except Exception as e:
         print(f"Error building PDF: {e}")
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,235 @@
+"""
+Report jobs: PDF rendering off the request path, with a content-addressed artifact cache.
+
+A report is fully determined by its session and the last event stored for
+it, so every job is keyed on (student_id, session_id, last event id):
+- the key doubles as the job id, so resubmitting an unchanged session
+  returns the existing job, or the cached PDF instantly;
+- rendering runs in a small process pool, so a burst of end-of-exam
+  downloads can't starve the ingest threads of CPU or the GIL;
+- job state lives next to the artifact as `<key>.json`, so any gunicorn
+  worker can answer status and download requests for any job;
+- once a newer report for a session is rendered, the older ones are deleted.
+
+Knobs (environment variables):
+  REPORT_WORKERS       render processes per server process (default: half the cores)
+  REPORT_CACHE_DIR     artifact directory (default 'report_cache' next to this file)
+  REPORT_JOB_TIMEOUT   seconds before a pending job is considered lost and re-run (default 300);
+                       a pending job whose owning server process is gone is re-run right away
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+import metrics
+from db import connection
+from report_generator import generate_report
+
+# Bump when the PDF layout changes so cached artifacts are re-rendered
+REPORT_FORMAT_VERSION = 3
+
+
+def session_prefix(student_id, session_id):
+    """Stable, filesystem-safe prefix shared by every artifact of one session."""
+    digest = hashlib.sha256(f"{REPORT_FORMAT_VERSION}\0{student_id}\0{session_id}".encode("utf-8"))
+    return digest.hexdigest()[:24]
+
+
+def last_event_id(conn, student_id, session_id):
+    row = conn.execute(
+        "SELECT MAX(id) FROM events WHERE student_id = ? AND session_id = ?",
+        (student_id, session_id),
+    ).fetchone()
+    return row[0]
+
+
+def _write_state(cache_dir, key, state):
+    path = os.path.join(cache_dir, f"{key}.json")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(dict(state, updated=time.time()), f)
+    os.replace(tmp, path)
+
+
+def _read_state(cache_dir, key):
+    try:
+        with open(os.path.join(cache_dir, f"{key}.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _pid_alive(pid):
+    """Whether server process `pid` still runs. Unknown (True) where it can't be probed safely."""
+    if os.name == "nt":
+        return True  # os.kill would terminate the process on Windows
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # Exists, but owned by someone else
+    return True
+
+
+def _prune_superseded(cache_dir, key):
+    """Deletes artifacts and states of the same session with an older last event id."""
+    prefix, last_id = key.split("-", 1)
+    for name in os.listdir(cache_dir):
+        if not name.startswith(prefix + "-"):
+            continue
+        other_id = name[len(prefix) + 1:].split(".", 1)[0]
+        if other_id.isdigit() and int(other_id) < int(last_id):
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except OSError:
+                pass
+
+
+def render_job(cache_dir, key, student_id, session_id):
+    """
+    Runs in a pool process: renders the PDF atomically into the cache and records the outcome.
+    Returns (ok, render seconds).
+    """
+    state = {"job_id": key, "student_id": student_id, "session_id": session_id}
+    final_path = os.path.join(cache_dir, f"{key}.pdf")
+    tmp_path = f"{final_path}.{os.getpid()}.tmp"
+    start = time.perf_counter()
+    try:
+        if generate_report(student_id, session_id, tmp_path) is None:
+            _write_state(cache_dir, key, dict(state, status="failed", error="No data for this session."))
+            return False, time.perf_counter() - start
+        os.replace(tmp_path, final_path)
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        _write_state(cache_dir, key, dict(state, status="failed", error=str(e)))
+        return False, time.perf_counter() - start
+    seconds = time.perf_counter() - start
+    _write_state(cache_dir, key, dict(state, status="done", render_seconds=round(seconds, 3)))
+    _prune_superseded(cache_dir, key)
+    return True, seconds
+
+
+class ReportJobs:
+    def __init__(self, cache_dir, workers, job_timeout):
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.job_timeout = job_timeout
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+        self._futures = {}  # key -> Future, for jobs submitted by this process
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _executor(self):
+        if self._pool is None or self._pid != os.getpid():
+            # spawn, not fork: the server process already runs writer threads
+            context = multiprocessing.get_context("spawn")
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            self._pid = os.getpid()
+            self._futures = {}
+        return self._pool
+
+    def _submit(self, *call):
+        try:
+            return self._executor().submit(*call)
+        except BrokenProcessPool:
+            # A render process died (e.g. killed for memory) and broke the pool; start a fresh one once
+            print("[Reports] Render pool is broken; restarting it")
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            return self._executor().submit(*call)
+
+    def submit(self, student_id, session_id):
+        """Returns the job state for the session's current snapshot, or None if it has no events."""
+        with connection() as conn:
+            last_id = last_event_id(conn, student_id, session_id)
+        if last_id is None:
+            return None
+        key = f"{session_prefix(student_id, session_id)}-{last_id}"
+        with self._lock:
+            state = self.status(key)
+            if state is not None and not self._is_lost(key, state):
+                return state
+            state = {"job_id": key, "student_id": student_id, "session_id": session_id, "status": "pending",
+                     "owner": os.getpid()}
+            _write_state(self.cache_dir, key, state)
+            submitted = time.perf_counter()
+            future = self._futures[key] = self._submit(render_job, self.cache_dir, key, student_id, session_id)
+        # Outside the lock: a future that is already done runs the callback inline, and _finished takes the lock
+        future.add_done_callback(lambda future, state=state: self._finished(future, state, submitted))
+        return state
+
+    def status(self, job_id):
+        if os.sep in job_id or job_id.startswith("."):
+            return None
+        state = _read_state(self.cache_dir, job_id)
+        if state and state["status"] == "done" and not os.path.exists(self.artifact_path(job_id)):
+            return None  # Artifact was cleaned up underneath us
+        return state
+
+    def wait(self, job_id, timeout):
+        """Blocks until the job leaves 'pending' or `timeout` seconds pass; returns its last state."""
+        deadline = time.monotonic() + timeout
+        while True:
+            state = self.status(job_id)
+            if state is None or state["status"] != "pending" or time.monotonic() >= deadline:
+                return state
+            future = self._futures.get(job_id)
+            if future is not None:
+                try:
+                    future.exception(timeout=max(0.0, deadline - time.monotonic()))
+                except FutureTimeout:
+                    pass
+            else:
+                time.sleep(0.1)
+
+    def artifact_path(self, job_id):
+        return os.path.join(self.cache_dir, f"{job_id}.pdf")
+
+    def in_flight(self):
+        """Jobs submitted by this process that haven't finished yet (queued or rendering)."""
+        return len(self._futures)
+
+    def shutdown(self):
+        if self._pool is not None and self._pid == os.getpid():
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _is_lost(self, key, state):
+        if state["status"] == "failed":
+            return True
+        if state["status"] != "pending" or key in self._futures:
+            return False
+        owner = state.get("owner")
+        if owner == os.getpid() or (owner is not None and not _pid_alive(owner)):
+            # Not ours in flight, yet left by this process (a previous pool) or by one that has since died
+            return True
+        return time.time() - state.get("updated", 0) > self.job_timeout
+
+    def _finished(self, future, state, submitted):
+        if not future.cancelled() and future.exception() is not None:
+            # The render process itself died (e.g. killed for memory)
+            _write_state(self.cache_dir, state["job_id"], dict(state, status="failed", error=str(future.exception())))
+        elif not future.cancelled():
+            ok, seconds = future.result()
+            metrics.REPORT_RENDER_SECONDS.observe(seconds, ("ok" if ok else "failed",))
+            metrics.REPORT_JOB_SECONDS.observe(time.perf_counter() - submitted)
+        with self._lock:
+            self._futures.pop(state["job_id"], None)
+
+
+def create_report_jobs():
+    """Builds the process-wide job manager from REPORT_* environment variables."""
+    default_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "report_cache")
+    return ReportJobs(
+        cache_dir=os.environ.get("REPORT_CACHE_DIR", default_dir),
+        workers=int(os.environ.get("REPORT_WORKERS", max(1, (os.cpu_count() or 2) // 2))),
+        job_timeout=float(os.environ.get("REPORT_JOB_TIMEOUT", 300)),
+    )
@@ -0,0 +1,109 @@
+"""
+Alert weights and integrity scoring, shared by the API and the ingest/storage layers.
+"""
+
+from functools import lru_cache
+
+# (Alert weights are unchanged)
+ALERT_WEIGHTS = {
+    "Multiple faces detected!": 25,
+    "CELL PHONE detected!": 20,
+    "Distraction: Looking away while talking": 10,
+    "No person detected!": 15,
+    "Someone is talking!": 5,
+    "VOICE:": 10,
+    "Suspicious micro gesture detected!": 5,
+    "Hand on mouse/keyboard detected!": 2,
+    "WEB: Switched tabs": 8,
+    "WEB: Left focus": 5
+}
+
+# Category of alerts that match no ALERT_WEIGHTS key; their text is kept as the detail
+OTHER_CATEGORY = "Other"
+
+
+class AlertMatcher:
+    """
+    Classifies alert strings against ALERT_WEIGHTS, built once at import.
+
+    Same answer as the original scorer (the first key, in dict order, that
+    is a substring of the alert), but cheaper per ingested event:
+    - an exact-match table, since almost every alert is literally one of
+      the keys (O(1) hash lookup);
+    - an LRU cache, so repeated alerts that are not exact keys (e.g. the
+      same "VOICE: ..." transcript re-sent until it changes) cost one lookup;
+    - only on a cache miss, the ordered substring scan over a precomputed
+      key tuple. With ~10 short keys, CPython's C substring search beats
+      a Python-level Aho-Corasick or a regex alternation scan (see
+      benchmarks/bench_scoring.py).
+    """
+
+    def __init__(self, weights, cache_size=4096):
+        self.keys = tuple(weights)
+        self.weights = tuple(weights[key] for key in self.keys)
+        self._exact = {key: index for index, key in enumerate(self.keys)}
+        self._lookup = lru_cache(maxsize=cache_size)(self._scan) if cache_size else self._scan
+
+    def _scan(self, alert):
+        index = self._exact.get(alert)
+        if index is not None:
+            return index
+        for index, key in enumerate(self.keys):
+            if key in alert:
+                return index
+        return None
+
+    def key_index(self, alert):
+        """Index into self.keys of the matching weight key, or None."""
+        return self._lookup(alert)
+
+    def classify(self, alert):
+        """(category, detail) for one alert; see classify_alert."""
+        return self._classify(alert, self._lookup(alert))
+
+    def _classify(self, alert, index):
+        if index is None:
+            return OTHER_CATEGORY, alert
+        key = self.keys[index]
+        if alert == key:
+            return key, None
+        if alert.startswith(key):
+            return key, alert[len(key):].strip()
+        return key, alert
+
+    def score(self, alerts):
+        """Returns (integrity_score, [(category, detail), ...]) for one event's alert list."""
+        score = 100
+        classified = []
+        for alert in set(alerts or []):
+            index = self._lookup(alert)
+            if index is not None:
+                score -= self.weights[index]
+            classified.append(self._classify(alert, index))
+        return max(0, score), classified
+
+
+ALERT_MATCHER = AlertMatcher(ALERT_WEIGHTS)
+
+
+def calculate_integrity_score(alerts):
+    return score_alerts(alerts)[0]
+
+
+def score_alerts(alerts):
+    """Score plus classified alerts, so the storage layer doesn't classify them a second time."""
+    return ALERT_MATCHER.score(alerts)
+
+
+def classify_alert(alert):
+    """
+    Maps an alert string to (category, detail).
+
+    The category is the first ALERT_WEIGHTS key found in the alert, or
+    OTHER_CATEGORY when no key matches (e.g. "LAPTOP detected!"), so
+    free-form alert text can't grow alert_types without bound. The detail
+    keeps whatever the category does not: the transcript of "VOICE: ..."
+    alerts, the full text of any other alert that differs from its key, or
+    None when the alert is exactly its category.
+    """
+    return ALERT_MATCHER.classify(alert)
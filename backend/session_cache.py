@@ -0,0 +1,220 @@
+"""
+Session state cache for /log_data deduplication.
+
+Holds the last alert set seen for each active session, so unchanged agent
+payloads are acknowledged without touching the database. Replaces the old
+unbounded SESSION_LAST_ALERTS dict:
+- bounded: at most `max_entries` sessions, least recently used evicted first;
+- idle TTL: sessions not seen for `ttl` seconds are dropped (abandoned
+  sessions no longer leak);
+- hit / miss / eviction counters for monitoring;
+- pluggable backend: "memory" (per process) or "sqlite", a small local
+  SQLite file shared by every worker on the box, so dedup keeps working
+  under gunicorn with several workers.
+
+Knobs (environment variables):
+  SESSION_CACHE_BACKEND      memory (default) or sqlite
+  SESSION_CACHE_MAX_ENTRIES  default 50000
+  SESSION_CACHE_TTL          idle seconds before a session is dropped (default 900)
+  SESSION_CACHE_PATH         SQLite file for the shared backend (default 'session_state.db')
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryBackend:
+    """LRU-ordered dict; the front entry is always the least recently touched."""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, last_touched)
+        self._lock = threading.Lock()
+
+    def swap(self, key, value):
+        """Stores value and returns (previous value or None, evicted count)."""
+        now = time.monotonic()
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None and now - previous[1] > self.ttl:
+                previous = None
+            self._entries[key] = (value, now)
+            return (previous[0] if previous else None), self._evict(now)
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now - entry[1] > self.ttl:
+                return None
+            return entry[0]
+
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _evict(self, now):
+        evicted = 0
+        while self._entries:
+            key, (_, touched) = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_entries and now - touched <= self.ttl:
+                break
+            del self._entries[key]
+            evicted += 1
+        return evicted
+
+
+class SQLiteBackend:
+    """
+    Cross-process backend: one row per session in a local SQLite file.
+
+    The state is disposable, so the file runs with synchronous=OFF. Expired
+    and excess rows are swept every `sweep_interval` seconds rather than on
+    every write; the entry count reported in stats() is refreshed by the
+    same sweep, so a /metrics scrape never runs COUNT(*) under the lock.
+    """
+
+    def __init__(self, path, max_entries, ttl, sweep_interval=30.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._last_sweep = 0.0
+        self._entries = None  # Row count as of the last sweep (None until the first one)
+
+    def _connection(self):
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS session_state (
+                    session_id TEXT PRIMARY KEY,
+                    alerts TEXT NOT NULL,
+                    touched REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_session_state_touched ON session_state (touched)")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def swap(self, key, value):
+        now = time.time()
+        encoded = json.dumps(sorted(value))
+        with self._lock:
+            conn = self._connection()
+            # Read-and-replace in one write transaction, so two workers
+            # handling the same session can't both see the old state.
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT alerts FROM session_state WHERE session_id = ? AND touched >= ?",
+                    (key, now - self.ttl),
+                ).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO session_state (session_id, alerts, touched) VALUES (?, ?, ?)",
+                    (key, encoded, now),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            evicted = self._sweep(conn, now)
+        return (set(json.loads(row[0])) if row else None), evicted
+
+    def get(self, key):
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT alerts FROM session_state WHERE session_id = ? AND touched >= ?",
+                (key, time.time() - self.ttl),
+            ).fetchone()
+        return set(json.loads(row[0])) if row else None
+
+    def pop(self, key):
+        with self._lock:
+            self._connection().execute("DELETE FROM session_state WHERE session_id = ?", (key,))
+
+    def __len__(self):
+        if self._entries is None:
+            with self._lock:
+                self._entries = self._count(self._connection())
+        return self._entries
+
+    def _count(self, conn):
+        return conn.execute("SELECT COUNT(*) FROM session_state").fetchone()[0]
+
+    def _sweep(self, conn, now):
+        if now - self._last_sweep < self.sweep_interval:
+            return 0
+        self._last_sweep = now
+        evicted = conn.execute("DELETE FROM session_state WHERE touched < ?", (now - self.ttl,)).rowcount
+        evicted += conn.execute("""
+            DELETE FROM session_state WHERE session_id IN (
+                SELECT session_id FROM session_state ORDER BY touched DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,)).rowcount
+        self._entries = self._count(conn)
+        return evicted
+
+
+class SessionStateCache:
+    """Last-seen alert set per session, with counters. Thread-safe for both backends."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def swap(self, session_id, alerts):
+        """Records `alerts` as the session's current state and returns the previous set (empty if unknown)."""
+        previous, evicted = self.backend.swap(session_id, alerts)
+        with self._lock:
+            if previous is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            self.evictions += evicted
+        return previous if previous is not None else set()
+
+    def get(self, session_id, default=None):
+        value = self.backend.get(session_id)
+        return default if value is None else value
+
+    def pop(self, session_id, default=None):
+        self.backend.pop(session_id)
+        return default
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self.backend),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def create_session_cache():
+    """Builds the process-wide cache from SESSION_CACHE_* environment variables."""
+    max_entries = int(os.environ.get("SESSION_CACHE_MAX_ENTRIES", 50000))
+    ttl = float(os.environ.get("SESSION_CACHE_TTL", 900))
+    backend = os.environ.get("SESSION_CACHE_BACKEND", "memory")
+    if backend == "sqlite":
+        path = os.environ.get("SESSION_CACHE_PATH", "session_state.db")
+        return SessionStateCache(SQLiteBackend(path, max_entries, ttl))
+    if backend != "memory":
+        raise ValueError(f"SESSION_CACHE_BACKEND must be 'memory' or 'sqlite', got {backend!r}")
+    return SessionStateCache(MemoryBackend(max_entries, ttl))
@@ -0,0 +1,317 @@
+"""
+Denormalized per-session summary rows.
+
+The `sessions` table holds one row per (session_id, student_id) with the
+exam it belongs to, first/last event time, event count and running
+min/max/mean integrity score. It is updated in the same transaction as each
+ingest batch, so the admin dashboard can list an exam's sessions with an
+index lookup instead of grouping the whole `events` table.
+
+Since agents only send alert transitions and heartbeats, every stored event
+opens an alert state that lasts until the session's next event. The ingest
+path folds those states online (SessionAggregate) into:
+- a time-weighted score: each state's score weighted by how long it lasted,
+  which is the session's single `final_score` (served by the exam session
+  list, the report and the exam export alike);
+- `session_alert_durations`: seconds spent in, and number of entries into,
+  each alert type.
+States last at most SESSION_MAX_GAP seconds, so an agent that disappears
+doesn't stretch its last state over the gap. Web alerts (tab switches etc.)
+are instantaneous: they count as occurrences but don't end the agent's state.
+An event older than the session's open state (late delivery) still counts
+towards count/min/max/mean but not towards the time-weighted figures.
+"""
+
+import os
+import re
+from datetime import datetime, timezone
+
+# Longest time (seconds) one alert state is assumed to last without a new event
+SESSION_MAX_GAP = float(os.environ.get("SESSION_MAX_GAP", 60))
+
+SESSIONS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT NOT NULL,
+    student_id TEXT NOT NULL,
+    exam_id INTEGER,
+    start_time TEXT NOT NULL,
+    end_time TEXT NOT NULL,
+    event_count INTEGER NOT NULL DEFAULT 0,
+    min_score REAL,
+    max_score REAL,
+    mean_score REAL,
+    PRIMARY KEY (session_id, student_id)
+);
+"""
+
+# Time-weighted aggregate columns added to `sessions` by migration v4.
+# state_* describe the open alert state: when it started, its score and its
+# alert_types ids (comma separated).
+AGGREGATE_COLUMNS = [
+    ("weighted_score_sum", "REAL NOT NULL DEFAULT 0"),
+    ("tracked_seconds", "REAL NOT NULL DEFAULT 0"),
+    ("final_score", "REAL"),
+    ("state_time", "TEXT"),
+    ("state_score", "REAL"),
+    ("state_alert_types", "TEXT"),
+]
+
+SESSION_ALERT_DURATIONS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS session_alert_durations (
+    session_id TEXT NOT NULL,
+    student_id TEXT NOT NULL,
+    alert_type_id INTEGER NOT NULL,
+    seconds REAL NOT NULL DEFAULT 0,
+    occurrences INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (session_id, student_id, alert_type_id),
+    FOREIGN KEY (alert_type_id) REFERENCES alert_types (id)
+);
+"""
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_events_student_session_ts ON events (student_id, session_id, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_sessions_exam_start ON sessions (exam_id, start_time)",
+    "CREATE INDEX IF NOT EXISTS idx_sessions_student ON sessions (student_id, session_id)",
+]
+
+# Merges a batch aggregate into the stored row (v2 backfill). SQLite evaluates
+# every right-hand side against the pre-update values, so the order is irrelevant.
+UPSERT_SESSION_SQL = """
+INSERT INTO sessions (session_id, student_id, exam_id, start_time, end_time,
+                      event_count, min_score, max_score, mean_score)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (session_id, student_id) DO UPDATE SET
+    start_time = MIN(start_time, excluded.start_time),
+    end_time = MAX(end_time, excluded.end_time),
+    min_score = MIN(min_score, excluded.min_score),
+    max_score = MAX(max_score, excluded.max_score),
+    mean_score = (mean_score * event_count + excluded.mean_score * excluded.event_count)
+                 / (event_count + excluded.event_count),
+    event_count = event_count + excluded.event_count
+"""
+
+STORE_SESSION_SQL = """
+INSERT INTO sessions (session_id, student_id, exam_id, start_time, end_time, event_count,
+                      min_score, max_score, mean_score, weighted_score_sum, tracked_seconds,
+                      final_score, state_time, state_score, state_alert_types)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (session_id, student_id) DO UPDATE SET
+    start_time = excluded.start_time,
+    end_time = excluded.end_time,
+    event_count = excluded.event_count,
+    min_score = excluded.min_score,
+    max_score = excluded.max_score,
+    mean_score = excluded.mean_score,
+    weighted_score_sum = excluded.weighted_score_sum,
+    tracked_seconds = excluded.tracked_seconds,
+    final_score = excluded.final_score,
+    state_time = excluded.state_time,
+    state_score = excluded.state_score,
+    state_alert_types = excluded.state_alert_types
+"""
+
+LOAD_SESSION_SQL = """
+SELECT start_time, end_time, event_count, min_score, max_score, mean_score,
+       weighted_score_sum, tracked_seconds, state_time, state_score, state_alert_types
+FROM sessions WHERE session_id = ? AND student_id = ?
+"""
+
+ADD_DURATION_SQL = """
+INSERT INTO session_alert_durations (session_id, student_id, alert_type_id, seconds, occurrences)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (session_id, student_id, alert_type_id) DO UPDATE SET
+    seconds = seconds + excluded.seconds,
+    occurrences = occurrences + excluded.occurrences
+"""
+
+# Session ids are built as 'exam_{exam_id}_{username}_{timestamp}' by both the agent and the web client
+_EXAM_ID_RE = re.compile(r"^exam_(\d+)_")
+
+
+def parse_exam_id(session_id):
+    match = _EXAM_ID_RE.match(session_id or "")
+    return int(match.group(1)) if match else None
+
+
+def create_sessions_table(cursor):
+    cursor.execute(SESSIONS_SCHEMA)
+    for sql in INDEXES:
+        cursor.execute(sql)
+
+
+def create_aggregate_tables(conn):
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(sessions)").fetchall()}
+    for column, sql_type in AGGREGATE_COLUMNS:
+        if column not in existing:
+            conn.execute(f"ALTER TABLE sessions ADD COLUMN {column} {sql_type}")
+    conn.execute(SESSION_ALERT_DURATIONS_SCHEMA)
+
+
+def parse_epoch(timestamp):
+    """ISO 8601 timestamp (naive means UTC) to epoch seconds, or None if unparseable."""
+    try:
+        parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def is_point_event(metrics_json):
+    # Web alerts are stored with metrics {"source": "web"} (see app._prepare_event)
+    return bool(metrics_json) and '"source": "web"' in metrics_json
+
+
+class SessionAggregate:
+    """Online fold of one session's events, in timestamp order."""
+
+    def __init__(self, stored=None):
+        self.start_time = self.end_time = None
+        self.count = 0
+        self.min_score = self.max_score = None
+        self.score_sum = 0.0
+        self.weighted_sum = 0.0
+        self.tracked = 0.0
+        self.state_time = self.state_epoch = self.state_score = None
+        self.state_types = frozenset()
+        self.seconds = {}      # alert_type_id -> seconds, for this fold only
+        self.occurrences = {}  # alert_type_id -> entries, for this fold only
+        if stored is not None:
+            (self.start_time, self.end_time, self.count, self.min_score, self.max_score, mean,
+             self.weighted_sum, self.tracked, self.state_time, self.state_score, types) = stored
+            self.score_sum = (mean or 0.0) * self.count
+            self.state_epoch = parse_epoch(self.state_time)
+            self.state_types = frozenset(int(t) for t in types.split(",")) if types else frozenset()
+
+    def add(self, timestamp, score, alert_type_ids, point=False):
+        """Folds one event; returns True if it changed the session's alert state (or is a web alert)."""
+        self.count += 1
+        self.score_sum += score
+        self.min_score = score if self.min_score is None else min(self.min_score, score)
+        self.max_score = score if self.max_score is None else max(self.max_score, score)
+        self.start_time = timestamp if self.start_time is None else min(self.start_time, timestamp)
+        self.end_time = timestamp if self.end_time is None else max(self.end_time, timestamp)
+
+        epoch = None if point else parse_epoch(timestamp)
+        if epoch is None:
+            for type_id in alert_type_ids:
+                self.occurrences[type_id] = self.occurrences.get(type_id, 0) + 1
+            return bool(alert_type_ids)
+        if self.state_epoch is not None:
+            elapsed = epoch - self.state_epoch
+            if elapsed < 0:
+                return False  # Late delivery: the state it belonged to is already closed
+            elapsed = min(elapsed, SESSION_MAX_GAP)
+            self.weighted_sum += self.state_score * elapsed
+            self.tracked += elapsed
+            for type_id in self.state_types:
+                self.seconds[type_id] = self.seconds.get(type_id, 0.0) + elapsed
+        for type_id in alert_type_ids:
+            if type_id not in self.state_types:
+                self.occurrences[type_id] = self.occurrences.get(type_id, 0) + 1
+        changed = frozenset(alert_type_ids) != self.state_types
+        self.state_time, self.state_epoch, self.state_score = timestamp, epoch, score
+        self.state_types = frozenset(alert_type_ids)
+        return changed
+
+    def final_score(self):
+        if self.tracked > 0:
+            return round(self.weighted_sum / self.tracked, 2)
+        return round(self.score_sum / self.count, 2) if self.count else None
+
+    def session_row(self, session_id, student_id):
+        return (
+            session_id, student_id, parse_exam_id(session_id), self.start_time, self.end_time, self.count,
+            self.min_score, self.max_score, self.score_sum / self.count if self.count else None,
+            self.weighted_sum, self.tracked, self.final_score(),
+            self.state_time, self.state_score, ",".join(str(t) for t in sorted(self.state_types)),
+        )
+
+    def duration_rows(self, session_id, student_id):
+        return [
+            (session_id, student_id, type_id, self.seconds.get(type_id, 0.0), self.occurrences.get(type_id, 0))
+            for type_id in set(self.seconds) | set(self.occurrences)
+        ]
+
+
+def upsert_sessions(conn, rows, alert_type_ids):
+    """
+    Folds a batch of events rows into `sessions` and `session_alert_durations`.
+    alert_type_ids[i] is the set of alert_types ids of rows[i]. Must run inside
+    the ingest write transaction: each touched session row is read, then rewritten.
+
+    Returns (session_rows, transition_rows): the new `sessions` rows (STORE_SESSION_SQL
+    column order) and the events rows that changed their session's alert state.
+    """
+    by_session = {}
+    for row, type_ids in zip(rows, alert_type_ids):
+        # Leading events columns: student_id, session_id, timestamp, alerts, metrics, score
+        by_session.setdefault((row[1], row[0]), []).append((row, type_ids))
+    session_rows, duration_rows, transition_rows = [], [], []
+    for (session_id, student_id), events in by_session.items():
+        agg = SessionAggregate(conn.execute(LOAD_SESSION_SQL, (session_id, student_id)).fetchone())
+        # A batch can interleave a client's replayed backlog with live events
+        events.sort(key=lambda event: event[0][2])
+        for row, type_ids in events:
+            if agg.add(row[2], row[5], type_ids, is_point_event(row[4])):
+                transition_rows.append(row)
+        session_rows.append(agg.session_row(session_id, student_id))
+        duration_rows.extend(agg.duration_rows(session_id, student_id))
+    conn.executemany(STORE_SESSION_SQL, session_rows)
+    if duration_rows:
+        conn.executemany(ADD_DURATION_SQL, duration_rows)
+    return session_rows, transition_rows
+
+
+def backfill_sessions(conn, after_id, upto_id):
+    """Folds the events with after_id < id <= upto_id into `sessions` (one migration v2 backfill chunk)."""
+    rows = conn.execute(
+        "SELECT student_id, session_id, timestamp, integrity_score "
+        "FROM events WHERE id > ? AND id <= ?",
+        (after_id, upto_id),
+    ).fetchall()
+    # Only the v2 columns: the time-weighted ones are rebuilt per session by v4
+    aggregates = {}
+    for student_id, session_id, timestamp, score in rows:
+        key = (session_id, student_id)
+        agg = aggregates.get(key)
+        if agg is None:
+            aggregates[key] = [timestamp, timestamp, 1, score, score, score]
+            continue
+        agg[0] = min(agg[0], timestamp)
+        agg[1] = max(agg[1], timestamp)
+        agg[2] += 1
+        agg[3] = min(agg[3], score)
+        agg[4] = max(agg[4], score)
+        agg[5] += score
+    conn.executemany(UPSERT_SESSION_SQL, [
+        (session_id, student_id, parse_exam_id(session_id), start, end, count, lo, hi, total / count)
+        for (session_id, student_id), (start, end, count, lo, hi, total) in aggregates.items()
+    ])
+
+
+def rebuild_session_aggregates(conn, after_rowid, upto_rowid):
+    """Migration v4 backfill chunk: recomputes every aggregate of the sessions in a rowid range from their events."""
+    sessions = conn.execute(
+        "SELECT session_id, student_id FROM sessions WHERE rowid > ? AND rowid <= ?",
+        (after_rowid, upto_rowid),
+    ).fetchall()
+    for session_id, student_id in sessions:
+        agg = SessionAggregate()
+        for timestamp, score, metrics_json, type_ids in conn.execute("""
+            SELECT e.timestamp, e.integrity_score, e.metrics, GROUP_CONCAT(ea.alert_type_id)
+            FROM events e
+            LEFT JOIN event_alerts ea ON ea.event_id = e.id
+            WHERE e.student_id = ? AND e.session_id = ?
+            GROUP BY e.id
+            ORDER BY e.timestamp, e.id
+        """, (student_id, session_id)):
+            types = frozenset(int(t) for t in type_ids.split(",")) if type_ids else frozenset()
+            agg.add(timestamp, score, types, is_point_event(metrics_json))
+        if not agg.count:
+            continue
+        conn.execute(STORE_SESSION_SQL, agg.session_row(session_id, student_id))
+        conn.execute("DELETE FROM session_alert_durations WHERE session_id = ? AND student_id = ?",
+                     (session_id, student_id))
+        conn.executemany(ADD_DURATION_SQL, agg.duration_rows(session_id, student_id))
@@ -0,0 +1,172 @@
+"""
+Parity and cost benchmark for the object-detector backends (inference_backends.py).
+
+Run from the client-agent directory (after `python export_detector.py [--int8 ...]`):
+    python benchmarks/bench_detector.py [--images DIR] [--runs 50]
+        [--model torch:yolov8n.pt --model onnx:yolov8n.onnx --model onnx:yolov8n-int8.onnx]
+
+Every model is measured in a fresh subprocess, so the numbers include what
+the agent pays at start-up: import time, load time and peak RSS, then
+per-frame latency (p50 / p95) over `--runs` passes on the images, resized
+to the agent's 320x240 first. Images default to the samples shipped with
+Ultralytics; pass frames from a real exam webcam for meaningful INT8 numbers.
+
+Parity: every model's detections are matched against the first model's
+(PyTorch by default), per class, by IoU. A detection counts as matched at
+IoU >= --min_iou with a confidence within --max_conf_diff. The benchmark
+fails (exit status 1) when an FP32 model matches less than --min_match of
+the reference detections or adds as many unmatched ones (boxes right at the
+confidence threshold may flip); INT8 models only report their match rate.
+"""
+
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+
+AGENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AGENT_DIR)
+
+IMAGE_PATTERNS = ("*.jpg", "*.jpeg", "*.png", "*.bmp")
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 2**20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10  # bytes on macOS, KiB on Linux
+
+
+def default_images():
+    try:
+        from ultralytics.utils import ASSETS
+        return str(ASSETS)
+    except ImportError:
+        return None
+
+
+def worker(backend, weights, images_dir, runs, threads):
+    """Runs in the subprocess: loads one model, times it and prints one JSON line."""
+    started = time.perf_counter()
+    import cv2
+    from frame_buffer import SMALL_SIZE
+    import inference_backends
+    if backend == "torch":
+        import torch  # noqa: F401  (counted in the import time, as in the agent)
+        import ultralytics  # noqa: F401
+    else:
+        import onnxruntime  # noqa: F401
+    imported = time.perf_counter()
+    detector = inference_backends.load_detector(backend, weights, threads=threads)
+    loaded = time.perf_counter()
+
+    paths = sorted(p for pattern in IMAGE_PATTERNS for p in glob.glob(os.path.join(images_dir, pattern)))
+    images = [cv2.resize(cv2.imread(p), SMALL_SIZE) for p in paths]
+    detections = [detector.detect(image).tolist() for image in images]  # Also warms the model up
+    latencies = []
+    for _ in range(runs):
+        for image in images:
+            t = time.perf_counter()
+            detector.detect(image)
+            latencies.append(time.perf_counter() - t)
+    latencies.sort()
+    print(json.dumps({
+        "import_s": round(imported - started, 3),
+        "load_s": round(loaded - imported, 3),
+        "latency_ms_p50": round(1000 * latencies[len(latencies) // 2], 2),
+        "latency_ms_p95": round(1000 * latencies[int(0.95 * (len(latencies) - 1))], 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "names": {str(k): v for k, v in detector.names.items()},
+        "detections": detections,
+        "images": [os.path.basename(p) for p in paths],
+    }))
+
+
+def iou(a, b):
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def match(reference, candidate, min_iou, max_conf_diff):
+    """(matched, missed, extra) detections of `candidate` against `reference` for one image."""
+    unused = list(candidate)
+    matched = 0
+    for ref in reference:
+        best = max((c for c in unused if int(c[5]) == int(ref[5])), key=lambda c: iou(ref, c), default=None)
+        if best is not None and iou(ref, best) >= min_iou and abs(best[4] - ref[4]) <= max_conf_diff:
+            unused.remove(best)
+            matched += 1
+    return matched, len(reference) - matched, len(unused)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', action='append', default=None,
+                        help="backend:weights, repeatable (default: torch:yolov8n.pt, onnx:yolov8n.onnx, onnx:yolov8n-int8.onnx if present)")
+    parser.add_argument('--images', type=str, default=None, help="Folder of test images (default: Ultralytics sample images)")
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--threads', type=int, default=None, help="onnxruntime intra-op threads (default: onnxruntime's choice)")
+    parser.add_argument('--min_iou', type=float, default=0.9)
+    parser.add_argument('--max_conf_diff', type=float, default=0.05)
+    parser.add_argument('--min_match', type=float, default=0.95, help="Minimum FP32 match rate")
+    parser.add_argument('--worker', nargs=2, metavar=("BACKEND", "WEIGHTS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    images = args.images or default_images()
+    if args.worker:
+        worker(args.worker[0], args.worker[1], images, args.runs, args.threads)
+        return
+    if not images:
+        sys.exit("No --images given and Ultralytics (with its sample images) is not installed")
+
+    models = args.model or ["torch:yolov8n.pt", "onnx:yolov8n.onnx"] + (
+        ["onnx:yolov8n-int8.onnx"] if os.path.exists(os.path.join(AGENT_DIR, "yolov8n-int8.onnx")) else [])
+    results = {}
+    for spec in models:
+        backend, weights = spec.split(":", 1)
+        command = [sys.executable, os.path.abspath(__file__), "--worker", backend, weights,
+                   "--images", images, "--runs", str(args.runs)]
+        if args.threads:
+            command += ["--threads", str(args.threads)]
+        output = subprocess.run(command, cwd=AGENT_DIR, capture_output=True, text=True)
+        if output.returncode != 0:
+            print(f"{spec}: failed\n{output.stderr.strip()}")
+            continue
+        results[spec] = json.loads(output.stdout.strip().splitlines()[-1])
+
+    if not results:
+        sys.exit(1)
+    print(f"{len(next(iter(results.values()))['images'])} images at 320x240, {args.runs} runs each")
+    print(f"  {'model':<28} {'import s':>8} {'load s':>7} {'p50 ms':>7} {'p95 ms':>7} {'peak RSS MB':>11}")
+    for spec, r in results.items():
+        print(f"  {spec:<28} {r['import_s']:8.2f} {r['load_s']:7.2f} {r['latency_ms_p50']:7.1f} "
+              f"{r['latency_ms_p95']:7.1f} {r['peak_rss_mb']:11.0f}")
+
+    reference_spec, reference = next(iter(results.items()))
+    failed = False
+    print(f"Parity against {reference_spec} (IoU >= {args.min_iou}, |conf diff| <= {args.max_conf_diff}):")
+    for spec, r in list(results.items())[1:]:
+        totals = [0, 0, 0]
+        for ref, cand in zip(reference["detections"], r["detections"]):
+            for i, n in enumerate(match(ref, cand, args.min_iou, args.max_conf_diff)):
+                totals[i] += n
+        matched, missed, extra = totals
+        total = max(1, matched + missed)
+        rate = matched / total
+        print(f"  {spec:<28} matched {matched}, missed {missed}, extra {extra} ({100 * rate:.1f}%)")
+        if "int8" not in os.path.basename(spec) and (rate < args.min_match or extra / total > 1 - args.min_match):
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
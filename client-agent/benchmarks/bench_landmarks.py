@@ -0,0 +1,139 @@
+"""
+Micro-benchmark: vectorized landmark math (landmarks.py) vs. the original per-landmark code.
+
+Run from the client-agent directory:
+    python benchmarks/bench_landmarks.py [--frames 20000] [--faces 3]
+
+Synthetic FaceLandmarker results: `--faces` faces of 478 landmark objects
+with x/y/z attributes (like MediaPipe's NormalizedLandmark) plus a rotation
+matrix per face. "legacy" is the old face_landmarker_thread math for the
+first face only; "legacy, all faces" loops it over every face, which is
+what landmarks.analyze() computes (batched NumPy for several faces, plain
+floats for one).
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from landmarks import GazeHistory, analyze  # noqa: E402
+
+LANDMARK_COUNT = 478
+
+
+class Landmark:
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x, y, z):
+        self.x, self.y, self.z = x, y, z
+
+
+class Result:
+    def __init__(self, face_landmarks, matrices):
+        self.face_landmarks = face_landmarks
+        self.facial_transformation_matrixes = matrices
+
+
+def rotation(yaw, pitch, roll):
+    cy, sy, cp, sp, cr, sr = np.cos(yaw), np.sin(yaw), np.cos(pitch), np.sin(pitch), np.cos(roll), np.sin(roll)
+    m = np.eye(4)
+    m[:3, :3] = (np.array([[cr, -sr, 0], [sr, cr, 0], [0, 0, 1]])
+                 @ np.array([[cy, 0, sy], [0, 1, 0], [-sy, 0, cy]])
+                 @ np.array([[1, 0, 0], [0, cp, -sp], [0, sp, cp]]))
+    return m
+
+
+def synth_results(n, faces, seed=7):
+    rng = random.Random(seed)
+    results = []
+    for _ in range(n):
+        face_landmarks = [
+            [Landmark(rng.uniform(0.2, 0.8), rng.uniform(0.2, 0.8), rng.uniform(-0.1, 0.1)) for _ in range(LANDMARK_COUNT)]
+            for _ in range(faces)
+        ]
+        matrices = [rotation(rng.uniform(-0.6, 0.6), rng.uniform(-0.3, 0.3), rng.uniform(-0.2, 0.2)) for _ in range(faces)]
+        results.append(Result(face_landmarks, matrices))
+    return results
+
+
+# --- The original code from face_landmarker_thread ---
+
+def legacy_eye_aspect_ratio(landmarks):
+    def dist(p1, p2):
+        return np.linalg.norm([p1.x - p2.x, p1.y - p2.y, p1.z - p2.z])
+    left_p1, left_p2, left_p3, left_p4 = landmarks[160], landmarks[144], landmarks[158], landmarks[153]
+    left_p5, left_p6 = landmarks[33], landmarks[133]
+    ear_left = (dist(left_p1, left_p2) + dist(left_p3, left_p4)) / (2.0 * dist(left_p5, left_p6))
+    right_p1, right_p2, right_p3, right_p4 = landmarks[387], landmarks[373], landmarks[385], landmarks[380]
+    right_p5, right_p6 = landmarks[263], landmarks[362]
+    ear_right = (dist(right_p1, right_p2) + dist(right_p3, right_p4)) / (2.0 * dist(right_p5, right_p6))
+    return (ear_left + ear_right) / 2.0
+
+
+def legacy_face(landmarks, matrix, gaze_history):
+    head_yaw = np.degrees(np.arcsin(-matrix[2][0]))
+    li, ri = landmarks[468], landmarks[473]
+    gaze_x = (li.x + ri.x) / 2
+    gaze_history.append(gaze_x)
+    velocity = float(np.mean(np.abs(np.diff(list(gaze_history))))) if len(gaze_history) > 1 else 0.0
+    return head_yaw, gaze_x, velocity, legacy_eye_aspect_ratio(landmarks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', type=int, default=20000)
+    parser.add_argument('--faces', type=int, default=3)
+    args = parser.parse_args()
+
+    results = synth_results(min(args.frames, 500), args.faces)
+    frames = [results[i % len(results)] for i in range(args.frames)]
+
+    # Same answers as the original code, frame by frame (first face, plus the gaze velocity)
+    legacy_history, history = deque(maxlen=5), GazeHistory(5)
+    for result in frames[:2000]:
+        yaw, gaze_x, velocity, ear = legacy_face(result.face_landmarks[0], result.facial_transformation_matrixes[0], legacy_history)
+        metrics = analyze(result)
+        history.append(float(metrics.gaze_x[0]))
+        assert abs(metrics.yaw[0] - yaw) < 1e-6, (metrics.yaw[0], yaw)
+        assert abs(metrics.gaze_x[0] - gaze_x) < 1e-6
+        assert abs(metrics.ear[0] - ear) < 1e-4 * max(1.0, ear), (metrics.ear[0], ear)
+        assert abs(history.velocity() - velocity) < 1e-6, (history.velocity(), velocity)
+
+    def run_legacy(all_faces):
+        gaze_history = deque(maxlen=5)
+        start = time.perf_counter()
+        for result in frames:
+            faces = range(len(result.face_landmarks)) if all_faces else (0,)
+            for i in faces:
+                legacy_face(result.face_landmarks[i], result.facial_transformation_matrixes[i], gaze_history)
+        return time.perf_counter() - start
+
+    def run_vectorized():
+        gaze_history = GazeHistory(5)
+        start = time.perf_counter()
+        for result in frames:
+            metrics = analyze(result)
+            gaze_history.append(float(metrics.gaze_x[0]))
+            gaze_history.velocity()
+        return time.perf_counter() - start
+
+    timings = {
+        "legacy (first face)": run_legacy(False),
+        "legacy, all faces": run_legacy(True),
+        "vectorized, all faces": run_vectorized(),
+    }
+    base = timings["legacy, all faces"]
+    print(f"{args.frames} frames, {args.faces} faces each")
+    for name, seconds in timings.items():
+        print(f"  {name:<22} {seconds * 1e6 / args.frames:8.2f} us/frame   x{base / seconds:.2f}")
+
+
+if __name__ == '__main__':
+    main()
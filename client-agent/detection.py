@@ -0,0 +1,120 @@
+"""
+Object detection plus tracking for the ProctorAI client agent.
+
+Full YOLO inference is the most expensive thing the agent does, and the
+beep thread and the overlay used to re-convert `results.boxes` tensors to
+lists and re-scan them for phones and laptops every time they looked.
+DetectionTracker instead:
+- runs YOLO (any inference_backends detector) at a low cadence, restricted
+  to the classes that raise alerts, so nothing else is decoded;
+- between YOLO runs, follows each detected box on the 320x240 grayscale
+  frame with pyramidal Lucas-Kanade optical flow on a few corner points
+  inside the box (a millisecond or two per frame); a box whose points are
+  lost, or that leaves the image, is dropped until YOLO sees it again, and
+  a box without trackable corners stays where YOLO put it;
+- publishes every result once as an immutable Detections record: boxes are
+  already scaled to full-frame pixels, so consumers just read the tuple.
+Every YOLO run replaces the tracked boxes, so tracking never outlives what
+the detector confirms.
+"""
+
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from frame_buffer import SMALL_SIZE
+
+ALERT_CLASSES = ("cell phone", "laptop")
+MIN_CONFIDENCE = 0.7
+
+# One detected object; box = (x1, y1, x2, y2) in full-frame pixels, tracked = moved by optical flow since YOLO saw it
+Detection = namedtuple("Detection", ("class_id", "name", "conf", "box", "tracked"))
+# Everything known for one frame; source is "yolo", "track" or "none"
+Detections = namedtuple("Detections", ("frame_seq", "captured_at", "source", "items"))
+NO_DETECTIONS = Detections(0, 0.0, "none", ())
+
+LK_PARAMS = dict(winSize=(15, 15), maxLevel=2, criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+MAX_CORNERS = 20
+MIN_POINTS = 4
+
+
+class _Track:
+    __slots__ = ("class_id", "name", "conf", "box", "points")
+
+    def __init__(self, class_id, name, conf, box, points):
+        self.class_id = class_id
+        self.name = name
+        self.conf = conf
+        self.box = box  # float (x1, y1, x2, y2) on the SMALL_SIZE frame
+        self.points = points  # (n, 1, 2) float32 corners inside the box
+
+
+class DetectionTracker:
+    def __init__(self, detector, classes=ALERT_CLASSES, conf=MIN_CONFIDENCE):
+        self.detector = detector  # An inference_backends detector (PyTorch or ONNX Runtime)
+        self.conf = conf
+        self.class_ids = [i for i, name in detector.names.items() if name in classes]
+        self._tracks = []
+        self._gray = None
+
+    @property
+    def tracking(self):
+        return bool(self._tracks)
+
+    def detect(self, frame):
+        """Full YOLO pass on the frame's 320x240 copy; re-seeds the tracks. Returns a Detections record."""
+        rows = self.detector.detect(frame.small_bgr(), self.class_ids, self.conf)
+        gray = cv2.cvtColor(frame.small_bgr(), cv2.COLOR_BGR2GRAY)
+        self._tracks = []
+        for x1, y1, x2, y2, conf, class_id in rows.tolist():
+            self._tracks.append(_Track(int(class_id), self.detector.names[int(class_id)], round(conf, 3),
+                                       (x1, y1, x2, y2), self._corners(gray, (x1, y1, x2, y2))))
+        self._gray = gray
+        return self._publish(frame, "yolo", tracked=False)
+
+    def track(self, frame):
+        """Moves the boxes found by the last detect() to this frame with optical flow."""
+        gray = cv2.cvtColor(frame.small_bgr(), cv2.COLOR_BGR2GRAY)
+        kept = []
+        for track in self._tracks:
+            if track.points is None:  # Nothing to follow (e.g. a plain phone back): keep YOLO's box
+                kept.append(track)
+                continue
+            moved, status, _ = cv2.calcOpticalFlowPyrLK(self._gray, gray, track.points, None, **LK_PARAMS)
+            if moved is None:
+                continue
+            good = status.ravel() == 1
+            if good.sum() < MIN_POINTS:
+                continue
+            dx, dy = np.median((moved[good] - track.points[good]).reshape(-1, 2), axis=0)
+            x1, y1, x2, y2 = track.box
+            box = (x1 + dx, y1 + dy, x2 + dx, y2 + dy)
+            if box[2] <= 0 or box[3] <= 0 or box[0] >= SMALL_SIZE[0] or box[1] >= SMALL_SIZE[1]:
+                continue
+            track.box, track.points = box, moved[good].reshape(-1, 1, 2)
+            kept.append(track)
+        self._tracks = kept
+        self._gray = gray
+        return self._publish(frame, "track", tracked=True)
+
+    def _corners(self, gray, box):
+        h, w = gray.shape[:2]
+        x1, y1 = max(0, int(box[0])), max(0, int(box[1]))
+        x2, y2 = min(w, int(box[2]) + 1), min(h, int(box[3]) + 1)
+        if x2 - x1 < 4 or y2 - y1 < 4:
+            return None
+        corners = cv2.goodFeaturesToTrack(gray[y1:y2, x1:x2], MAX_CORNERS, 0.01, 3)
+        if corners is None or len(corners) < MIN_POINTS:
+            return None
+        return corners.astype(np.float32) + np.array([x1, y1], dtype=np.float32)
+
+    def _publish(self, frame, source, tracked):
+        h, w = frame.image.shape[:2]
+        sx, sy = w / SMALL_SIZE[0], h / SMALL_SIZE[1]
+        items = tuple(
+            Detection(t.class_id, t.name, t.conf,
+                      (int(t.box[0] * sx), int(t.box[1] * sy), int(t.box[2] * sx), int(t.box[3] * sy)), tracked)
+            for t in self._tracks
+        )
+        return Detections(frame.seq, frame.captured_at, source, items)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Exports the agent's YOLO detector to ONNX, optionally with INT8 weights.
+
+    python export_detector.py                                   # yolov8n.pt -> yolov8n.onnx
+    python export_detector.py --int8 --calibration_dir frames/  # ... + yolov8n-int8.onnx
+    python export_detector.py --int8 --camera_frames 200        # calibrate on webcam frames
+
+The ONNX model has a fixed 640x480 input: the agent's 320x240 frames,
+letterboxed the way the PyTorch path does it (see inference_backends.py).
+
+INT8 uses onnxruntime static quantization (QDQ, per-channel weights). The
+activation ranges are calibrated on real frames that go through the same
+resize + letterbox as at run time, so calibrate on images that look like
+exam webcam footage. The detection head (the model's last module: box
+decoding and concatenated class scores) stays in float, as INT8 there costs
+most of the accuracy for little speed.
+Run benchmarks/bench_detector.py afterwards to check parity and speed.
+"""
+
+import argparse
+import glob
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+import cv2
+
+from frame_buffer import SMALL_SIZE
+from inference_backends import IMGSZ, preprocess
+
+IMAGE_PATTERNS = ("*.jpg", "*.jpeg", "*.png", "*.bmp")
+
+
+def export_onnx(weights, output):
+    from ultralytics import YOLO
+    exported = YOLO(weights).export(format="onnx", imgsz=list(IMGSZ), opset=12, simplify=True, dynamic=False)
+    if os.path.abspath(exported) != os.path.abspath(output):
+        shutil.move(exported, output)
+    print(f"[Export] {weights} -> {output}")
+
+
+def calibration_images(directory, camera_frames):
+    """BGR calibration frames, already resized to the agent's 320x240."""
+    images = []
+    if directory:
+        paths = sorted(p for pattern in IMAGE_PATTERNS for p in glob.glob(os.path.join(directory, pattern)))
+        for path in paths:
+            image = cv2.imread(path)
+            if image is not None:
+                images.append(cv2.resize(image, SMALL_SIZE))
+    if camera_frames:
+        target = len(images) + camera_frames
+        cap = cv2.VideoCapture(0)
+        try:
+            while cap.isOpened() and len(images) < target:
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                images.append(cv2.resize(frame, SMALL_SIZE))
+        finally:
+            cap.release()
+    return images
+
+
+def head_nodes(model_path):
+    """Names of the nodes in the model's last module (the Detect head), which stay in float."""
+    import onnx
+    nodes = onnx.load(model_path).graph.node
+    index = re.compile(r"^/model\.(\d+)/")
+    modules = [int(m.group(1)) for m in (index.match(node.name) for node in nodes) if m]
+    if not modules:
+        return []
+    prefix = f"/model.{max(modules)}/"
+    return [node.name for node in nodes if node.name.startswith(prefix)]
+
+
+def quantize_int8(model_path, output, images, keep_head_float=True):
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+    import onnxruntime as ort
+
+    input_name = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self):
+            self._blobs = iter([preprocess(image, IMGSZ)[0] for image in images])
+
+        def get_next(self):
+            blob = next(self._blobs, None)
+            return None if blob is None else {input_name: blob}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        prepared = os.path.join(tmp, "prepared.onnx")
+        quant_pre_process(model_path, prepared)
+        quantize_static(
+            prepared, output, FrameReader(),
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            weight_type=QuantType.QInt8,
+            activation_type=QuantType.QUInt8,
+            nodes_to_exclude=head_nodes(prepared) if keep_head_float else [],
+        )
+    print(f"[Export] INT8 ({len(images)} calibration frames) -> {output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the YOLO detector to ONNX (optionally INT8)")
+    parser.add_argument('--weights', type=str, default="yolov8n.pt", help="PyTorch weights to export")
+    parser.add_argument('--output', type=str, default="yolov8n.onnx", help="ONNX model to write")
+    parser.add_argument('--int8', action='store_true', help="Also write an INT8 model next to --output")
+    parser.add_argument('--int8_output', type=str, default=None, help="INT8 model path (default: <output>-int8.onnx)")
+    parser.add_argument('--calibration_dir', type=str, default=None, help="Folder of calibration images (webcam-like frames)")
+    parser.add_argument('--camera_frames', type=int, default=0, help="Also grab this many calibration frames from the webcam")
+    parser.add_argument('--quantize_head', action='store_true', help="Quantize the detection head too (smaller, less accurate)")
+    args = parser.parse_args()
+
+    # Ultralytics downloads the stock weights on first use, so they may not exist locally yet
+    stale = os.path.exists(args.weights) and os.path.exists(args.output) and os.path.getmtime(args.output) < os.path.getmtime(args.weights)
+    if not os.path.exists(args.output) or stale:
+        export_onnx(args.weights, args.output)
+    else:
+        print(f"[Export] {args.output} is up to date")
+
+    if args.int8:
+        images = calibration_images(args.calibration_dir, args.camera_frames)
+        if not images:
+            sys.exit("[Export] INT8 needs calibration frames: pass --calibration_dir and/or --camera_frames")
+        int8_output = args.int8_output or os.path.splitext(args.output)[0] + "-int8.onnx"
+        quantize_int8(args.output, int8_output, images, keep_head_float=not args.quantize_head)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Shared camera frame buffer for the ProctorAI client agent.
+
+The camera loop publishes every captured frame once; the model threads read
+it without copying:
+- a published frame is read-only (numpy `writeable=False`), so sharing the
+  array between threads is safe and any accidental in-place edit raises
+  instead of corrupting another stage's input;
+- every frame carries a sequence number and capture time, so a consumer
+  waits for a frame newer than the last one it processed instead of polling
+  and re-running a model on the same image;
+- the 320x240 BGR and RGB derivatives used by YOLO and the hand stage are
+  computed lazily, once per frame, by whichever stage asks first; so is the
+  64x48 grayscale thumbnail the motion gates compare (see motion.py).
+
+The last `capacity` frames stay available by sequence number (for stages
+that compare against a recent frame).
+"""
+
+import threading
+import time
+from collections import deque
+
+import cv2
+
+SMALL_SIZE = (320, 240)
+THUMBNAIL_SIZE = (64, 48)
+
+
+class Frame:
+    """One published frame. Treat all arrays as read-only; derivatives are cached."""
+
+    __slots__ = ("seq", "captured_at", "image", "_small_bgr", "_small_rgb", "_thumbnail", "_lock")
+
+    def __init__(self, seq, captured_at, image):
+        image.flags.writeable = False
+        self.seq = seq
+        self.captured_at = captured_at
+        self.image = image
+        self._small_bgr = None
+        self._small_rgb = None
+        self._thumbnail = None
+        self._lock = threading.Lock()
+
+    def small_bgr(self):
+        """320x240 BGR copy of the frame (YOLO input)."""
+        if self._small_bgr is None:
+            with self._lock:
+                if self._small_bgr is None:
+                    small = cv2.resize(self.image, SMALL_SIZE)
+                    small.flags.writeable = False
+                    self._small_bgr = small
+        return self._small_bgr
+
+    def small_rgb(self):
+        """320x240 RGB copy of the frame (hand stage input)."""
+        if self._small_rgb is None:
+            small_bgr = self.small_bgr()
+            with self._lock:
+                if self._small_rgb is None:
+                    small = cv2.cvtColor(small_bgr, cv2.COLOR_BGR2RGB)
+                    small.flags.writeable = False
+                    self._small_rgb = small
+        return self._small_rgb
+
+    def thumbnail(self):
+        """64x48 grayscale copy of the frame (scene-change detection)."""
+        if self._thumbnail is None:
+            small_bgr = self.small_bgr()
+            with self._lock:
+                if self._thumbnail is None:
+                    thumb = cv2.cvtColor(cv2.resize(small_bgr, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+                    thumb.flags.writeable = False
+                    self._thumbnail = thumb
+        return self._thumbnail
+
+
+class FrameBuffer:
+    """Versioned ring of the most recent frames; one publisher, any number of readers."""
+
+    def __init__(self, capacity=4):
+        self._frames = deque(maxlen=capacity)
+        self._cond = threading.Condition()
+        self._seq = 0
+
+    def publish(self, image, captured_at=None):
+        """Publishes a freshly captured frame (the array must not be modified afterwards)."""
+        with self._cond:
+            self._seq += 1
+            frame = Frame(self._seq, time.time() if captured_at is None else captured_at, image)
+            self._frames.append(frame)
+            self._cond.notify_all()
+        return frame
+
+    def latest(self):
+        with self._cond:
+            return self._frames[-1] if self._frames else None
+
+    def get(self, seq):
+        """The frame with sequence number `seq`, or None once it has left the ring."""
+        with self._cond:
+            for frame in self._frames:
+                if frame.seq == seq:
+                    return frame
+        return None
+
+    def wait_newer(self, after_seq, timeout=None):
+        """Blocks until a frame newer than `after_seq` is published; returns the latest one, or None on timeout."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > after_seq, timeout):
+                return None
+            return self._frames[-1]
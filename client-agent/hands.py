@@ -0,0 +1,91 @@
+"""
+Single hand/pose stage for the ProctorAI client agent.
+
+The agent used to run MediaPipe Hands in the face thread and Holistic in a
+thread of its own, on the same frame, only to check whether hand landmarks
+sit in the lower part of the image. HandStage runs one model per frame and
+derives both alerts from its hand landmarks:
+- hand_alert:    an index fingertip below HAND_ZONE_Y (hand on mouse/keyboard);
+- gesture_alert: any hand landmark below HAND_ZONE_Y (suspicious micro gesture).
+
+Modes (`--hand_mode`):
+- hands:      MediaPipe Hands only (the cheapest hand model);
+- holistic:   Holistic only (pose + face + hands in one graph, the heaviest);
+- pose_gated: the lite Pose model looks for wrists in the frame and Hands only
+              runs once one is visible; while Hands keeps finding hands it runs
+              alone, and the pose check resumes as soon as they are lost.
+Only the models a mode needs are loaded.
+"""
+
+import mediapipe as mp
+
+MODES = ("hands", "holistic", "pose_gated")
+HAND_ZONE_Y = 0.6  # Normalized image height below which a hand counts as "down"
+INDEX_FINGER_TIP = 8
+WRISTS = (15, 16)  # PoseLandmark.LEFT_WRIST, RIGHT_WRIST
+WRIST_VISIBILITY = 0.5
+
+
+def hand_alerts(hands):
+    """(hand_alert, gesture_alert) from a list of 21-point hand landmark lists (normalized coordinates)."""
+    gesture_alert = False
+    for landmarks in hands:
+        if landmarks[INDEX_FINGER_TIP].y > HAND_ZONE_Y:
+            return True, True
+        gesture_alert = gesture_alert or any(lm.y > HAND_ZONE_Y for lm in landmarks)
+    return False, gesture_alert
+
+
+def wrists_in_frame(pose_landmarks):
+    """True when the pose shows at least one wrist inside the image."""
+    if not pose_landmarks:
+        return False
+    for index in WRISTS:
+        lm = pose_landmarks.landmark[index]
+        if lm.visibility >= WRIST_VISIBILITY and 0.0 <= lm.x <= 1.0 and 0.0 <= lm.y <= 1.0:
+            return True
+    return False
+
+
+class HandStage:
+    def __init__(self, mode="hands"):
+        if mode not in MODES:
+            raise ValueError(f"Unknown hand mode {mode!r}; expected one of {', '.join(MODES)}")
+        self.mode = mode
+        self._hands = self._holistic = self._pose = None
+        if mode in ("hands", "pose_gated"):
+            self._hands = mp.solutions.hands.Hands(max_num_hands=2, min_detection_confidence=0.7)
+        if mode == "holistic":
+            self._holistic = mp.solutions.holistic.Holistic(min_detection_confidence=0.5, min_tracking_confidence=0.5)
+        if mode == "pose_gated":
+            self._pose = mp.solutions.pose.Pose(model_complexity=0, min_detection_confidence=0.5, min_tracking_confidence=0.5)
+        self._tracking = False  # pose_gated: Hands found hands on the previous turn
+        self.last_model = None  # Model(s) run on the last frame, for telemetry
+
+    def _run_hands(self, rgb):
+        results = self._hands.process(rgb)
+        return [hand.landmark for hand in (results.multi_hand_landmarks or [])]
+
+    def _find_hands(self, rgb):
+        if self.mode == "hands":
+            self.last_model = "hands"
+            return self._run_hands(rgb)
+        if self.mode == "holistic":
+            self.last_model = "holistic"
+            results = self._holistic.process(rgb)
+            return [hand.landmark for hand in (results.left_hand_landmarks, results.right_hand_landmarks) if hand]
+        if self._tracking:
+            self.last_model = "hands"
+            hands = self._run_hands(rgb)
+        else:
+            self.last_model = "pose"
+            hands = []
+            if wrists_in_frame(self._pose.process(rgb).pose_landmarks):
+                self.last_model = "pose+hands"
+                hands = self._run_hands(rgb)
+        self._tracking = bool(hands)
+        return hands
+
+    def process(self, rgb):
+        """Runs the configured model(s) on one RGB frame; returns (hand_alert, gesture_alert)."""
+        return hand_alerts(self._find_hands(rgb))
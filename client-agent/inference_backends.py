@@ -0,0 +1,131 @@
+"""
+Pluggable inference backends for the ProctorAI client agent's object detector.
+
+Every backend loads a YOLOv8 detector and exposes the same small interface:
+- `names`: {class id: class name};
+- `detect(image_bgr, classes, conf)`: (n, 6) float32 array of
+  [x1, y1, x2, y2, confidence, class id] rows in `image_bgr` pixels, only for
+  `classes` (None = all) at or above `conf`.
+
+Backends (`--detector_backend`):
+- torch: the Ultralytics YOLO model through PyTorch (CUDA when available);
+- onnx:  an exported .onnx model through onnxruntime on the CPU. No PyTorch
+         import at all, which is most of the agent's start-up time and memory
+         on student laptops. The same backend runs the INT8 model written by
+         export_detector.py --int8.
+
+Both letterbox the input to the same size (for the agent's 320x240 frames,
+640x480 without padding, what Ultralytics picks for that frame), so their
+outputs are directly comparable (benchmarks/bench_detector.py).
+"""
+
+import ast
+import os
+
+import cv2
+import numpy as np
+
+BACKENDS = ("torch", "onnx")
+DEFAULT_WEIGHTS = {"torch": "yolov8n.pt", "onnx": "yolov8n.onnx"}
+IMGSZ = (480, 640)  # (height, width) the 320x240 frames are letterboxed to
+IOU_THRESHOLD = 0.7  # Ultralytics' default NMS IoU
+MAX_DETECTIONS = 300
+LETTERBOX_COLOR = (114, 114, 114)
+
+
+def letterbox(image, shape):
+    """Resizes `image` into (height, width) `shape` keeping its aspect ratio; returns (image, scale, (left, top) padding)."""
+    h, w = image.shape[:2]
+    scale = min(shape[0] / h, shape[1] / w)
+    new_w, new_h = round(w * scale), round(h * scale)
+    if (new_w, new_h) != (w, h):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    dw, dh = (shape[1] - new_w) / 2, (shape[0] - new_h) / 2
+    top, bottom, left, right = round(dh - 0.1), round(dh + 0.1), round(dw - 0.1), round(dw + 0.1)
+    if top or bottom or left or right:
+        image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=LETTERBOX_COLOR)
+    return image, scale, (left, top)
+
+
+def preprocess(image_bgr, shape):
+    """NCHW float32 RGB blob in [0, 1] for the model input, plus the letterbox scale and padding."""
+    padded, scale, pad = letterbox(image_bgr, shape)
+    return cv2.dnn.blobFromImage(padded, 1 / 255.0, swapRB=True), scale, pad
+
+
+def _rows(boxes, scores, class_ids):
+    return np.column_stack((boxes, scores, class_ids)).astype(np.float32) if len(scores) else np.zeros((0, 6), np.float32)
+
+
+class TorchDetector:
+    def __init__(self, weights, imgsz=IMGSZ):
+        import torch
+        from ultralytics import YOLO
+        self.model = YOLO(weights)
+        self.model.to("cuda" if torch.cuda.is_available() else "cpu")
+        self.names = dict(self.model.names)
+        self.imgsz = list(imgsz)
+
+    def detect(self, image_bgr, classes=None, conf=0.25):
+        results = self.model(image_bgr, classes=classes, conf=conf, imgsz=self.imgsz, verbose=False)
+        if not results:
+            return np.zeros((0, 6), np.float32)
+        data = results[0].boxes.data.cpu().numpy()
+        return data[:, [0, 1, 2, 3, -2, -1]].astype(np.float32)
+
+
+class OnnxDetector:
+    def __init__(self, weights, threads=None):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(weights, sess_options=options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.imgsz = tuple(model_input.shape[2:4])
+        # Ultralytics stores the class names in the model metadata as a dict literal
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(metadata["names"]) if "names" in metadata else {}
+
+    def detect(self, image_bgr, classes=None, conf=0.25):
+        blob, scale, (left, top) = preprocess(image_bgr, self.imgsz)
+        # (1, 4 + classes, anchors) -> (anchors, 4 + classes): cx, cy, w, h, per-class scores
+        predictions = self.session.run(None, {self.input_name: blob})[0][0].T
+        scores = predictions[:, 4:]
+        class_ids = np.arange(scores.shape[1])
+        if classes is not None:
+            class_ids = np.asarray(classes, dtype=np.int64)
+            scores = scores[:, class_ids]
+        best = scores.argmax(axis=1)
+        confidence = scores[np.arange(len(scores)), best]
+        keep = confidence > conf
+        if not keep.any():
+            return np.zeros((0, 6), np.float32)
+        xywh, confidence, class_ids = predictions[keep, :4], confidence[keep], class_ids[best[keep]]
+        boxes = np.empty_like(xywh)
+        boxes[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+        boxes[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+        # Class-aware NMS: offsetting every class into its own region keeps classes from suppressing each other
+        offset = (class_ids * 7680.0)[:, None]
+        nms_boxes = np.column_stack((boxes[:, :2] + offset, xywh[:, 2:])).tolist()
+        kept = np.asarray(cv2.dnn.NMSBoxes(nms_boxes, confidence.tolist(), conf, IOU_THRESHOLD), dtype=np.int64).ravel()
+        kept = kept[np.argsort(-confidence[kept])][:MAX_DETECTIONS]
+        boxes = (boxes[kept] - np.array([left, top, left, top], dtype=np.float32)) / scale
+        h, w = image_bgr.shape[:2]
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, w)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, h)
+        return _rows(boxes, confidence[kept], class_ids[kept])
+
+
+def load_detector(backend, weights=None, threads=None):
+    """Detector for `backend` ("torch" or "onnx"); `weights` defaults to yolov8n.pt / yolov8n.onnx."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown detector backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+    weights = weights or DEFAULT_WEIGHTS[backend]
+    if backend == "torch":
+        return TorchDetector(weights)
+    if not os.path.exists(weights):
+        raise FileNotFoundError(f"{weights} not found; create it with: python export_detector.py")
+    return OnnxDetector(weights, threads=threads)
@@ -0,0 +1,147 @@
+"""
+Vectorized landmark math for the ProctorAI client agent.
+
+A FaceLandmarkerResult holds one Python object per landmark, so the old
+per-frame code paid for attribute lookups and small temporary lists on
+every distance. Here the landmarks the agent actually uses (eye contours,
+eye corners, irises) are copied once per frame, for every detected face,
+into one contiguous float32 array of shape (faces, len(USED_LANDMARKS), 3);
+everything else is batched NumPy over that array:
+- eye aspect ratio (EAR), averaged over both eyes;
+- gaze: mean horizontal iris position (what the gaze thresholds use);
+- yaw / pitch / roll in degrees from the facial transformation matrices.
+With a single face (the usual case) the same formulas run on plain floats
+instead: on 14 points NumPy's per-call overhead costs more than the math.
+Both paths guard their divisions and arcsines, so a degenerate landmark set
+yields odd numbers rather than an exception in the face thread.
+GazeHistory keeps the gaze velocity over a fixed ring, updated in O(1) per frame.
+"""
+
+import math
+from operator import itemgetter
+
+import numpy as np
+
+# MediaPipe FaceMesh indices: (p1, p2, p3, p4, p5, p6) with EAR = (|p1-p2| + |p3-p4|) / (2 |p5-p6|);
+# p5 is the outer and p6 the inner eye corner
+LEFT_EYE = (160, 144, 158, 153, 33, 133)
+RIGHT_EYE = (387, 373, 385, 380, 263, 362)
+LEFT_IRIS, RIGHT_IRIS = 468, 473
+# Floor for the eye width the EAR is divided by (landmarks are normalized image coordinates)
+MIN_EYE_WIDTH = 1e-6
+
+# Laid out so every computation below works on slices rather than gathers.
+# Rows 0-5 hold the first point of each EAR pair and rows 6-11 the second:
+# (left, right) first vertical pair, then the second pair, then the eye width
+# (outer corner in rows 4-5, inner corner in rows 10-11). Rows 12-13 are the irises.
+USED_LANDMARKS = (
+    LEFT_EYE[0], RIGHT_EYE[0], LEFT_EYE[2], RIGHT_EYE[2], LEFT_EYE[4], RIGHT_EYE[4],
+    LEFT_EYE[1], RIGHT_EYE[1], LEFT_EYE[3], RIGHT_EYE[3], LEFT_EYE[5], RIGHT_EYE[5],
+    LEFT_IRIS, RIGHT_IRIS,
+)
+
+
+_select_used = itemgetter(*USED_LANDMARKS)
+
+
+def to_array(face_landmarks, select=_select_used):
+    """(faces, len(USED_LANDMARKS), 3) float32 array of the selected landmarks of every face."""
+    return np.array([[(lm.x, lm.y, lm.z) for lm in select(face)] for face in face_landmarks], dtype=np.float32)
+
+
+def eye_aspect_ratios(points):
+    """EAR per face, averaged over both eyes; `points` comes from to_array()."""
+    diff = points[:, 0:6] - points[:, 6:12]
+    d = np.sqrt((diff * diff).sum(axis=2))  # (faces, 6): vertical 1 (L, R), vertical 2 (L, R), width (L, R)
+    return ((d[:, 0:2] + d[:, 2:4]) / np.maximum(d[:, 4:6], MIN_EYE_WIDTH)).sum(axis=1) * 0.25
+
+
+def gaze(points):
+    """Mean horizontal iris position per face."""
+    return points[:, 12:14, 0].sum(axis=1) * 0.5
+
+
+def head_pose(matrices):
+    """(yaw, pitch, roll) in degrees per face from the 4x4 facial transformation matrices."""
+    m = np.array(matrices, dtype=np.float64).reshape(-1, 16)
+    return np.degrees((
+        np.arcsin(np.clip(-m[:, 8], -1.0, 1.0)),
+        np.arctan2(m[:, 9], m[:, 10]),
+        np.arctan2(m[:, 4], m[:, 0]),
+    ))
+
+
+class FaceMetrics:
+    """Per-face arrays for one FaceLandmarker result; index 0 is the first (primary) face."""
+
+    __slots__ = ("count", "ear", "gaze_x", "yaw", "pitch", "roll")
+
+    def __init__(self, result):
+        if len(result.face_landmarks) == 1:
+            self._single(result)
+            return
+        points = to_array(result.face_landmarks)
+        self.count = len(points)
+        self.ear = eye_aspect_ratios(points)
+        self.gaze_x = gaze(points)
+        if result.facial_transformation_matrixes:
+            self.yaw, self.pitch, self.roll = head_pose(result.facial_transformation_matrixes)
+        else:
+            self.yaw = self.pitch = self.roll = None
+
+    def _single(self, result):
+        """Same metrics for one face on Python floats; every field is still a one-element array."""
+        p = [(lm.x, lm.y, lm.z) for lm in _select_used(result.face_landmarks[0])]
+        d = [math.dist(p[i], p[i + 6]) for i in range(6)]
+        values = [
+            ((d[0] + d[2]) / max(d[4], MIN_EYE_WIDTH) + (d[1] + d[3]) / max(d[5], MIN_EYE_WIDTH)) * 0.25,
+            (p[12][0] + p[13][0]) * 0.5,
+        ]
+        if result.facial_transformation_matrixes:
+            m = result.facial_transformation_matrixes[0]
+            values += [
+                math.degrees(math.asin(min(1.0, max(-1.0, -m[2][0])))),
+                math.degrees(math.atan2(m[2][1], m[2][2])),
+                math.degrees(math.atan2(m[1][0], m[0][0])),
+            ]
+        v = np.array(values)
+        self.count = 1
+        self.ear, self.gaze_x = v[0:1], v[1:2]
+        if len(values) > 2:
+            self.yaw, self.pitch, self.roll = v[2:3], v[3:4], v[4:5]
+        else:
+            self.yaw = self.pitch = self.roll = None
+
+
+def analyze(result):
+    """FaceMetrics for a FaceLandmarkerResult, or None when no face was found."""
+    if not result or not result.face_landmarks:
+        return None
+    return FaceMetrics(result)
+
+
+class GazeHistory:
+    """Mean absolute frame-to-frame gaze change over the last `size` samples, updated in O(1)."""
+
+    def __init__(self, size=5):
+        self.size = size
+        # Preallocated rings of Python floats: scalar updates are cheaper than on NumPy arrays
+        self._values = [0.0] * size
+        self._steps = [0.0] * (size - 1)
+        self._count = 0
+        self._step_sum = 0.0
+
+    def append(self, value):
+        if self._count:
+            step = abs(value - self._values[(self._count - 1) % self.size])
+            slot = (self._count - 1) % (self.size - 1)
+            if self._count >= self.size:
+                self._step_sum -= self._steps[slot]
+            self._steps[slot] = step
+            self._step_sum += step
+        self._values[self._count % self.size] = value
+        self._count += 1
+
+    def velocity(self):
+        steps = min(self._count, self.size) - 1
+        return max(0.0, self._step_sum / steps) if steps > 0 else 0.0
@@ -19,33 +19,48 @@ import subprocess
 import sys
 import time
 import threading
-from collections import deque
 from datetime import datetime
-import queue
-import requests
 import urllib.request
 import argparse # ✨ NEW IMPORT
 
 import cv2
 import numpy as np
-import torch
 import speech_recognition as sr
-from ultralytics import YOLO
 
 import mediapipe as mp
 from mediapipe.tasks import python as mp_tasks
 from mediapipe.tasks.python import vision
 from mediapipe.tasks.python.vision.face_landmarker import FaceLandmarkerResult
 
+from detection import NO_DETECTIONS, DetectionTracker
+from frame_buffer import FrameBuffer
+from hands import MODES as HAND_MODES, HandStage
+from heartbeat import EventReporter
+from inference_backends import BACKENDS as DETECTOR_BACKENDS, load_detector
+import landmarks
+from motion import MotionGate, StaticSceneDetector
+from scheduler import Scheduler
+from telemetry import Telemetry
+from uploader import BatchUploader
+
 # =====================================
 # 🔹 Configuration & Models
 # =====================================
-SERVER_URL = "http://127.0.0.1:5000/log_data"
+SERVER_URL = "http://127.0.0.1:5000/log_batch"  # Batched, gzip-compressed uploads (see uploader.py)
 
 # ✨ NEW: Argument Parsing
 parser = argparse.ArgumentParser(description="ProctorAI Client Agent")
 parser.add_argument('--username', type=str, required=True, help="The student's username")
 parser.add_argument('--exam_id', type=str, required=True, help="The unique ID for this exam")
+parser.add_argument('--heartbeat', type=float, default=10.0, help="Seconds between heartbeat events when alerts don't change")
+parser.add_argument('--telemetry_file', type=str, default="agent_telemetry.jsonl", help="JSONL file for periodic performance snapshots ('' to disable)")
+parser.add_argument('--send_telemetry', action='store_true', help="Attach a compact performance summary to heartbeats")
+parser.add_argument('--hand_mode', type=str, default="hands", choices=HAND_MODES, help="Hand model: MediaPipe Hands, Holistic, or Hands gated by a lite Pose wrist check")
+parser.add_argument('--motion_threshold', type=float, default=0.01, help="Fraction of thumbnail pixels that must change before a detector runs again (0 disables motion gating)")
+parser.add_argument('--gate_face', action='store_true', help="Also motion-gate the face landmarker (may miss blinks while the head is still)")
+parser.add_argument('--detector_backend', type=str, default="torch", choices=DETECTOR_BACKENDS, help="Object detector runtime: PyTorch, or an exported ONNX model on onnxruntime (CPU)")
+parser.add_argument('--detector_weights', type=str, default=None, help="Detector weights (default: yolov8n.pt for torch, yolov8n.onnx for onnx; see export_detector.py)")
+parser.add_argument('--cpu_budget', type=float, default=max(1.0, (os.cpu_count() or 2) / 2), help="CPU cores the model threads may use together (default: half the cores)")
 args = parser.parse_args()
 
 # ✨ MODIFIED: Use args to set constants
@@ -83,39 +98,54 @@ from pathlib import Path
 LANDMARKER_TASK_PATH = str(Path(LANDMARKER_TASK_FILE).resolve())
 print(f"[ℹ️] Using face landmarker task file: {LANDMARKER_TASK_PATH}")
 
-# ... (YOLO and MediaPipe initializations are unchanged) ...
-yolo_model = None
+# ... (MediaPipe initializations are unchanged) ...
+# Low-cadence YOLO restricted to phones/laptops, with optical-flow tracking in between (see detection.py);
+# the runtime behind it is pluggable (see inference_backends.py)
+detector = None
 try:
-    yolo_model = YOLO("yolov8n.pt")
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    if yolo_model:
-        yolo_model.to(device)
+    detector = DetectionTracker(load_detector(args.detector_backend, args.detector_weights))
 except Exception as e:
-    print(f"[⚠️] Warning: Could not load YOLO model: {e}")
+    print(f"[⚠️] Warning: Could not load YOLO model ({args.detector_backend}): {e}")
 
-mp_hands = mp.solutions.hands.Hands(max_num_hands=2, min_detection_confidence=0.7)
-mp_holistic = mp.solutions.holistic.Holistic(min_detection_confidence=0.5, min_tracking_confidence=0.5)
+# One hand model per frame feeds both hand alerts (see hands.py)
+hand_stage = HandStage(args.hand_mode)
 
 # =====================================
 # 🔹 Global Flags & Dynamic Thresholds
 # =====================================
 # ... (all global flags and thresholds are unchanged) ...
 running = True
-data_to_send = queue.Queue()
+uploader = BatchUploader(SERVER_URL, journal_path=os.path.join(SCRIPT_DIR, "upload_journal.jsonl"))
 voice_active = False
 last_voice_time = 0.0
 face_data = {"count": 0, "turned_away": False, "no_face": False, "eye_alert": False, "blink": 0, "eye_velocity": 0.0, "emotion": "N/A"}
 hand_alert = False
-yolo_results = None
+detections = NO_DETECTIONS  # Latest immutable Detections record; replaced whole, so read without a lock
 gesture_alert = False
 face_lock = threading.Lock()
-yolo_lock = threading.Lock()
 hand_lock = threading.Lock()
 gesture_lock = threading.Lock()
 voice_lock = threading.Lock()  # ✨ ADDED
 last_spoken_text = ""        # ✨ ADDED
 current_alerts = set()
-gaze_history = deque(maxlen=5)
+event_reporter = EventReporter(interval=args.heartbeat)  # Only alert changes + periodic heartbeats are sent
+# Per-stage latency, rate, frame staleness and CPU (see telemetry.py); 't' toggles the overlay
+telemetry = Telemetry(dump_path=os.path.join(SCRIPT_DIR, args.telemetry_file) if args.telemetry_file else None)
+show_telemetry = True
+# Model threads run at rates planned against the CPU budget instead of fixed sleeps (see scheduler.py).
+# Face presence never pauses; phone detection and hand tracking slow down while the scene is static.
+scheduler = Scheduler(cpu_budget=args.cpu_budget)
+scheduler.add_stage("face", priority=3, min_hz=5, max_hz=15)
+scheduler.add_stage("yolo", priority=2, min_hz=1, max_hz=4, pausable=True)
+scheduler.add_stage("hands", priority=1, min_hz=2, max_hz=10, pausable=True)
+scene_detector = StaticSceneDetector()
+# Detectors reuse their last result while the image is unchanged, up to a staleness bound (see motion.py)
+motion_gates = {
+    "yolo": MotionGate(max_stale=2.0, changed_fraction=args.motion_threshold),
+    "hands": MotionGate(max_stale=1.0, changed_fraction=args.motion_threshold),
+    "face": MotionGate(max_stale=0.5, changed_fraction=args.motion_threshold if args.gate_face else 0),
+}
+gaze_history = landmarks.GazeHistory(5)
 DYNAMIC_THRESHOLDS = {"head_yaw": 15.0, "gaze_min": 0.35, "gaze_max": 0.65, "ear": 0.21}
 environment_status = "Calibrating..."
 EAR_CONSEC_FRAMES = 3
@@ -187,18 +217,6 @@ def beep_once():
     sys.stdout.write("\a")
     sys.stdout.flush()
 
-def eye_aspect_ratio(landmarks):
-    # ... (function is unchanged) ...
-    def dist(p1, p2):
-        return np.linalg.norm([p1.x - p2.x, p1.y - p2.y, p1.z - p2.z])
-    left_p1, left_p2, left_p3, left_p4 = landmarks[160], landmarks[144], landmarks[158], landmarks[153]
-    left_p5, left_p6 = landmarks[33], landmarks[133]
-    ear_left = (dist(left_p1, left_p2) + dist(left_p3, left_p4)) / (2.0 * dist(left_p5, left_p6))
-    right_p1, right_p2, right_p3, right_p4 = landmarks[387], landmarks[373], landmarks[385], landmarks[380]
-    right_p5, right_p6 = landmarks[263], landmarks[362]
-    ear_right = (dist(right_p1, right_p2) + dist(right_p3, right_p4)) / (2.0 * dist(right_p5, right_p6))
-    return (ear_left + ear_right) / 2.0
-
 def map_blendshapes_to_emotion(blendshapes):
     # ... (function is unchanged) ...
     if not blendshapes: return "N/A"
@@ -214,38 +232,22 @@ def map_blendshapes_to_emotion(blendshapes):
 # 🔹 Worker Threads
 # =====================================
 def send_data_thread():
-    # ... (function is unchanged) ...
-    while running:
-        try:
-            payload = data_to_send.get(timeout=1)
-            requests.post(SERVER_URL, json=payload, timeout=5)
-        except queue.Empty:
-            continue
-        except requests.exceptions.RequestException as e:
-            print(f"[Network] Connection error: {e}")
-        except Exception as e:
-            print(f"[Network] An unexpected error occurred: {e}")
+    # Coalesces queued events into gzip batches over a keep-alive session,
+    # journaling to disk while offline and replaying on reconnect.
+    try:
+        uploader.run()
+    except Exception as e:
+        print(f"[Network] An unexpected error occurred: {e}")
 
 last_alert_state = False
 def beep_thread():
     # ... (function is unchanged) ...
-    global last_alert_state, yolo_results
+    global last_alert_state
     while running:
         with face_lock:
             alert_state = face_data["turned_away"] or face_data["eye_alert"] or face_data["no_face"]
-        alert_state = alert_state or hand_alert or gesture_alert
-        if yolo_model and yolo_results:
-            with yolo_lock:
-                try:
-                    boxes_data = getattr(yolo_results.boxes, "data", yolo_results.boxes.xyxy)
-                    rows = boxes_data.tolist()
-                    for r in rows:
-                        conf, cls = r[4], r[5]
-                        cls_name = yolo_model.names[int(cls)]
-                        if cls_name in ["cell phone", "laptop"] and float(conf) > 0.7:
-                            alert_state = True
-                            break
-                except Exception: pass
+        # Every published detection is an alert class above the confidence threshold
+        alert_state = alert_state or hand_alert or gesture_alert or bool(detections.items)
         if alert_state and not last_alert_state:
             beep_once()
         last_alert_state = alert_state
@@ -278,34 +280,39 @@ def start_voice_listener():
         print(f"[⚠️] Microphone not available: {e}")
         return lambda wait_for_stop=True: None
 
-def yolo_thread(frame_getter):
-    # ... (function is unchanged) ...
-    global yolo_results
-    if not yolo_model: return
-    frame_skip = 3
-    count = 0
+def yolo_thread(frames):
+    global detections
+    if not detector: return
+    last_seq = 0
     while running:
-        frame = frame_getter()
+        # With live tracks every new frame is followed and YOLO runs when its slot comes;
+        # without any, the thread just sleeps until the next YOLO slot
+        if detector.tracking:
+            frame = frames.wait_newer(last_seq, timeout=0.5)
+            detect = scheduler.due("yolo")
+        elif scheduler.wait_turn("yolo"):
+            frame = frames.wait_newer(last_seq, timeout=0.5)
+            detect = True
+        else:
+            break
         if frame is None:
-            time.sleep(0.05)
-            continue
-        count += 1
-        if count % frame_skip != 0:
-            time.sleep(0.03)
             continue
+        last_seq = frame.seq
         try:
-            results = yolo_model(cv2.resize(frame, (320, 240)), verbose=False)
-            if results:
-                with yolo_lock:
-                    yolo_results = results[0]
+            if detect and motion_gates["yolo"].should_run(frame):
+                with telemetry.measure("yolo", frame.seq, frame.captured_at), scheduler.measure("yolo"):
+                    detections = detector.detect(frame)
+                continue
+            if detect:
+                telemetry.skip("yolo")
+            if detector.tracking:
+                with telemetry.measure("track", frame.seq, frame.captured_at):
+                    detections = detector.track(frame)
         except Exception:
-            with yolo_lock:
-                yolo_results = None
-        time.sleep(0.05)
+            detections = NO_DETECTIONS
 
-def face_landmarker_thread(frame_getter):
-    # ... (function is unchanged) ...
-    global face_data, hand_alert, gaze_history, blink_counter, total_blinks
+def face_landmarker_thread(frames):
+    global face_data, gaze_history, blink_counter, total_blinks
     no_face_start = None
     BaseOptions = mp_tasks.BaseOptions
     FaceLandmarkerOptions = mp_tasks.vision.FaceLandmarkerOptions
@@ -362,38 +369,39 @@ def face_landmarker_thread(frame_getter):
         print(f"[❌] Failed to create FaceLandmarker. Attempts:\n{tried}")
         return
     frame_timestamp_ms = 0
-    while running:
-        frame = frame_getter()
+    last_seq = 0
+    while running and scheduler.wait_turn("face"):
+        frame = frames.wait_newer(last_seq, timeout=0.5)
         if frame is None:
-            time.sleep(0.05)
             continue
-        ih, iw = frame.shape[:2]
-        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=frame)
-        frame_timestamp_ms = int(time.time() * 1000)
+        last_seq = frame.seq
+        if not motion_gates["face"].should_run(frame):
+            telemetry.skip("face")
+            continue
+        turn_started = time.monotonic()
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=frame.image)
+        # VIDEO mode needs strictly increasing timestamps; use the capture time
+        frame_timestamp_ms = max(frame_timestamp_ms + 1, int(frame.captured_at * 1000))
         try:
-            results: FaceLandmarkerResult = landmarker.detect_for_video(mp_image, frame_timestamp_ms)
+            with telemetry.measure("face", frame.seq, frame.captured_at):
+                results: FaceLandmarkerResult = landmarker.detect_for_video(mp_image, frame_timestamp_ms)
         except Exception:
             continue
+        # Landmark math for every face, computed outside the lock (see landmarks.py)
+        metrics = landmarks.analyze(results)
         with face_lock:
             face_data["eye_velocity"] = 0.0
-            if results and results.face_landmarks:
-                face_data["count"] = len(results.face_landmarks)
+            if metrics:
+                face_data["count"] = metrics.count
                 face_data.update({"turned_away": False, "no_face": False, "eye_alert": False})
-                first_face_landmarks = results.face_landmarks[0]
-                if results.facial_transformation_matrixes:
-                    matrix = results.facial_transformation_matrixes[0]
-                    head_yaw = np.degrees(np.arcsin(-matrix[2][0]))
-                    if abs(head_yaw) > DYNAMIC_THRESHOLDS["head_yaw"]:
-                        face_data["turned_away"] = True
-                li, ri = first_face_landmarks[468], first_face_landmarks[473]
-                gaze_x = (li.x + ri.x) / 2
+                if metrics.yaw is not None and abs(metrics.yaw[0]) > DYNAMIC_THRESHOLDS["head_yaw"]:
+                    face_data["turned_away"] = True
+                gaze_x = float(metrics.gaze_x[0])
                 gaze_history.append(gaze_x)
-                if len(gaze_history) > 1:
-                    face_data["eye_velocity"] = float(np.mean(np.abs(np.diff(list(gaze_history)))))
+                face_data["eye_velocity"] = gaze_history.velocity()
                 if not (DYNAMIC_THRESHOLDS["gaze_min"] < gaze_x < DYNAMIC_THRESHOLDS["gaze_max"]):
                     face_data["eye_alert"] = True
-                ear_val = eye_aspect_ratio(first_face_landmarks)
-                if ear_val < DYNAMIC_THRESHOLDS["ear"]:
+                if metrics.ear[0] < DYNAMIC_THRESHOLDS["ear"]:
                     blink_counter += 1
                 else:
                     if blink_counter >= EAR_CONSEC_FRAMES:
@@ -409,40 +417,28 @@ def face_landmarker_thread(frame_getter):
                     face_data.update({"count": 0, "turned_away": False, "no_face": True, "eye_alert": False, "emotion": "N/A"})
                 else:
                     face_data.update({"count": 0, "turned_away": False, "no_face": False, "eye_alert": False, "emotion": "N/A"})
-        small_rgb = cv2.cvtColor(cv2.resize(frame, (320, 240)), cv2.COLOR_BGR2RGB)
+        scheduler.record("face", time.monotonic() - turn_started)
+
+def hand_thread(frames):
+    global hand_alert, gesture_alert
+    last_seq = 0
+    while running and scheduler.wait_turn("hands"):
+        frame = frames.wait_newer(last_seq, timeout=0.5)
+        if frame is None: continue
+        last_seq = frame.seq
+        if not motion_gates["hands"].should_run(frame):
+            telemetry.skip("hands")
+            continue
         try:
-            results_hands = mp_hands.process(small_rgb)
-            with hand_lock:
-                hand_alert = False
-                if results_hands and results_hands.multi_hand_landmarks:
-                    for hand_landmarks in results_hands.multi_hand_landmarks:
-                        if hand_landmarks.landmark[8].y * ih > ih * 0.6:
-                            hand_alert = True
-                            break
+            with telemetry.measure("hands", frame.seq, frame.captured_at), scheduler.measure("hands"):
+                # Shared 320x240 RGB derivative, computed once per frame
+                hands_down, gesture = hand_stage.process(frame.small_rgb())
         except Exception:
-            with hand_lock:
-                hand_alert = False
-        time.sleep(0.05)
-
-def holistic_thread(frame_getter):
-    # ... (function is unchanged) ...
-    global gesture_alert
-    while running:
-        frame = frame_getter()
-        if frame is None: time.sleep(0.05); continue
-        try:
-            results = mp_holistic.process(cv2.cvtColor(cv2.resize(frame, (320, 240)), cv2.COLOR_BGR2RGB))
-        except Exception: continue
+            hands_down = gesture = False
+        with hand_lock:
+            hand_alert = hands_down
         with gesture_lock:
-            gesture_alert = False
-            try:
-                if results and (results.left_hand_landmarks or results.right_hand_landmarks):
-                    all_landmarks = (results.left_hand_landmarks.landmark if results.left_hand_landmarks else []) + \
-                                    (results.right_hand_landmarks.landmark if results.right_hand_landmarks else [])
-                    if any(lm.y > 0.6 for lm in all_landmarks):
-                        gesture_alert = True
-            except Exception: pass
-        time.sleep(0.05)
+            gesture_alert = gesture
 
 # =====================================
 # 🔹 Main Program Execution
@@ -453,16 +449,16 @@ if not cap.isOpened():
     sys.exit(1)
 
 calibrate_environment(cap)
-current_frame = None
-def get_frame(): return current_frame.copy() if current_frame is not None else None
+# Each captured frame is published once and shared read-only by the model threads (see frame_buffer.py)
+frames = FrameBuffer()
 
 print("[🚀] Starting all threads...")
 stop_listen = start_voice_listener()
 threading.Thread(target=send_data_thread, daemon=True).start()
 threading.Thread(target=beep_thread, daemon=True).start()
-threading.Thread(target=yolo_thread, args=(get_frame,), daemon=True).start()
-threading.Thread(target=face_landmarker_thread, args=(get_frame,), daemon=True).start()
-threading.Thread(target=holistic_thread, args=(get_frame,), daemon=True).start()
+threading.Thread(target=yolo_thread, args=(frames,), daemon=True).start()
+threading.Thread(target=face_landmarker_thread, args=(frames,), daemon=True).start()
+threading.Thread(target=hand_thread, args=(frames,), daemon=True).start()
 
 print("[🎥] Camera started... Press 'q' in the OpenCV window to quit.")
 
@@ -472,7 +468,10 @@ try:
         if not ret:
             print("[⚠️] Frame read failed, stopping.")
             break
-        current_frame = frame.copy()
+        # cap.read() returns a new array every time, so it can be shared as is
+        published = frames.publish(frame)
+        telemetry.frame_captured(published.captured_at)
+        scheduler.set_scene_static(scene_detector.update(published))
         current_alerts.clear()
 
         # ... (Alert aggregation logic is unchanged) ...
@@ -492,21 +491,13 @@ try:
                         current_alerts.add(f"VOICE: {last_spoken_text}")
                         last_spoken_text = "" # Clear it so it's not sent again
         
-        annotated = frame.copy()
+        annotated = frame.copy()  # The published frame is read-only; overlays go on a private copy
 
-        with yolo_lock:
-            results_yolo = yolo_results
-            if results_yolo and yolo_model:
-                try:
-                    scale_x, scale_y = frame.shape[1] / 320, frame.shape[0] / 240
-                    boxes = getattr(results_yolo.boxes, "data", results_yolo.boxes.xyxy).tolist()
-                    for r in boxes:
-                        x1, y1, x2, y2, conf, cls_id = r[:6]
-                        cls_name = yolo_model.names[int(cls_id)]
-                        if cls_name in ["cell phone", "laptop"] and conf > 0.7:
-                            current_alerts.add(f"{cls_name.upper()} detected!")
-                            cv2.rectangle(annotated, (int(x1*scale_x), int(y1*scale_y)), (int(x2*scale_x), int(y2*scale_y)), (0,255,0), 2)
-                except Exception: pass
+        # Boxes are already in full-frame pixels (see detection.py)
+        for detection in detections.items:
+            current_alerts.add(f"{detection.name.upper()} detected!")
+            x1, y1, x2, y2 = detection.box
+            cv2.rectangle(annotated, (x1, y1), (x2, y2), (0,255,0), 2)
         
         with hand_lock:
             if hand_alert: current_alerts.add("Hand on mouse/keyboard detected!")
@@ -519,14 +510,22 @@ try:
             metrics_payload['total_blinks'] = total_blinks
             metrics_payload['source'] = 'python-client' # Identify source
 
-        payload = {
-            "student_id": STUDENT_ID,   # This is the username (e.g., 'student1')
-            "session_id": SESSION_ID,   # The new session ID (e.g., 'exam_3_student1_...')
-            "timestamp": datetime.utcnow().isoformat() + "Z",
-            "alerts": sorted(list(current_alerts)),
-            "metrics": metrics_payload
-        }
-        data_to_send.put(payload)
+        # Only alert-set transitions and periodic heartbeats leave the machine
+        alerts_list = sorted(list(current_alerts))
+        event = event_reporter.observe(alerts_list, metrics_payload, time.time())
+        if event:
+            kind, metrics_to_send = event
+            if kind == "heartbeat" and args.send_telemetry:
+                metrics_to_send = dict(metrics_to_send, telemetry=telemetry.compact())
+            payload = {
+                "student_id": STUDENT_ID,   # This is the username (e.g., 'student1')
+                "session_id": SESSION_ID,   # The new session ID (e.g., 'exam_3_student1_...')
+                "timestamp": datetime.utcnow().isoformat() + "Z",
+                "kind": kind,               # 'transition' or 'heartbeat'
+                "alerts": alerts_list,
+                "metrics": metrics_to_send
+            }
+            uploader.put(payload)
 
         # --- Draw Overlays (unchanged) ---
         y_offset = 60
@@ -543,17 +542,35 @@ try:
             cv2.putText(annotated, f"Blinks: {total_blinks}", (20, y_offset + 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
             cv2.putText(annotated, f"Gaze Vel: {face_data['eye_velocity']:.3f}", (20, y_offset + 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
         cv2.putText(annotated, environment_status, (10, annotated.shape[0] - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+        if show_telemetry:
+            plan = scheduler.status()
+            lines = telemetry.overlay_lines() + [
+                f"Plan ({'static' if plan['static'] else 'active'}, {plan['cpu']:.1f}/{plan['budget']:.1f} cores): "
+                + ", ".join(f"{name} {rate:.1f}" for name, rate in plan["rates"].items())
+            ]
+            for i, line in enumerate(lines):
+                y = annotated.shape[0] - 40 - 22 * (len(lines) - 1 - i)
+                cv2.putText(annotated, line, (annotated.shape[1] - 420, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
         cv2.imshow("ProctorAI Client", annotated)
+        telemetry.maybe_dump()
 
         if voice_active and (time.time() - last_voice_time > SILENCE_TIMEOUT):
             voice_active = False
-        if cv2.waitKey(1) & 0xFF == ord('q'):
+        key = cv2.waitKey(1) & 0xFF
+        if key == ord('q'):
             break
+        if key == ord('t'):
+            show_telemetry = not show_telemetry
 except KeyboardInterrupt:
     print("\n[🛑] Interrupted by user.")
 finally:
     running = False
+    scheduler.stop()
     print("[⚙️] Shutting down...")
+    uploader.stop()
+    telemetry.maybe_dump(force=True)
+    print(f"[📡] Sent {event_reporter.events_sent} events for {event_reporter.frames_seen} frames "
+          f"({uploader.spilled} journaled for later upload).")
     if 'stop_listen' in locals() and stop_listen:
         stop_listen(wait_for_stop=False)
     cap.release()
@@ -0,0 +1,87 @@
+"""
+Scene-change detection for the ProctorAI client agent.
+
+Most of an exam the student sits still, so consecutive frames are nearly
+identical and re-running a detector on them buys nothing. Every published
+frame carries a 64x48 grayscale thumbnail (Frame.thumbnail(), computed once
+and shared); two frames count as different when either
+- more than `changed_fraction` of the thumbnail pixels moved by more than
+  `pixel_delta` grey levels (someone moved, a phone came into view), or
+- the L1 distance between their 32-bin grey histograms (0 = same, 1 = disjoint)
+  exceeds `histogram_distance` (lighting or exposure changed).
+
+MotionGate sits in front of one stage: the stage only runs when the frame
+differs from the last frame it actually ran on (so slow drift still adds up),
+or when its result is older than `max_stale` seconds, so no detector is
+skipped indefinitely. Skips are counted in telemetry per stage.
+
+StaticSceneDetector uses the same comparison between consecutive frames to
+tell the scheduler when the whole scene has been still for a while.
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+HISTOGRAM_BINS = 32
+
+
+def _histogram(thumbnail):
+    hist = cv2.calcHist([thumbnail], [0], None, [HISTOGRAM_BINS], [0, 256]).ravel()
+    return hist / max(1.0, float(hist.sum()))
+
+
+def scene_change(a, b, pixel_delta=20):
+    """(changed pixel fraction, histogram distance) between two grayscale thumbnails."""
+    moved = cv2.absdiff(a, b) > pixel_delta
+    return float(moved.mean()), 0.5 * float(np.abs(_histogram(a) - _histogram(b)).sum())
+
+
+def differs(a, b, changed_fraction=0.01, histogram_distance=0.1, pixel_delta=20):
+    """True when two thumbnails show a meaningfully different scene; a threshold of 0 always reports a change."""
+    if changed_fraction <= 0:
+        return True
+    moved, histogram = scene_change(a, b, pixel_delta)
+    return moved > changed_fraction or histogram > histogram_distance
+
+
+class MotionGate:
+    """Decides, frame by frame, whether one stage has to run again or can keep its last result."""
+
+    def __init__(self, max_stale, changed_fraction=0.01, histogram_distance=0.1):
+        self.max_stale = max_stale
+        self.changed_fraction = changed_fraction
+        self.histogram_distance = histogram_distance
+        self._reference = None  # Thumbnail of the last frame the stage ran on
+        self._ran_at = 0.0
+
+    def should_run(self, frame, now=None):
+        """True when `frame` has to be processed; the caller then runs the stage on it."""
+        now = time.monotonic() if now is None else now
+        thumbnail = frame.thumbnail()
+        if (self._reference is None or now - self._ran_at >= self.max_stale
+                or differs(self._reference, thumbnail, self.changed_fraction, self.histogram_distance)):
+            self._reference, self._ran_at = thumbnail, now
+            return True
+        return False
+
+
+class StaticSceneDetector:
+    """Flags the scene as static once consecutive frames stop changing for `static_after` seconds."""
+
+    def __init__(self, static_after=3.0, changed_fraction=0.01, histogram_distance=0.1):
+        self.static_after = static_after
+        self.changed_fraction = changed_fraction
+        self.histogram_distance = histogram_distance
+        self._previous = None
+        self._last_change = time.monotonic()
+
+    def update(self, frame, now=None):
+        """Feeds one published frame; returns True while the scene is static."""
+        now = time.monotonic() if now is None else now
+        thumbnail = frame.thumbnail()
+        if self._previous is None or differs(self._previous, thumbnail, self.changed_fraction, self.histogram_distance):
+            self._last_change = now
+        self._previous = thumbnail
+        return now - self._last_change >= self.static_after
@@ -0,0 +1,157 @@
+"""
+Adaptive inference scheduler for the ProctorAI client agent's model threads.
+
+Instead of fixed sleeps and frame skips, every model thread asks the
+scheduler for its next turn (`wait_turn`) and reports how long each
+inference took (`measure`). Every `adjust_interval` seconds the scheduler
+re-plans the rate of each stage against a CPU budget (in cores):
+- each stage has a priority and a [min_hz, max_hz] range; minimum rates are
+  always granted, so every detector keeps running even on a weak laptop;
+- what is left of the budget goes to stages in priority order, up to their
+  max_hz, using each stage's measured cost (seconds per inference);
+- CPU used outside the stages (camera loop, overlay, audio) is measured
+  through the process CPU time and taken off the budget first;
+- while the scene is static (motion.StaticSceneDetector), pausable stages drop
+  to `static_hz`, so expensive detectors only look again every few seconds
+  until something moves.
+Rates move halfway towards the new plan on each adjustment, which avoids
+oscillating when costs are noisy.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+INITIAL_COST = 0.05  # Assumed seconds per inference until a stage has been measured
+
+
+class Stage:
+    def __init__(self, name, priority, min_hz, max_hz, pausable):
+        self.name = name
+        self.priority = priority
+        self.min_hz = min_hz
+        self.max_hz = max_hz
+        self.pausable = pausable
+        self.rate = min_hz
+        self.cost = INITIAL_COST
+        self.next_due = 0.0
+
+
+class Scheduler:
+    def __init__(self, cpu_budget, adjust_interval=2.0, static_hz=0.2):
+        self.cpu_budget = cpu_budget
+        self.adjust_interval = adjust_interval
+        self.static_hz = static_hz
+        self.scene_static = False
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._last_adjust = time.monotonic()
+        self._last_cpu = time.process_time()
+        self.process_cpu = 0.0  # Cores used by the whole process over the last interval
+
+    def add_stage(self, name, priority, min_hz, max_hz, pausable=False):
+        """Registers a stage; higher priority gets spare budget first."""
+        with self._lock:
+            self._stages[name] = Stage(name, priority, min_hz, max_hz, pausable)
+
+    def stop(self):
+        """Wakes every waiting stage; wait_turn returns False from now on."""
+        self._stop.set()
+
+    def set_scene_static(self, static):
+        if static != self.scene_static:
+            self.scene_static = static
+            with self._lock:
+                self._plan(time.monotonic())
+
+    # --- Stage side ---
+
+    def wait_turn(self, name):
+        """Sleeps until the stage's next slot. Returns False when the scheduler is stopped."""
+        stage = self._stages[name]
+        now = time.monotonic()
+        self._maybe_rebalance(now)
+        delay = stage.next_due - now
+        if delay > 0 and self._stop.wait(delay):
+            return False
+        stage.next_due = max(stage.next_due + 1.0 / stage.rate, time.monotonic())
+        return not self._stop.is_set()
+
+    def due(self, name):
+        """Non-blocking wait_turn: True (and the slot is taken) when the stage's next slot has come."""
+        stage = self._stages[name]
+        now = time.monotonic()
+        self._maybe_rebalance(now)
+        if now < stage.next_due or self._stop.is_set():
+            return False
+        stage.next_due = max(stage.next_due + 1.0 / stage.rate, now)
+        return True
+
+    def record(self, name, seconds):
+        """Reports the cost of one turn; the estimate follows an exponential moving average."""
+        stage = self._stages[name]
+        stage.cost = 0.8 * stage.cost + 0.2 * seconds
+
+    @contextmanager
+    def measure(self, name):
+        """Times one inference and records it."""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(name, time.monotonic() - started)
+
+    # --- Planning ---
+
+    def _floor(self, stage):
+        return min(self.static_hz, stage.min_hz) if self.scene_static and stage.pausable else stage.min_hz
+
+    def _ceiling(self, stage):
+        return self._floor(stage) if self.scene_static and stage.pausable else stage.max_hz
+
+    def _maybe_rebalance(self, now):
+        if now - self._last_adjust >= self.adjust_interval:
+            with self._lock:
+                if now - self._last_adjust >= self.adjust_interval:
+                    self._rebalance(now)
+
+    def _rebalance(self, now):
+        cpu = time.process_time()
+        elapsed = now - self._last_adjust
+        if elapsed > 0:
+            self.process_cpu = (cpu - self._last_cpu) / elapsed
+        self._last_adjust, self._last_cpu = now, cpu
+        self._plan(now)
+
+    def _plan(self, now):
+        stages = list(self._stages.values())
+        in_stages = sum(stage.cost * stage.rate for stage in stages)
+        overhead = max(0.0, self.process_cpu - in_stages)
+        available = self.cpu_budget - overhead
+
+        plan = {stage.name: self._floor(stage) for stage in stages}
+        spent = sum(stage.cost * plan[stage.name] for stage in stages)
+        for stage in sorted(stages, key=lambda s: -s.priority):
+            room = self._ceiling(stage) - plan[stage.name]
+            if room <= 0:
+                continue
+            extra = min(room, max(0.0, available - spent) / stage.cost)
+            plan[stage.name] += extra
+            spent += extra * stage.cost
+        for stage in stages:
+            target = plan[stage.name]
+            # Dropping to the static rate is immediate; everything else moves halfway
+            stage.rate = target if target <= self._floor(stage) else (stage.rate + target) / 2
+            stage.rate = max(stage.rate, self._floor(stage))
+            stage.next_due = min(stage.next_due, now + 1.0 / stage.rate)
+
+    def status(self):
+        """{"budget", "cpu", "static", "rates": {stage: Hz}} for the overlay and telemetry dumps."""
+        return {
+            "budget": self.cpu_budget,
+            "cpu": round(self.process_cpu, 2),
+            "static": self.scene_static,
+            "rates": {name: round(stage.rate, 2) for name, stage in self._stages.items()},
+        }
+
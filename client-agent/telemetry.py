@@ -0,0 +1,198 @@
+"""
+Per-stage performance telemetry for the ProctorAI client agent.
+
+Every model stage (YOLO, face landmarks, hands) wraps one
+inference in `Telemetry.measure(stage, frame_seq, captured_at)`, and the
+camera loop calls `frame_captured()` once per frame. Over a sliding window
+of `window` seconds each stage reports:
+- latency:  mean / p95 / max inference time in ms;
+- hz:       inferences completed per second;
+- cpu:      CPU time of the stage's thread per inference (time.thread_time);
+- age:      mean age of the input frame when inference started;
+- dropped:  camera frames the stage never looked at;
+- repeated: inferences on the same frame as the previous one (wasted work);
+- stale:    inferences on a frame older than `stale_after` seconds;
+- skipped:  turns where the motion gate kept the previous result instead
+            (`skip()`), and skip_ratio = skipped / (inferences + skipped).
+Plus the camera FPS and the whole process's CPU use (in % of one core).
+
+The snapshot is drawn in the overlay, appended to a local JSONL file every
+`dump_interval` seconds (so runs on low-end laptops can be compared
+afterwards), and can ride along in heartbeats as a compact summary.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(pct / 100.0 * len(sorted_values)))]
+
+
+class StageStats:
+    """Sliding-window counters for one stage. Only its own worker thread records into it."""
+
+    def __init__(self, name):
+        self.name = name
+        self.samples = deque()  # (finished, latency, cpu, age)
+        self.last_seq = None
+        self.dropped = deque()   # (time, frames skipped)
+        self.repeated = deque()  # times
+        self.stale = deque()     # times
+        self.skipped = deque()   # times
+
+    def record(self, started, finished, cpu, frame_seq, captured_at, stale_after):
+        self.samples.append((finished, finished - started, cpu, max(0.0, started - captured_at)))
+        if self.last_seq is not None:
+            if frame_seq == self.last_seq:
+                self.repeated.append(finished)
+            elif frame_seq > self.last_seq + 1:
+                self.dropped.append((finished, frame_seq - self.last_seq - 1))
+        if started - captured_at > stale_after:
+            self.stale.append(finished)
+        self.last_seq = frame_seq
+
+    def trim(self, cutoff):
+        while self.samples and self.samples[0][0] < cutoff:
+            self.samples.popleft()
+        while self.dropped and self.dropped[0][0] < cutoff:
+            self.dropped.popleft()
+        for times in (self.repeated, self.stale, self.skipped):
+            while times and times[0] < cutoff:
+                times.popleft()
+
+    def summary(self, window):
+        samples = list(self.samples)
+        latencies = sorted(latency for _, latency, _, _ in samples)
+        count = len(samples)
+        skipped = len(self.skipped)
+        return {
+            "hz": round(count / window, 2),
+            "latency_ms_mean": round(1000 * sum(latencies) / count, 1) if count else 0.0,
+            "latency_ms_p95": round(1000 * _percentile(latencies, 95), 1),
+            "latency_ms_max": round(1000 * latencies[-1], 1) if count else 0.0,
+            "cpu_ms_mean": round(1000 * sum(cpu for _, _, cpu, _ in samples) / count, 1) if count else 0.0,
+            "frame_age_ms_mean": round(1000 * sum(age for _, _, _, age in samples) / count, 1) if count else 0.0,
+            "dropped": sum(n for _, n in self.dropped),
+            "repeated": len(self.repeated),
+            "stale": len(self.stale),
+            "skipped": skipped,
+            "skip_ratio": round(skipped / (count + skipped), 3) if count + skipped else 0.0,
+        }
+
+
+class Telemetry:
+    def __init__(self, window=10.0, stale_after=0.5, dump_path=None, dump_interval=30.0):
+        self.window = window
+        self.stale_after = stale_after
+        self.dump_path = dump_path
+        self.dump_interval = dump_interval
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._frames = deque()
+        self._cpu_marks = deque()  # (wall time, process CPU time)
+        self._last_dump = time.time()
+        self._snapshot = None
+        self._snapshot_at = 0.0
+
+    # --- Recording ---
+
+    def frame_captured(self, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._frames.append(now)
+
+    @contextmanager
+    def measure(self, stage, frame_seq, captured_at):
+        """Times one inference of `stage` on frame `frame_seq` (captured at `captured_at`, time.time())."""
+        started = time.time()
+        cpu_started = time.thread_time()
+        try:
+            yield
+        finally:
+            finished = time.time()
+            with self._lock:
+                stats = self._stages.get(stage)
+                if stats is None:
+                    stats = self._stages[stage] = StageStats(stage)
+                stats.record(started, finished, time.thread_time() - cpu_started,
+                             frame_seq, captured_at, self.stale_after)
+
+    def skip(self, stage, now=None):
+        """Records a turn of `stage` that reused its previous result (scene unchanged)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = StageStats(stage)
+            stats.skipped.append(now)
+
+    # --- Reporting ---
+
+    def snapshot(self, now=None, max_age=0.5):
+        """Window summary; recomputed at most every `max_age` seconds, so the overlay can call it per frame."""
+        now = time.time() if now is None else now
+        if self._snapshot is not None and now - self._snapshot_at < max_age:
+            return self._snapshot
+        cutoff = now - self.window
+        with self._lock:
+            while self._frames and self._frames[0] < cutoff:
+                self._frames.popleft()
+            self._cpu_marks.append((now, time.process_time()))
+            while len(self._cpu_marks) > 1 and self._cpu_marks[0][0] < cutoff:
+                self._cpu_marks.popleft()
+            for stats in self._stages.values():
+                stats.trim(cutoff)
+            stages = {name: stats.summary(self.window) for name, stats in self._stages.items()}
+            camera_fps = round(len(self._frames) / self.window, 1)
+            (wall_start, cpu_start), (wall_end, cpu_end) = self._cpu_marks[0], self._cpu_marks[-1]
+        cpu_percent = round(100 * (cpu_end - cpu_start) / (wall_end - wall_start), 1) if wall_end > wall_start else 0.0
+        self._snapshot = {
+            "time": round(now, 3),
+            "window_s": self.window,
+            "camera_fps": camera_fps,
+            "process_cpu_percent": cpu_percent,
+            "cpu_count": os.cpu_count(),
+            "stages": stages,
+        }
+        self._snapshot_at = now
+        return self._snapshot
+
+    def overlay_lines(self, now=None):
+        snapshot = self.snapshot(now)
+        lines = [f"Cam {snapshot['camera_fps']:.0f} FPS | CPU {snapshot['process_cpu_percent']:.0f}%"]
+        for name, stage in sorted(snapshot["stages"].items()):
+            lines.append(f"{name}: {stage['hz']:.1f} Hz, p95 {stage['latency_ms_p95']:.0f} ms, "
+                         f"age {stage['frame_age_ms_mean']:.0f} ms, skip {100 * stage['skip_ratio']:.0f}%")
+        return lines
+
+    def compact(self, now=None):
+        """Short form for heartbeats: {"fps", "cpu", "stages": {name: [hz, p95 ms, stale + repeated, skip ratio]}}."""
+        snapshot = self.snapshot(now)
+        return {
+            "fps": snapshot["camera_fps"],
+            "cpu": snapshot["process_cpu_percent"],
+            "stages": {
+                name: [stage["hz"], stage["latency_ms_p95"], stage["stale"] + stage["repeated"], stage["skip_ratio"]]
+                for name, stage in snapshot["stages"].items()
+            },
+        }
+
+    def maybe_dump(self, now=None, force=False):
+        """Appends a snapshot to `dump_path` once every `dump_interval` seconds (or now, with force)."""
+        now = time.time() if now is None else now
+        if not self.dump_path or (not force and now - self._last_dump < self.dump_interval):
+            return
+        self._last_dump = now
+        try:
+            with open(self.dump_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(self.snapshot(now, max_age=0)) + "\n")
+        except OSError as e:
+            print(f"[Telemetry] Could not write {self.dump_path}: {e}")
+            self.dump_path = None
@@ -0,0 +1,212 @@
+"""
+Batched, compressed, persistent uploads for the ProctorAI client agent.
+
+Replaces the one-`requests.post`-per-payload sender:
+- events are coalesced into batches (up to `max_batch` events or
+  `flush_interval` seconds) and posted gzip-compressed to the backend's
+  /log_batch endpoint over one pooled keep-alive `requests.Session`;
+- the in-memory queue is bounded; when it is full, or the server cannot be
+  reached, events are appended to an on-disk JSONL journal instead of being
+  dropped;
+- after a failed send the sender waits out an exponential backoff before
+  trying again, and the journal is replayed in order once the server is
+  reachable again. Leftovers from a previous crashed run are replayed too.
+"""
+
+import gzip
+import json
+import os
+import queue
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class UploadJournal:
+    """Append-only JSONL spill file with a persisted read offset."""
+
+    def __init__(self, path):
+        self.path = path
+        self.offset_path = path + ".offset"
+        self._lock = threading.Lock()
+
+    def append(self, events):
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                for event in events:
+                    f.write(json.dumps(event) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def has_pending(self):
+        with self._lock:
+            return os.path.exists(self.path) and os.path.getsize(self.path) > self._read_offset()
+
+    def read(self, max_events):
+        """Returns (events, next_offset) for the oldest unsent journal entries."""
+        with self._lock:
+            if not os.path.exists(self.path):
+                return [], 0
+            offset = self._read_offset()
+            events = []
+            with open(self.path, "r", encoding="utf-8") as f:
+                f.seek(offset)
+                while len(events) < max_events:
+                    line = f.readline()
+                    if not line.endswith("\n"):
+                        break  # EOF or a half-written line from a crash
+                    offset = f.tell()
+                    try:
+                        events.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+            return events, offset
+
+    def commit(self, offset):
+        """Marks everything before `offset` as delivered; truncates the journal once fully drained."""
+        with self._lock:
+            if offset >= os.path.getsize(self.path):
+                os.remove(self.path)
+                if os.path.exists(self.offset_path):
+                    os.remove(self.offset_path)
+                return
+            with open(self.offset_path, "w", encoding="utf-8") as f:
+                f.write(str(offset))
+
+    def _read_offset(self):
+        try:
+            with open(self.offset_path, "r", encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+
+class BatchUploader:
+    def __init__(self, batch_url, journal_path, max_queue=2000, max_batch=100,
+                 flush_interval=2.0, timeout=5.0, max_backoff=60.0):
+        self.batch_url = batch_url
+        self.journal = UploadJournal(journal_path)
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._backoff = 0.0
+        self._retry_at = 0.0
+        self._session = requests.Session()
+        # One host, one sender thread: a tiny keep-alive pool is enough
+        self._session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self._session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.sent = 0
+        self.spilled = 0
+
+    def put(self, event):
+        """Never blocks on the network: on overflow the queue is spilled to the journal."""
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            # Move the queued (older) events first so the journal stays in order
+            spill = []
+            while True:
+                try:
+                    spill.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            spill.append(event)
+            self.journal.append(spill)
+            self.spilled += len(spill)
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def run(self):
+        """Sender loop; run it in a daemon thread."""
+        while not self._stop.is_set():
+            batch = self._collect()
+            if batch:
+                # Preserve ordering: while a backlog exists, new events queue behind it,
+                # and while backing off they wait in the journal instead of probing the server
+                if self.journal.has_pending() or not self._backoff_elapsed() or not self._send(batch):
+                    self.journal.append(batch)
+                    self.spilled += len(batch)
+            if self.journal.has_pending() and self._backoff_elapsed():
+                self._replay()
+            if not self._backoff_elapsed():
+                # The last attempt failed: sit out the backoff, whether or not anything is journaled
+                self._stop.wait(self._retry_at - time.monotonic())
+
+    def stop(self, timeout=3.0):
+        """Stops the loop, tries one last send and journals anything that is left."""
+        self._stop.set()
+        leftover = []
+        while True:
+            try:
+                leftover.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if leftover:
+            self.timeout = min(self.timeout, timeout)
+            if self.journal.has_pending() or not self._send(leftover):
+                self.journal.append(leftover)
+        self._session.close()
+
+    # --- Internals ---
+
+    def _collect(self):
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=self.flush_interval))
+        except queue.Empty:
+            return batch
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _send(self, events):
+        body = gzip.compress(json.dumps({"events": events}).encode("utf-8"))
+        try:
+            response = self._session.post(
+                self.batch_url,
+                data=body,
+                headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+                timeout=self.timeout,
+            )
+            if 400 <= response.status_code < 500 and response.status_code not in (408, 429):
+                # The server rejected the payload itself; retrying would never succeed
+                print(f"[Network] Server rejected batch of {len(events)} events: {response.status_code}")
+                return True
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            self._backoff = min(self.max_backoff, max(1.0, self._backoff * 2))
+            self._retry_at = time.monotonic() + self._backoff * random.uniform(0.5, 1.0)
+            print(f"[Network] Upload failed ({len(events)} events journaled, retry in ~{self._backoff:.0f}s): {e}")
+            return False
+        self._backoff = 0.0
+        self.sent += len(events)
+        return True
+
+    def _backoff_elapsed(self):
+        return self._backoff == 0.0 or time.monotonic() >= self._retry_at
+
+    def _replay(self):
+        while not self._stop.is_set():
+            events, offset = self.journal.read(self.max_batch)
+            if not events:
+                if offset:
+                    self.journal.commit(offset)
+                return
+            if not self._send(events):
+                return
+            self.journal.commit(offset)
+            print(f"[Network] Replayed {len(events)} journaled events.")
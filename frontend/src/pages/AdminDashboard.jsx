@@ -28,6 +28,7 @@ function AdminDashboard() {
   const [sessions, setSessions] = useState([]);
   const [loadingSessions, setLoadingSessions] = useState(false);
   const [selectedExam, setSelectedExam] = useState(null); // To store which exam we're viewing
+  const [liveAlerts, setLiveAlerts] = useState([]); // Most recent alert transitions pushed by the server
 
   // General messages
   const [error, setError] = useState('');
@@ -59,6 +60,33 @@ function AdminDashboard() {
     }
   }, [view, selectedExam]); // Re-run when view or selectedExam changes
 
+  useEffect(() => {
+    // Live updates for the exam being viewed, pushed by the server (no polling)
+    if (view !== 'view_sessions' || !selectedExam) return undefined;
+    setLiveAlerts([]);
+    const source = new EventSource(`${API_URL}/api/exams/${selectedExam.id}/live`);
+
+    source.addEventListener('session', (e) => {
+      const update = JSON.parse(e.data);
+      setSessions((prev) => {
+        const exists = prev.some((s) => s.session_id === update.session_id);
+        if (!exists) return [update, ...prev];
+        return prev.map((s) => (s.session_id === update.session_id ? { ...s, ...update } : s));
+      });
+    });
+    source.addEventListener('alert', (e) => {
+      const alert = JSON.parse(e.data);
+      setLiveAlerts((prev) => [alert, ...prev].slice(0, 20));
+      setSessions((prev) => prev.map((s) => (
+        s.session_id === alert.session_id ? { ...s, current_alerts: alert.alerts } : s
+      )));
+    });
+    // We fell behind and some updates were dropped: reload the list once
+    source.addEventListener('resync', () => fetchSessions(selectedExam.id));
+
+    return () => source.close();
+  }, [view, selectedExam]);
+
   // --- API Functions ---
 
   const fetchExams = async () => {
@@ -285,8 +313,31 @@ function AdminDashboard() {
                   Proctoring Sessions for: <span className="text-indigo-700">{selectedExam?.title}</span>
                 </h2>
               </div>
+              {sessions.length > 0 && (
+                <a
+                  href={`${API_URL}/api/exams/${selectedExam?.id}/export`}
+                  className="px-3 py-2 bg-indigo-600 text-white text-sm font-medium rounded-md hover:bg-indigo-700 focus:outline-none focus:ring-2 focus:ring-offset-2 focus:ring-indigo-500 text-center"
+                >
+                  Export All Reports (ZIP)
+                </a>
+              )}
             </div>
 
+            {liveAlerts.length > 0 && (
+              <div className="mb-4 p-3 bg-red-50 border border-red-200 rounded-md">
+                <h3 className="text-sm font-semibold text-red-700 mb-2">Live Alerts</h3>
+                <ul className="text-sm text-gray-700 space-y-1 max-h-40 overflow-y-auto">
+                  {liveAlerts.map((alert, index) => (
+                    <li key={`${alert.session_id}-${alert.timestamp}-${index}`}>
+                      <span className="text-gray-500">{new Date(alert.timestamp).toLocaleTimeString()}</span>{' '}
+                      <span className="font-semibold">{alert.student_username}</span>:{' '}
+                      {alert.alerts.length > 0 ? alert.alerts.join(', ') : <span className="text-green-600">All clear</span>}
+                    </li>
+                  ))}
+                </ul>
+              </div>
+            )}
+
             {loadingSessions ? <p>Loading sessions...</p> : (
               <div className="space-y-4">
                 {sessions.length === 0 ? <p>No proctoring sessions have been recorded for this exam yet.</p> : (
@@ -304,6 +355,9 @@ function AdminDashboard() {
                           <p className="text-sm text-gray-600">
                             Final Score: <span className="font-bold">{session.final_score} / 100</span>
                           </p>
+                          {session.current_alerts?.length > 0 && (
+                            <p className="text-sm text-red-600">Now: {session.current_alerts.join(', ')}</p>
+                          )}
                         </div>
                         <a
                           href={reportUrl}